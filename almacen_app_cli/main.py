@@ -9,10 +9,58 @@ Su responsabilidad es:
 - Mostrar los resultados en pantalla.
 
 No contiene lógica de negocio, solo interacción con el usuario.
+
+Sin argumentos muestra el menú. Para scripts hay subcomandos que no preguntan nada:
+    python main.py agregar 12 "Pan integral" 5 1.50
+    python main.py actualizar 12 --cantidad 8
+    python main.py eliminar 12
+    python main.py entrada 12 30           (llegan 30 unidades; salida 12 4 las resta)
+    python main.py totales                 (unidades y valor de todo el inventario)
+    python main.py movimientos 12 [--json] (historial; sin ID, el de todos)
+    python main.py obtener 12
+    python main.py buscar pan [--json]
+    python main.py listar [--json]
+    python main.py importar catalogo.csv [--modo actualizar]   (csv, jsonl o id|nombre|cantidad|precio)
+    python main.py importar historico.txt --procesos 0         (archivos enormes: un proceso por núcleo)
+    python main.py exportar copia.jsonl
+    python main.py lote < cambios.txt      (un comando por línea, ver servicios/comandos.py)
+Las opciones generales van antes del subcomando: python main.py --almacenamiento sqlite listar
+
+Métricas (servicios/metricas.py): con --metricas se miden latencias (p50/p95/p99) y
+bytes leídos/escritos; al terminar un subcomando o el servidor se muestran en stderr.
+Con --perfil ARCHIVO además se guarda un perfil de cProfile (se abre con pstats):
+    python main.py --metricas importar catalogo.csv
+    python main.py --perfil importar.prof importar catalogo.csv
+En el menú, la opción 11 las activa y muestra.
+
+Arranque: el menú, el servidor y `obtener` no esperan a leer todo el archivo
+(Inventario(carga_diferida=True)); lo que necesita el inventario completo (listar,
+buscar por nombre, cualquier modificación) espera a que termine la carga.
+
+Guardado (servicios/autoguardado.py): por defecto cada cambio se escribe en disco al
+instante. --guardar-cada N junta N cambios por escritura y --guardar-inactividad MS
+guarda tras MS milisegundos sin cambios; lo pendiente se guarda siempre al salir
+(también con Ctrl+C). Al empezar se indica en stderr qué se perdería si el programa
+se corta, y el menú muestra cuántos cambios faltan guardar:
+    python main.py --guardar-cada 100 --guardar-inactividad 2000
 """
 
+import argparse
+import atexit
+import json
+import math
+import sys
+import time
+
 from modelos.producto import Producto
 from servicios.inventario import Inventario
+from servicios.almacenamiento import TIPOS_ALMACENAMIENTO, crear_almacenamiento
+from servicios.autoguardado import PoliticaGuardado
+from servicios.comandos import TAMANO_BLOQUE, ejecutar_comandos
+from servicios.intercambio import (
+    FORMATOS, FORMATOS_PARALELOS, LECTORES, MODOS, Importacion, exportar, formato_de, leer_en_paralelo,
+)
+from servicios.servidor_http import PUERTO, ejecutar
 
 
 # -----------------------------
@@ -41,7 +89,7 @@ def leer_float(mensaje: str, minimo=None) -> float:
     """Lee un número decimal (float) desde consola y valida un mínimo opcional."""
     while True:
         try:
-            valor = float(input(mensaje))
+            valor = decimal_finito(input(mensaje))
 
             if minimo is not None and valor < minimo:
                 print(f"Debe ser >= {minimo}.")
@@ -52,6 +100,14 @@ def leer_float(mensaje: str, minimo=None) -> float:
         except ValueError:
             print("Ingresa un número decimal válido.")
 
+# float() acepta "inf" y "nan", que el modelo rechaza: se piden de nuevo
+# (también es el tipo de los precios en los subcomandos)
+def decimal_finito(texto: str) -> float:
+    valor = float(texto)
+    if not math.isfinite(valor):
+        raise ValueError(f"número no finito: {texto!r}")
+    return valor
+
 # Lee texto y evita cadenas vacías
 def leer_texto(mensaje: str) -> str:
     """Lee un texto no vacío desde consola."""
@@ -66,10 +122,14 @@ def leer_texto(mensaje: str) -> str:
 # -----------------------------
 
 # Imprime las opciones disponibles para el usuario
-def mostrar_menu():
+def mostrar_menu(inventario: Inventario):
     """Imprime el menú principal del sistema."""
     print("\n" + "=" * 40)
     print("ALMACÉN APP - INVENTARIO")
+    if inventario.cargando:
+        print(f"(cargando: {inventario.total_productos():,} productos hasta ahora)")
+    if inventario.cambios_sin_guardar:
+        print(f"({inventario.estado_guardado()})")
     print("=" * 40)
     print("1) Añadir producto")
     print("2) Eliminar producto")
@@ -77,7 +137,300 @@ def mostrar_menu():
     print("4) Buscar producto por ID")
     print("5) Buscar producto por nombre")
     print("6) Listar inventario")
-    print("7) Salir")
+    print("7) Registrar entrada de stock")
+    print("8) Registrar salida de stock")
+    print("9) Ver totales (unidades y valor)")
+    print("10) Ver movimientos de un producto")
+    print("11) Métricas y perfil")
+    print("12) Salir")
+
+# -----------------------------
+# SUBCOMANDOS (USO DESDE SCRIPTS)
+# -----------------------------
+
+# Define los subcomandos en el parser principal
+def agregar_subcomandos(parser: argparse.ArgumentParser) -> None:
+    sub = parser.add_subparsers(dest="comando", metavar="SUBCOMANDO",
+                                help="sin subcomando se muestra el menú interactivo")
+
+    p = sub.add_parser("agregar", aliases=["add"], help="añade un producto")
+    p.add_argument("id", type=int)
+    p.add_argument("nombre")
+    p.add_argument("cantidad", type=int)
+    p.add_argument("precio", type=decimal_finito)
+
+    p = sub.add_parser("actualizar", aliases=["update"], help="cambia cantidad y/o precio")
+    p.add_argument("id", type=int)
+    p.add_argument("--cantidad", type=int)
+    p.add_argument("--precio", type=decimal_finito)
+
+    p = sub.add_parser("eliminar", aliases=["delete"], help="elimina un producto")
+    p.add_argument("id", type=int)
+
+    p = sub.add_parser("entrada", aliases=["in"], help="suma unidades al stock de un producto")
+    p.add_argument("id", type=int)
+    p.add_argument("unidades", type=int)
+
+    p = sub.add_parser("salida", aliases=["out"], help="resta unidades del stock (error si no alcanza)")
+    p.add_argument("id", type=int)
+    p.add_argument("unidades", type=int)
+
+    sub.add_parser("totales", aliases=["totals"], help="unidades y valor de todo el inventario")
+
+    p = sub.add_parser("movimientos", aliases=["history"], help="historial de entradas, salidas y ajustes")
+    p.add_argument("id", type=int, nargs="?", help="solo los de este producto")
+    p.add_argument("--json", action="store_true", help="un objeto JSON por línea")
+
+    p = sub.add_parser("obtener", aliases=["get"], help="muestra un producto")
+    p.add_argument("id", type=int)
+    p.add_argument("--json", action="store_true", help="salida en JSON")
+
+    p = sub.add_parser("buscar", aliases=["search"], help="busca por nombre (coincidencia parcial)")
+    p.add_argument("texto")
+    p.add_argument("--json", action="store_true", help="un objeto JSON por línea")
+
+    p = sub.add_parser("listar", aliases=["list"], help="lista todo el inventario")
+    p.add_argument("--json", action="store_true", help="un objeto JSON por línea")
+
+    p = sub.add_parser("importar", aliases=["import"],
+                       help="agrega los productos de un archivo csv, jsonl o txt ('-' = entrada estándar)")
+    p.add_argument("archivo")
+    p.add_argument("--formato", choices=FORMATOS, help="por defecto según la extensión (txt = id|nombre|cantidad|precio)")
+    p.add_argument("--modo", choices=MODOS, default="error",
+                   help="qué hacer si el ID ya existe: error, omitir, actualizar (cantidad y precio) o reemplazar")
+    p.add_argument("--tamano", type=int, default=TAMANO_BLOQUE, help="filas por transacción")
+    p.add_argument("--procesos", type=int, default=1,
+                   help="procesos que analizan el archivo a la vez (txt y jsonl; 0 = uno por núcleo)")
+
+    p = sub.add_parser("exportar", aliases=["export"],
+                       help="escribe el inventario en csv, jsonl o txt ('-' = salida estándar)")
+    p.add_argument("archivo", nargs="?", default="-")
+    p.add_argument("--formato", choices=FORMATOS, help="por defecto según la extensión (txt = id|nombre|cantidad|precio)")
+
+    p = sub.add_parser("lote", aliases=["batch"],
+                       help="aplica comandos (texto con '|' o JSON), uno por línea; resultados en JSON")
+    p.add_argument("archivo", nargs="?", default="-", help="archivo de comandos ('-' = entrada estándar)")
+    p.add_argument("--tamano", type=int, default=None,
+                   help=f"comandos por transacción (por defecto {TAMANO_BLOQUE}; 1 si se escribe a mano)")
+    p.add_argument("--solo-errores", action="store_true", help="muestra solo las líneas que fallaron")
+
+
+# Nombre en español del subcomando (acepta los alias en inglés)
+NOMBRES_SUBCOMANDOS = {
+    "add": "agregar", "update": "actualizar", "delete": "eliminar", "in": "entrada", "out": "salida",
+    "totals": "totales", "history": "movimientos", "get": "obtener",
+    "search": "buscar", "list": "listar", "import": "importar", "export": "exportar", "batch": "lote",
+}
+
+
+# Abre un archivo de texto; "-" es la entrada o salida estándar
+def abrir(ruta: str, modo: str, newline=None):
+    # utf-8-sig al leer: acepta los CSV de Excel (que empiezan con BOM)
+    codificacion = "utf-8-sig" if "r" in modo else "utf-8"
+    if ruta == "-":
+        return open(sys.stdin.fileno() if "r" in modo else sys.stdout.fileno(),
+                    modo, encoding=codificacion, newline=newline, closefd=False)
+    return open(ruta, modo, encoding=codificacion, newline=newline)
+
+
+# Muestra productos como en el menú o como JSON (uno por línea)
+def mostrar_productos(productos, como_json: bool) -> None:
+    salida = sys.stdout
+    for p in productos:
+        salida.write((json.dumps(p.to_dict(), ensure_ascii=False) if como_json else str(p)) + "\n")
+
+
+# Muestra cuántos productos y unidades hay y cuánto vale el inventario
+def mostrar_totales(inventario: Inventario) -> None:
+    print(f"Productos: {inventario.total_productos()} | Unidades: {inventario.unidades_totales()} | "
+          f"Valor: ${inventario.valor_inventario():,.2f}")
+
+
+# Muestra las métricas y permite perfilar, reiniciar o desactivar (opción 11 del menú)
+def menu_metricas(inventario: Inventario, ruta_perfil: str) -> None:
+    if inventario.metricas is None:
+        inventario.activar_metricas()
+        print("Métricas activadas: se miden las operaciones desde ahora.")
+        return
+
+    metricas = inventario.metricas
+    print(metricas.texto())
+
+    print(f"1) {'Detener' if metricas.perfilando else 'Iniciar'} perfil (cProfile)")
+    print("2) Reiniciar métricas")
+    print("3) Desactivar métricas")
+    print("4) Volver")
+    opcion = leer_int("Elige opción: ", minimo=1)
+
+    if opcion == 1 and metricas.perfilando:
+        print(metricas.detener_perfil(ruta_perfil))
+        print(f"Perfil guardado en {ruta_perfil}")
+    elif opcion == 1:
+        metricas.iniciar_perfil()
+        print("Perfil iniciado: se detiene desde este mismo menú.")
+    elif opcion == 2:
+        inventario.desactivar_metricas()
+        inventario.activar_metricas()
+        print("Métricas reiniciadas.")
+    elif opcion == 3:
+        inventario.desactivar_metricas()
+        print("Métricas desactivadas.")
+
+
+# Al terminar: guarda el perfil (si se pidió) y muestra las métricas en stderr,
+# así no se mezclan con la salida de un subcomando (p. ej. listar --json)
+def informar_metricas(inventario: Inventario, ruta_perfil) -> None:
+    metricas = inventario.metricas
+    if metricas is None:
+        return
+
+    if ruta_perfil and metricas.perfilando:
+        print(metricas.detener_perfil(ruta_perfil), file=sys.stderr)
+        print(f"Perfil guardado en {ruta_perfil}", file=sys.stderr)
+
+    print(metricas.texto(), file=sys.stderr)
+
+
+# Aplica comandos línea por línea y escribe cada resultado apenas se guarda su bloque.
+# Devuelve la cantidad de errores.
+def procesar_lineas(inventario, lineas, tamano: int, solo_errores: bool) -> int:
+    salida = sys.stdout
+    total = errores = 0
+    inicio = time.perf_counter()
+
+    for resultado in ejecutar_comandos(inventario, lineas, tamano):
+        total += 1
+        if resultado["estado"] >= 400:
+            errores += 1
+        elif solo_errores:
+            continue
+
+        salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+        # Al terminar cada bloque la salida se entrega (útil con tuberías)
+        if total % tamano == 0:
+            salida.flush()
+
+    salida.flush()
+    segundos = time.perf_counter() - inicio
+    print(f"{total} comandos, {errores} con error, {segundos:.2f} s", file=sys.stderr)
+    return errores
+
+
+# Importa un archivo csv/jsonl/txt; informa cada fila con error (JSON) y un resumen al final
+def importar_archivo(inventario: Inventario, args) -> int:
+    formato = args.formato or formato_de(args.archivo)
+    importacion = Importacion(inventario, args.modo, args.tamano)
+    salida = sys.stdout
+    inicio = time.perf_counter()
+
+    # Archivos grandes: el análisis se reparte entre varios procesos
+    if args.procesos != 1 and args.archivo != "-" and formato in FORMATOS_PARALELOS:
+        for error in importacion.ejecutar(leer_en_paralelo(args.archivo, formato, args.procesos or None)):
+            salida.write(json.dumps(error, ensure_ascii=False) + "\n")
+    else:
+        with abrir(args.archivo, "r", newline="") as f:
+            for error in importacion.ejecutar(LECTORES[formato](f)):
+                salida.write(json.dumps(error, ensure_ascii=False) + "\n")
+
+    segundos = time.perf_counter() - inicio
+    print(f"{importacion.filas} filas: {importacion.agregados} agregadas, "
+          f"{importacion.actualizados} actualizadas, {importacion.omitidos} omitidas, "
+          f"{importacion.errores} con error ({segundos:.2f} s, "
+          f"{importacion.filas / max(segundos, 1e-9):,.0f} filas/s)", file=sys.stderr)
+    return 1 if importacion.errores else 0
+
+
+# Ejecuta un subcomando; devuelve el código de salida (0 = bien, 1 = algo falló)
+def ejecutar_subcomando(inventario: Inventario, args) -> int:
+    comando = NOMBRES_SUBCOMANDOS.get(args.comando, args.comando)
+
+    try:
+        if comando == "agregar":
+            if inventario.agregar_producto(Producto(args.id, args.nombre, args.cantidad, args.precio)):
+                print("Producto agregado.")
+                return 0
+            print("El ID ya existe.", file=sys.stderr)
+            return 1
+
+        if comando == "actualizar":
+            if inventario.actualizar_producto(args.id, args.cantidad, args.precio):
+                print("Producto actualizado.")
+                return 0
+            print("No existe producto con ese ID.", file=sys.stderr)
+            return 1
+
+        if comando == "eliminar":
+            if inventario.eliminar_producto(args.id):
+                print("Producto eliminado.")
+                return 0
+            print("No existe producto con ese ID.", file=sys.stderr)
+            return 1
+
+        if comando in ("entrada", "salida"):
+            movimiento = inventario.entrada if comando == "entrada" else inventario.salida
+            if movimiento(args.id, args.unidades):
+                print(f"Stock actual: {inventario.saldo(args.id)} unidades.")
+                return 0
+            print("No existe producto con ese ID.", file=sys.stderr)
+            return 1
+
+        if comando == "totales":
+            mostrar_totales(inventario)
+            return 0
+
+        if comando == "movimientos":
+            salida = sys.stdout
+            for m in inventario.movimientos(args.id):
+                salida.write((json.dumps(m._asdict()) if args.json else str(m)) + "\n")
+            return 0
+
+        if comando == "obtener":
+            producto = inventario.buscar_por_id(args.id)
+            if producto is None:
+                print("No encontrado.", file=sys.stderr)
+                return 1
+            mostrar_productos([producto], args.json)
+            return 0
+
+        if comando == "buscar":
+            mostrar_productos(inventario.buscar_por_nombre(args.texto), args.json)
+            return 0
+
+        if comando == "listar":
+            mostrar_productos(inventario.instantanea(), args.json)
+            return 0
+
+        if comando == "importar":
+            return importar_archivo(inventario, args)
+
+        if comando == "exportar":
+            formato = args.formato or formato_de(args.archivo)
+            # newline="" para que el CSV escriba sus propios fines de línea
+            with abrir(args.archivo, "w", newline="") as f:
+                total = exportar(inventario, f, formato)
+            print(f"{total} productos exportados ({formato}).", file=sys.stderr)
+            return 0
+
+        if comando == "lote":
+            with abrir(args.archivo, "r") as f:
+                tamano = args.tamano
+                if tamano is None:
+                    # Alguien escribiendo a mano quiere ver cada resultado al instante
+                    tamano = 1 if f.isatty() else TAMANO_BLOQUE
+                errores = procesar_lineas(inventario, f, tamano, args.solo_errores)
+            return 1 if errores else 0
+
+    except ValueError as e:
+        # Errores de validación del modelo
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        print(f"Error de archivo: {e}", file=sys.stderr)
+        return 1
+
+    return 1
+
 
 # -----------------------------
 # FUNCIÓN PRINCIPAL
@@ -88,16 +441,89 @@ def main():
     Punto de entrada del programa.
 
     - Crea una instancia de Inventario.
-    - Ejecuta un bucle infinito hasta que el usuario decida salir.
+    - Con un subcomando, lo ejecuta y termina (sin preguntar nada).
+    - Si no, ejecuta un bucle infinito hasta que el usuario decida salir.
     - Según la opción elegida, llama al método correspondiente.
     """
 
-    # Se crea el inventario (esto carga automáticamente los datos del archivo)
-    inventario = Inventario()
+    # Opción de línea de comandos: dónde se guardan los datos (txt por defecto)
+    parser = argparse.ArgumentParser(description="Sistema de inventario (consola)")
+    parser.add_argument("--almacenamiento", choices=TIPOS_ALMACENAMIENTO, default="txt",
+                        help="backend de persistencia: txt (archivo + diario), sqlite o binario (mmap)")
+    parser.add_argument("--servidor", action="store_true",
+                        help="en vez del menú, atiende peticiones HTTP/JSON (lectores, cajas)")
+    parser.add_argument("--host", default="127.0.0.1", help="dirección del servidor (por defecto solo local)")
+    parser.add_argument("--puerto", type=int, default=PUERTO, help=f"puerto del servidor (por defecto {PUERTO})")
+    parser.add_argument("--metricas", action="store_true",
+                        help="mide latencias y bytes leídos/escritos; se muestran al terminar (en stderr)")
+    parser.add_argument("--perfil", metavar="ARCHIVO",
+                        help="guarda un perfil de cProfile en ARCHIVO (implica --metricas)")
+    parser.add_argument("--guardar-cada", type=int, default=1, metavar="N",
+                        help="escribe en disco cada N cambios (1 = cada cambio, por defecto; 0 = solo al salir)")
+    parser.add_argument("--guardar-inactividad", type=int, metavar="MS",
+                        help="también escribe lo pendiente tras MS milisegundos sin cambios")
+    agregar_subcomandos(parser)
+    args = parser.parse_args()
+
+    if getattr(args, "tamano", None) is not None and args.tamano < 1:
+        parser.error("--tamano debe ser >= 1")
+    if getattr(args, "procesos", 1) < 0:
+        parser.error("--procesos debe ser >= 0")
+    if args.perfil and args.servidor:
+        # cProfile mide un solo hilo y el servidor atiende desde varios
+        parser.error("--perfil no se puede usar con --servidor (usar --metricas y GET /metricas)")
+
+    guardado = PoliticaGuardado(args.guardar_cada, args.guardar_inactividad)
+    try:
+        guardado.validar()
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Con guardado diferido se avisa qué se perdería si el programa se corta
+    if not guardado.inmediata:
+        print(guardado.describir(), file=sys.stderr)
+
+    medir = args.metricas or args.perfil is not None
+
+    # -------- MODO SERVIDOR --------
+    if args.servidor:
+        # El servidor consulta y escribe desde hilos distintos
+        # Empieza a escuchar enseguida; las consultas que necesitan todo esperan la carga
+        inventario = Inventario(almacenamiento=crear_almacenamiento(args.almacenamiento), multihilo=True,
+                                metricas=medir, carga_diferida=True, guardado=guardado)
+        atexit.register(inventario.volcar)
+        ejecutar(inventario, args.host, args.puerto)
+        inventario.cerrar()
+        informar_metricas(inventario, None)
+        return
+
+    # Se crea el inventario (esto carga automáticamente los datos guardados).
+    # El menú y `obtener` lo usan enseguida: los productos se cargan en segundo plano.
+    diferida = args.comando is None or NOMBRES_SUBCOMANDOS.get(args.comando, args.comando) == "obtener"
+    inventario = Inventario(almacenamiento=crear_almacenamiento(args.almacenamiento), metricas=medir,
+                            carga_diferida=diferida, guardado=guardado)
+
+    # Lo que quede sin guardar se escribe al terminar el programa, aunque se salga
+    # del menú con Ctrl+C (cerrar() ya lo guarda: entonces no queda nada)
+    atexit.register(inventario.volcar)
+    if args.perfil:
+        inventario.metricas.iniciar_perfil()
+
+    # -------- SUBCOMANDO --------
+    if args.comando:
+        codigo = ejecutar_subcomando(inventario, args)
+        inventario.cerrar()
+        informar_metricas(inventario, args.perfil)
+        sys.exit(codigo)
 
     # Bucle principal del sistema
     while True:
-        mostrar_menu()
+        # Trae lo que otro proceso (p. ej. la ventana Tkinter) haya guardado mientras tanto
+        # (mientras carga no hace falta: la carga ya lee lo último)
+        if not inventario.cargando:
+            inventario.sincronizar()
+
+        mostrar_menu(inventario)
         opcion = leer_int("Elige opción: ", minimo=1)
 
         # -------- AÑADIR PRODUCTO --------
@@ -134,10 +560,14 @@ def main():
             nueva_cantidad = leer_int("Nueva cantidad: ", minimo=0)
             nuevo_precio = leer_float("Nuevo precio: ", minimo=0.0)
 
-            if inventario.actualizar_producto(producto_id, nueva_cantidad, nuevo_precio):
-                print("Producto actualizado.")
-            else:
-                print("No existe producto con ese ID.")
+            try:
+                if inventario.actualizar_producto(producto_id, nueva_cantidad, nuevo_precio):
+                    print("Producto actualizado.")
+                else:
+                    print("No existe producto con ese ID.")
+            except ValueError as e:
+                # Igual que al añadir: el modelo rechazó un dato
+                print(f"Error: {e}")
 
         # -------- BUSCAR POR ID --------
         elif opcion == 4:
@@ -165,9 +595,44 @@ def main():
                 for p in productos:
                     print(p)
 
+        # -------- ENTRADA / SALIDA DE STOCK --------
+        elif opcion in (7, 8):
+            producto_id = leer_int("ID: ", minimo=1)
+            unidades = leer_int("Unidades: ", minimo=1)
+
+            try:
+                movimiento = inventario.entrada if opcion == 7 else inventario.salida
+                if movimiento(producto_id, unidades):
+                    print(f"Stock actual: {inventario.saldo(producto_id)} unidades.")
+                else:
+                    print("No existe producto con ese ID.")
+            except ValueError as e:
+                # Stock insuficiente
+                print(f"Error: {e}")
+
+        # -------- TOTALES --------
+        elif opcion == 9:
+            mostrar_totales(inventario)
+
+        # -------- MOVIMIENTOS --------
+        elif opcion == 10:
+            movimientos = list(inventario.movimientos(leer_int("ID: ", minimo=1)))
+
+            if not movimientos:
+                print("Sin movimientos registrados.")
+            else:
+                for m in movimientos:
+                    print(m)
+
+        # -------- MÉTRICAS Y PERFIL --------
+        elif opcion == 11:
+            menu_metricas(inventario, args.perfil or "inventario.prof")
+
         # -------- SALIR --------
-        elif opcion == 7:
+        elif opcion == 12:
             print("Saliendo...")
+            inventario.cerrar()
+            informar_metricas(inventario, args.perfil or "inventario.prof")
             break
 
         # -------- OPCIÓN INVÁLIDA --------
@@ -1,5 +1,7 @@
 # 1) modelos/producto.py
 
+import math
+
 class Producto:
     """
     Representa un producto del inventario.
@@ -11,6 +13,10 @@ class Producto:
 
     SEPARADOR = "|"  # Formato en TXT: id|nombre|cantidad|precio
 
+    # __slots__ evita el __dict__ de cada instancia (mucha menos memoria por producto).
+    # Los nombres con "__" también se "manglean" aquí, igual que los atributos privados.
+    __slots__ = ("__id", "__nombre", "__cantidad", "__precio")
+
     def __init__(self, producto_id: int, nombre: str, cantidad: int, precio: float):
         # Se usan setters para asegurar validación desde la creación del objeto
         self.set_id(producto_id)
@@ -18,6 +24,16 @@ class Producto:
         self.set_cantidad(cantidad)
         self.set_precio(precio)
 
+    @classmethod
+    def _sin_validar(cls, producto_id: int, nombre: str, cantidad: int, precio: float) -> "Producto":
+        # Construcción rápida para datos de confianza: no pasa por los setters
+        producto = cls.__new__(cls)
+        producto.__id = producto_id
+        producto.__nombre = nombre
+        producto.__cantidad = cantidad
+        producto.__precio = precio
+        return producto
+
     # -------- Getters (lectura controlada de atributos privados) --------
     def get_id(self) -> int:
         return self.__id      #Retorna el identificador único del producto.
@@ -48,13 +64,22 @@ class Producto:
         self.__cantidad = cantidad
 
     def set_precio(self, precio: float) -> None:
-        if not isinstance(precio, (int, float)) or float(precio) < 0: #Asigna el precio. Debe ser un número >= 0.
-            raise ValueError("El precio debe ser >= 0.")
-        self.__precio = float(precio)
+        if not isinstance(precio, (int, float)):                   #Asigna el precio. Debe ser un número >= 0.
+            raise ValueError("El precio debe ser un número >= 0.")
+        # Un entero enorme no entra en un float (OverflowError)
+        try:
+            valor = float(precio)
+        except OverflowError:
+            raise ValueError("El precio debe ser un número >= 0.")
+        # NaN no es < 0, pero rompería el orden del índice de precios y el JSON
+        if not math.isfinite(valor) or valor < 0:
+            raise ValueError("El precio debe ser un número >= 0.")
+        self.__precio = valor
 
     # -------- Conversión para persistencia --------
     def to_linea(self) -> str:                                             #Convierte el objeto a una línea de texto para el archivo.
-        nombre_seguro = self.get_nombre().replace(self.SEPARADOR, "/")
+        # Ni el separador ni saltos de línea (partirían el registro en dos)
+        nombre_seguro = self.get_nombre().replace(self.SEPARADOR, "/").replace("\r", " ").replace("\n", " ")
         return f"{self.get_id()}|{nombre_seguro}|{self.get_cantidad()}|{self.get_precio()}"
 
     @classmethod
@@ -70,6 +95,22 @@ class Producto:
             float(partes[3])
         )
 
+    # -------- Conversión para JSON (servidor HTTP) --------
+    def to_dict(self) -> dict:                                             #Convierte el objeto a un diccionario serializable.
+        return {
+            "id": self.get_id(),
+            "nombre": self.get_nombre(),
+            "cantidad": self.get_cantidad(),
+            "precio": self.get_precio(),
+        }
+
+    @classmethod
+    def from_dict(cls, datos: dict) -> "Producto":           #Crea un Producto a partir de un diccionario (p. ej. JSON recibido).
+        try:
+            return cls(datos["id"], datos["nombre"], datos["cantidad"], datos["precio"])
+        except (KeyError, TypeError):
+            raise ValueError("Faltan datos: se requieren id, nombre, cantidad y precio.")
+
     def __str__(self) -> str:             #Representación legible del producto para mostrar en consola.
         return (
             f"ID: {self.get_id()} | "
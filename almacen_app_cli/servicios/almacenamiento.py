@@ -0,0 +1,674 @@
+"""
+Módulo: almacenamiento.py
+
+Formas de guardar el inventario en disco (backends).
+Inventario no sabe cómo se guardan los datos: solo le pide a su almacenamiento
+
+- cargar()                          -> dict ID -> Producto (o un mapeo equivalente)
+- cargar_por_partes()               -> lo mismo de a partes, para mostrar algo antes de
+                                       terminar (Inventario(carga_diferida=True))
+- registrar(operaciones, productos) -> persiste operaciones CRUD sueltas
+- guardar_todo(productos)           -> guarda el inventario completo
+- cambios_externos()                -> operaciones guardadas por otro proceso
+                                       (None si hay que recargar todo)
+- bloqueo                           -> `with almacenamiento.bloqueo:` excluye a otros procesos
+- archivos()                        -> rutas de los archivos que ocupa (las métricas miden su tamaño)
+
+Cada operación es una tupla:
+    ("A", producto)                 alta
+    ("U", id, cantidad, precio)     actualización
+    ("D", id)                       baja
+
+Backends disponibles:
+- AlmacenamientoTxt: archivo id|nombre|cantidad|precio + diario (inventario.log).
+- AlmacenamientoSqlite: base SQLite (sqlite3 de la biblioteca estándar); cada
+  operación es una sola fila escrita.
+- AlmacenamientoBinario: foto binaria inventario.bin leída con mmap bajo demanda
+  + el mismo diario que el TXT.
+"""
+
+import gc
+import os
+import sqlite3
+import sys
+from collections.abc import MutableMapping
+from typing import Iterator, Optional
+from modelos.producto import Producto
+from servicios.bloqueo import BloqueoArchivo
+from servicios.formato_binario import (
+    ArchivoBinario, ProductosBinarios, escribir_binario,
+)
+
+
+# Carpeta registros/ de la aplicación (subiendo desde servicios/)
+RUTA_REGISTROS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "registros")
+
+# Tipos de almacenamiento que se pueden elegir desde main.py
+TIPOS_ALMACENAMIENTO = ("txt", "sqlite", "binario")
+
+
+# Crea el almacenamiento indicado por nombre ("txt", "sqlite" o "binario") con su ruta por defecto
+def crear_almacenamiento(tipo: str = "txt", ruta: str = None):
+    if tipo == "txt":
+        return AlmacenamientoTxt(ruta)
+
+    if tipo == "sqlite":
+        # Si la base es nueva se importan los datos del TXT existente
+        return AlmacenamientoSqlite(ruta, importar_de=os.path.join(RUTA_REGISTROS, "inventario.txt"))
+
+    if tipo == "binario":
+        return AlmacenamientoBinario(ruta, importar_de=os.path.join(RUTA_REGISTROS, "inventario.txt"))
+
+    raise ValueError(f"Almacenamiento desconocido: {tipo}")
+
+
+class AlmacenamientoTxt:
+    """
+    Persistencia en texto con diario (journal):
+    - inventario.txt es la "foto" (snapshot) completa, con el formato id|nombre|cantidad|precio.
+    - inventario.log guarda un registro por cada operación CRUD:
+        A|id|nombre|cantidad|precio   (alta)
+        U|id|cantidad|precio          (actualización)
+        D|id                          (baja)
+    - Al cargar se lee la foto y luego se "reproduce" el diario encima.
+    - Cada cierto número de registros el diario se compacta dentro de la foto.
+    - Para notar cambios de otros procesos se recuerda la firma de la foto
+      (fecha de modificación, tamaño, inodo) y hasta qué byte se leyó el diario.
+    """
+
+    # Cantidad de registros en el diario antes de compactarlo en la foto.
+    # Con inventarios grandes se espera al menos un registro por producto: reescribir
+    # la foto cuesta lo mismo que todos esos registros, así cada operación paga O(1).
+    COMPACTAR_CADA = 1000
+
+    # Tamaño de cada bloque leído al cargar la foto (4 MB)
+    TAMANO_BLOQUE = 4 * 1024 * 1024
+
+    # Carga por partes: la primera es chica (se ve algo enseguida) y cada una dobla
+    # a la anterior hasta TAMANO_BLOQUE
+    TAMANO_PRIMERA_PARTE = 64 * 1024
+
+    def __init__(self, ruta: str = None, usar_diario: bool = True, confiar_archivo: bool = False):
+        if ruta is None:
+            ruta = os.path.join(RUTA_REGISTROS, "inventario.txt")
+
+        self.ruta = ruta
+
+        # El diario vive junto a la foto: registros/inventario.log
+        self.usar_diario = usar_diario
+        self.ruta_diario = os.path.splitext(ruta)[0] + ".log"
+        self.__registros_diario = 0
+
+        # confiar_archivo=True omite la validación de cada fila al cargar (archivo propio)
+        self.confiar_archivo = confiar_archivo
+
+        # Líneas dañadas encontradas en la última carga (foto + diario)
+        self.lineas_invalidas = 0
+
+        # Bloqueo entre procesos (archivo inventario.txt.lock)
+        self.bloqueo = BloqueoArchivo(ruta + ".lock")
+
+        # Lo último que este proceso vio en disco
+        self.__firma_foto = None
+        self.__posicion_diario = 0
+
+    # Asegura que la carpeta y archivo existan antes de leer/escribir
+    def asegurar(self) -> None:
+        carpeta = os.path.dirname(self.ruta)
+
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta, exist_ok=True)
+
+        if not os.path.exists(self.ruta):
+            with open(self.ruta, "w", encoding="utf-8"):
+                pass
+
+    # -------- LECTURA --------
+    # Carga la foto y reproduce el diario encima
+    def cargar(self) -> MutableMapping[int, Producto]:
+        with self.bloqueo:
+            self.asegurar()
+            self.lineas_invalidas = 0
+            productos = self._leer_foto()
+            self.__firma_foto = self._firma(self.ruta)
+
+            # Se reproducen las operaciones pendientes del diario
+            self.__registros_diario = 0
+            self.__posicion_diario = 0
+            for operacion in self._leer_diario():
+                try:
+                    self._aplicar_operacion(operacion, productos)
+                    self.__registros_diario += 1
+                except ValueError:
+                    self.lineas_invalidas += 1
+
+        if self.lineas_invalidas:
+            print(f"Aviso: se ignoraron {self.lineas_invalidas} líneas inválidas al cargar.", file=sys.stderr)
+
+        return productos
+
+    # Igual que cargar(), pero entrega los productos de a partes (dict ID -> Producto)
+    # mientras lee la foto. El diario se lee primero y se aplica a cada parte, así
+    # lo entregado hasta el momento ya tiene los valores finales.
+    # Si un ID se repite en dos partes vale el de la primera (como en cargar()).
+    def cargar_por_partes(self) -> Iterator[dict[int, Producto]]:
+        with self.bloqueo:
+            self.asegurar()
+            self.lineas_invalidas = 0
+            self.__firma_foto = self._firma(self.ruta)
+
+            self.__posicion_diario = 0
+            operaciones = self._leer_diario()
+            self.__registros_diario = len(operaciones)
+            finales, al_final = self._plegar_diario(operaciones)
+
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                tamano = self.TAMANO_PRIMERA_PARTE
+                resto = ""
+
+                while True:
+                    bloque = f.read(tamano)
+                    if not bloque:
+                        break
+
+                    lineas = (resto + bloque).split("\n")
+                    resto = lineas.pop()
+                    yield self._parte(lineas, finales, al_final)
+                    tamano = min(tamano * 2, self.TAMANO_BLOQUE)
+
+                # Última parte: lo que quedaba y las altas del diario que no estaban en la foto
+                parte = self._parte([resto], finales, al_final)
+                for producto_id, operacion in finales.items():
+                    if operacion[0] == "A":
+                        parte[producto_id] = operacion[1]
+                yield parte
+
+        if self.lineas_invalidas:
+            print(f"Aviso: se ignoraron {self.lineas_invalidas} líneas inválidas al cargar.", file=sys.stderr)
+
+    # Resume el diario en la última operación de cada ID; las actualizaciones seguidas
+    # se juntan en ("U", id, [(cantidad, precio), ...]) para aplicarlas en orden.
+    # El orden del dict es el orden en que las altas nuevas quedan al final. Devuelve
+    # también los IDs borrados y dados de alta otra vez: van al final, no en su lugar de la foto.
+    def _plegar_diario(self, operaciones: list[tuple]) -> tuple[dict[int, tuple], set[int]]:
+        finales: dict[int, tuple] = {}
+        al_final: set[int] = set()
+
+        for operacion in operaciones:
+            tipo = operacion[0]
+            producto_id = operacion[1].get_id() if tipo == "A" else operacion[1]
+            anterior = finales.get(producto_id)
+
+            if tipo == "A":
+                if anterior is None or anterior[0] != "A":
+                    # El alta ocupa el lugar de ahora (como al insertar en un dict)
+                    finales.pop(producto_id, None)
+                    if anterior is not None and anterior[0] == "D":
+                        al_final.add(producto_id)
+                finales[producto_id] = operacion
+
+            elif tipo == "U":
+                if anterior is None:
+                    finales[producto_id] = ("U", producto_id, [operacion[2:]])
+                elif anterior[0] == "U":
+                    anterior[2].append(operacion[2:])
+                elif anterior[0] == "A":
+                    self._actualizar_valores(anterior[1], [operacion[2:]])
+
+            else:
+                finales[producto_id] = operacion
+
+        return finales, al_final
+
+    # Aplica actualizaciones (cantidad, precio) en orden; las inválidas se cuentan y se saltan
+    def _actualizar_valores(self, producto: Producto, valores: list[tuple]) -> None:
+        for cantidad, precio in valores:
+            try:
+                producto.set_cantidad(cantidad)
+                producto.set_precio(precio)
+            except ValueError:
+                self.lineas_invalidas += 1
+
+    # Convierte un bloque de líneas de la foto en una parte, ya con el diario aplicado
+    def _parte(self, lineas: list[str], finales: dict[int, tuple], al_final: set[int]) -> dict[int, Producto]:
+        parte: dict[int, Producto] = {}
+
+        gc_activo = gc.isenabled()
+        gc.disable()
+        try:
+            self.lineas_invalidas += self._cargar_lineas(lineas, parte)
+        finally:
+            if gc_activo:
+                gc.enable()
+
+        if not finales:
+            return parte
+
+        for producto_id in [i for i in parte if i in finales]:
+            operacion = finales[producto_id]
+
+            if operacion[0] == "D" or producto_id in al_final:
+                del parte[producto_id]
+                continue
+
+            # Las altas y actualizaciones se aplican una vez; las bajas siguen
+            # valiendo para un ID repetido más adelante en la foto
+            del finales[producto_id]
+
+            if operacion[0] == "A":
+                parte[producto_id] = operacion[1]
+            else:
+                self._actualizar_valores(parte[producto_id], operacion[2])
+
+        return parte
+
+    # Lee la foto en bloques grandes
+    def _leer_foto(self) -> MutableMapping[int, Producto]:
+        productos: dict[int, Producto] = {}
+
+        # Crear millones de objetos dispara el recolector de basura una y otra vez;
+        # durante la carga se pausa (no hay ciclos que recolectar)
+        gc_activo = gc.isenabled()
+        gc.disable()
+
+        try:
+            with open(self.ruta, "r", encoding="utf-8") as f:
+                resto = ""
+
+                while True:
+                    bloque = f.read(self.TAMANO_BLOQUE)
+                    if not bloque:
+                        break
+
+                    # La última línea del bloque puede estar incompleta: se guarda para el siguiente
+                    lineas = (resto + bloque).split("\n")
+                    resto = lineas.pop()
+                    self.lineas_invalidas += self._cargar_lineas(lineas, productos)
+
+                self.lineas_invalidas += self._cargar_lineas([resto], productos)
+        finally:
+            if gc_activo:
+                gc.enable()
+
+        return productos
+
+    # Convierte un bloque de líneas en productos; devuelve cuántas estaban dañadas
+    def _cargar_lineas(self, lineas: list[str], productos: dict[int, Producto]) -> int:
+        crear = Producto._sin_validar if self.confiar_archivo else Producto
+        separador = Producto.SEPARADOR
+        invalidas = 0
+
+        for linea in lineas:
+            partes = linea.split(separador)
+
+            if len(partes) != 4:
+                if linea.strip():
+                    invalidas += 1
+                continue
+
+            try:
+                producto = crear(int(partes[0]), partes[1].strip(), int(partes[2]), float(partes[3]))
+            except ValueError:
+                invalidas += 1
+                continue
+
+            # Si un ID aparece repetido se conserva el primero
+            if producto.get_id() not in productos:
+                productos[producto.get_id()] = producto
+
+        return invalidas
+
+    # Lee las operaciones del diario escritas desde la última lectura
+    def _leer_diario(self) -> list[tuple]:
+        try:
+            with open(self.ruta_diario, "rb") as f:
+                f.seek(self.__posicion_diario)
+                datos = f.read()
+        except FileNotFoundError:
+            return []
+
+        self.__posicion_diario += len(datos)
+        operaciones = []
+
+        for linea in datos.decode("utf-8", errors="replace").split("\n"):
+            if not linea.strip():
+                continue
+
+            try:
+                operaciones.append(self._operacion_de_linea(linea.strip()))
+            except ValueError:
+                # Una línea cortada (p. ej. por un corte de luz) se ignora
+                self.lineas_invalidas += 1
+
+        return operaciones
+
+    # Convierte una línea del diario en operación (lo inverso de _linea_diario)
+    @staticmethod
+    def _operacion_de_linea(linea: str) -> tuple:
+        tipo, _, resto = linea.partition(Producto.SEPARADOR)
+
+        if tipo == "A":
+            return ("A", Producto.from_linea(resto))
+
+        if tipo == "U":
+            producto_id, cantidad, precio = resto.split(Producto.SEPARADOR)
+            return ("U", int(producto_id), int(cantidad), float(precio))
+
+        if tipo == "D":
+            return ("D", int(resto))
+
+        raise ValueError("Registro de diario inválido.")
+
+    # Aplica una operación sobre los productos.
+    # Cada operación lleva el estado final, así repetirla no cambia el resultado.
+    @staticmethod
+    def _aplicar_operacion(operacion: tuple, productos: MutableMapping[int, Producto]) -> None:
+        tipo = operacion[0]
+
+        if tipo == "A":
+            productos[operacion[1].get_id()] = operacion[1]
+
+        elif tipo == "U":
+            _, producto_id, cantidad, precio = operacion
+            producto = productos.get(producto_id)
+            if producto is not None:
+                producto.set_cantidad(cantidad)
+                producto.set_precio(precio)
+
+        elif tipo == "D":
+            productos.pop(operacion[1], None)
+
+    # Identifica una versión del archivo: cambia cada vez que otro proceso lo reescribe
+    @staticmethod
+    def _firma(ruta: str) -> Optional[tuple]:
+        try:
+            datos = os.stat(ruta)
+        except FileNotFoundError:
+            return None
+
+        return (datos.st_mtime_ns, datos.st_size, datos.st_ino)
+
+    # Operaciones que otros procesos agregaron al diario desde la última lectura.
+    # None si la foto cambió (alguien compactó o guardó todo): hay que recargar.
+    def cambios_externos(self) -> Optional[list[tuple]]:
+        with self.bloqueo:
+            if self._firma(self.ruta) != self.__firma_foto:
+                return None
+
+            operaciones = self._leer_diario()
+            self.__registros_diario += len(operaciones)
+            return operaciones
+
+    # -------- ESCRITURA --------
+    # Convierte una operación en su línea del diario
+    @staticmethod
+    def _linea_diario(operacion: tuple) -> str:
+        tipo = operacion[0]
+
+        if tipo == "A":
+            return "A|" + operacion[1].to_linea()
+
+        if tipo == "U":
+            _, producto_id, cantidad, precio = operacion
+            return f"U|{producto_id}|{cantidad}|{precio}"
+
+        return f"D|{operacion[1]}"
+
+    # Escribe las operaciones en el diario o, sin diario, la foto completa
+    def registrar(self, operaciones: list[tuple], productos: MutableMapping[int, Producto]) -> None:
+        with self.bloqueo:
+            if not self.usar_diario:
+                self.guardar_todo(productos)
+                return
+
+            with open(self.ruta_diario, "ab") as f:
+                inicio = f.tell()
+                f.write(("\n".join(self._linea_diario(op) for op in operaciones) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+                # Si nadie escribió desde la última lectura, lo escrito ya está "leído"
+                if inicio == self.__posicion_diario:
+                    self.__posicion_diario = f.tell()
+
+            self.__registros_diario += len(operaciones)
+
+            # Compactación periódica para que el diario no crezca sin límite
+            if self.__registros_diario >= max(self.COMPACTAR_CADA, len(productos)):
+                self.guardar_todo(productos)
+
+    # Guarda todos los productos en la foto (compacta el diario)
+    def guardar_todo(self, productos: MutableMapping[int, Producto]) -> None:
+        with self.bloqueo:
+            self.asegurar()
+            self._escribir_foto(productos)
+            self.__firma_foto = self._firma(self.ruta)
+
+            # La foto ya contiene todo lo que tenía el diario
+            if os.path.exists(self.ruta_diario):
+                with open(self.ruta_diario, "w", encoding="utf-8"):
+                    pass
+            self.__registros_diario = 0
+            self.__posicion_diario = 0
+
+    # Se escribe en un temporal y se reemplaza: nunca queda una foto a medias
+    def _escribir_foto(self, productos: MutableMapping[int, Producto]) -> None:
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for p in tuple(productos.values()):
+                f.write(p.to_linea() + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.ruta)
+
+    def archivos(self) -> list[str]:
+        return [self.ruta, self.ruta_diario]
+
+    def cerrar(self) -> None:
+        pass
+
+
+class AlmacenamientoBinario(AlmacenamientoTxt):
+    """
+    Igual que AlmacenamientoTxt (mismo diario y compactación), pero la foto es
+    inventario.bin (servicios/formato_binario.py):
+    - Al cargar no se lee el archivo entero: se abre con mmap y cada Producto se
+      crea cuando se pide (buscar_por_id, una página de la tabla, ...).
+    - El diario se guarda en inventario.bin.log.
+    """
+
+    def __init__(self, ruta: str = None, importar_de: str = None):
+        if ruta is None:
+            ruta = os.path.join(RUTA_REGISTROS, "inventario.bin")
+
+        super().__init__(ruta)
+        self.ruta_diario = ruta + ".log"
+        self.importar_de = importar_de
+        self.__productos: Optional[ProductosBinarios] = None
+
+    def asegurar(self) -> None:
+        carpeta = os.path.dirname(self.ruta)
+
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta, exist_ok=True)
+
+        if os.path.exists(self.ruta):
+            return
+
+        # Migración: el archivo binario nuevo toma los datos del TXT anterior
+        # (foto + diario, como SQLite: lo que aún está en el .log también cuenta)
+        if self.importar_de and os.path.exists(self.importar_de):
+            escribir_binario(AlmacenamientoTxt(self.importar_de).cargar().values(), self.ruta)
+        else:
+            escribir_binario((), self.ruta)
+
+    # Con mmap la carga ya es inmediata: una sola parte
+    def cargar_por_partes(self) -> Iterator[MutableMapping[int, Producto]]:
+        yield self.cargar()
+
+    def _leer_foto(self) -> MutableMapping[int, Producto]:
+        # El mapeo anterior se cierra solo cuando nadie lo usa
+        self.__productos = ProductosBinarios(ArchivoBinario(self.ruta))
+        return self.__productos
+
+    def _escribir_foto(self, productos: MutableMapping[int, Producto]) -> None:
+        temporal = self.ruta + ".tmp"
+        escribir_binario(productos.values(), temporal)
+
+        # En Windows un archivo abierto con mmap no se puede reemplazar
+        anterior = productos.archivo if isinstance(productos, ProductosBinarios) else None
+        if anterior is not None and os.name == "nt":
+            anterior.cerrar()
+
+        os.replace(temporal, self.ruta)
+
+        # Los productos pasan a leerse del archivo nuevo
+        if anterior is not None:
+            productos.reabrir(ArchivoBinario(self.ruta))
+            anterior.cerrar()
+
+    def cerrar(self) -> None:
+        if self.__productos is not None:
+            self.__productos.archivo.cerrar()
+
+
+class AlmacenamientoSqlite:
+    """
+    Persistencia en SQLite:
+    - Tabla productos(id, nombre, cantidad, precio) con índice por nombre
+      (id es la clave primaria, ya indexada).
+    - Modo WAL: las escrituras no bloquean a los lectores y cada cambio es pequeño.
+    - Cada operación CRUD se traduce en un solo INSERT/UPDATE/DELETE con
+      parámetros (sqlite3 reutiliza las sentencias preparadas).
+    """
+
+    INSERTAR = "INSERT OR REPLACE INTO productos (id, nombre, cantidad, precio) VALUES (?, ?, ?, ?)"
+    ACTUALIZAR = "UPDATE productos SET cantidad = ?, precio = ? WHERE id = ?"
+    ELIMINAR = "DELETE FROM productos WHERE id = ?"
+
+    def __init__(self, ruta: str = None, importar_de: str = None):
+        if ruta is None:
+            ruta = os.path.join(RUTA_REGISTROS, "inventario.db")
+
+        self.ruta = ruta
+        self.importar_de = importar_de
+        self.lineas_invalidas = 0
+        self.__conexion = None
+
+        # SQLite ya protege cada escritura; el bloqueo extra ordena el ciclo
+        # "leer cambios ajenos -> modificar -> escribir" de Inventario entre procesos
+        self.bloqueo = BloqueoArchivo(ruta + ".lock")
+
+        # PRAGMA data_version cambia cuando otra conexión modifica la base
+        self.__version = None
+
+    # Abre la base (y crea la tabla) la primera vez que se usa
+    def asegurar(self) -> sqlite3.Connection:
+        if self.__conexion is not None:
+            return self.__conexion
+
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta, exist_ok=True)
+
+        nueva = not os.path.exists(self.ruta)
+
+        # check_same_thread=False: la UI escribe desde su hilo de fondo (siempre uno a la vez)
+        conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.execute("PRAGMA synchronous=NORMAL")
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS productos ("
+            " id INTEGER PRIMARY KEY CHECK (id > 0),"
+            " nombre TEXT NOT NULL CHECK (length(trim(nombre)) > 0),"
+            " cantidad INTEGER NOT NULL CHECK (cantidad >= 0),"
+            " precio REAL NOT NULL CHECK (precio >= 0))"
+        )
+        conexion.execute("CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos (nombre)")
+        conexion.commit()
+        self.__conexion = conexion
+
+        # Migración: una base recién creada toma los datos del TXT anterior
+        if nueva and self.importar_de and os.path.exists(self.importar_de):
+            self._reemplazar_todo(AlmacenamientoTxt(self.importar_de).cargar())
+
+        return conexion
+
+    def cargar(self) -> dict[int, Producto]:
+        with self.bloqueo:
+            conexion = self.asegurar()
+            filas = conexion.execute("SELECT id, nombre, cantidad, precio FROM productos ORDER BY id")
+
+            # Las restricciones CHECK de la tabla ya validaron cada fila
+            productos = {fila[0]: Producto._sin_validar(*fila) for fila in filas}
+            self.__version = self._version()
+
+        return productos
+
+    # Filas por parte en cargar_por_partes
+    FILAS_POR_PARTE = 50_000
+
+    # Igual que cargar(), de a FILAS_POR_PARTE filas (la primera parte llega enseguida)
+    def cargar_por_partes(self) -> Iterator[dict[int, Producto]]:
+        with self.bloqueo:
+            conexion = self.asegurar()
+            self.__version = self._version()
+            cursor = conexion.execute("SELECT id, nombre, cantidad, precio FROM productos ORDER BY id")
+
+            while True:
+                filas = cursor.fetchmany(self.FILAS_POR_PARTE)
+                if not filas:
+                    break
+                yield {fila[0]: Producto._sin_validar(*fila) for fila in filas}
+
+    def _version(self) -> int:
+        return self.asegurar().execute("PRAGMA data_version").fetchone()[0]
+
+    # La base no guarda qué cambió: si otro proceso escribió, se recarga todo
+    def cambios_externos(self) -> Optional[list[tuple]]:
+        with self.bloqueo:
+            return None if self._version() != self.__version else []
+
+    def registrar(self, operaciones: list[tuple], productos: dict[int, Producto]) -> None:
+        conexion = self.asegurar()
+
+        # Todas las operaciones en una sola transacción
+        with self.bloqueo, conexion:
+            for operacion in operaciones:
+                tipo = operacion[0]
+
+                if tipo == "A":
+                    p = operacion[1]
+                    conexion.execute(self.INSERTAR, (p.get_id(), p.get_nombre(), p.get_cantidad(), p.get_precio()))
+
+                elif tipo == "U":
+                    _, producto_id, cantidad, precio = operacion
+                    conexion.execute(self.ACTUALIZAR, (cantidad, precio, producto_id))
+
+                elif tipo == "D":
+                    conexion.execute(self.ELIMINAR, (operacion[1],))
+
+    # Cada operación ya quedó escrita: guardar todo solo vuelca el WAL en la base principal
+    def guardar_todo(self, productos: dict[int, Producto]) -> None:
+        conexion = self.asegurar()
+        conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # Reemplaza todo el contenido de la tabla (migración desde TXT)
+    def _reemplazar_todo(self, productos: dict[int, Producto]) -> None:
+        conexion = self.__conexion
+
+        with conexion:
+            conexion.execute("DELETE FROM productos")
+            conexion.executemany(
+                self.INSERTAR,
+                ((p.get_id(), p.get_nombre(), p.get_cantidad(), p.get_precio()) for p in productos.values())
+            )
+
+    # Con WAL los cambios se escriben primero en inventario.db-wal
+    def archivos(self) -> list[str]:
+        return [self.ruta, self.ruta + "-wal"]
+
+    def cerrar(self) -> None:
+        if self.__conexion is not None:
+            self.__conexion.close()
+            self.__conexion = None
@@ -0,0 +1,128 @@
+"""
+Módulo: autoguardado.py
+
+Cuándo se escriben en disco las modificaciones del inventario (PoliticaGuardado)
+y el temporizador que guarda tras un rato sin cambios.
+
+Por defecto cada modificación se guarda al terminar (diario + fsync, o una
+transacción en SQLite). Con otra política el Inventario junta los cambios en
+memoria y los escribe todos juntos, en una sola escritura:
+- al juntar `cada` cambios,
+- tras `inactividad_ms` milisegundos sin cambios,
+- o a pedido: volcar(), guardar_en_archivo() y cerrar().
+
+Lo que se gana es velocidad (100 ediciones seguidas = 1 escritura en vez de 100);
+lo que se paga es la ventana de durabilidad: si el programa se corta, se pierde
+lo que todavía no se guardó. describir() la explica en una frase.
+"""
+
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+
+class PoliticaGuardado(NamedTuple):
+    """
+    cada            se guarda al juntar tantos cambios (1 = cada cambio, 0 = sin límite)
+    inactividad_ms  también se guarda tras tantos milisegundos sin cambios (None = no)
+    """
+
+    cada: int = 1
+    inactividad_ms: Optional[int] = None
+
+    # Cada cambio se guarda al terminar (lo de siempre: no hay nada pendiente)
+    @property
+    def inmediata(self) -> bool:
+        return self.cada == 1
+
+    # Hace falta el hilo que guarda tras la inactividad (con guardado inmediato, no)
+    @property
+    def con_temporizador(self) -> bool:
+        return not self.inmediata and self.inactividad_ms is not None
+
+    def validar(self) -> None:
+        if self.cada < 0:
+            raise ValueError("La cantidad de cambios por guardado debe ser >= 0.")
+        if self.inactividad_ms is not None and self.inactividad_ms <= 0:
+            raise ValueError("La espera sin cambios debe ser mayor que 0 ms.")
+
+    # Ventana de durabilidad: cuándo se guarda y qué se pierde si el programa se corta
+    def describir(self) -> str:
+        if self.inmediata:
+            return "Guardado: cada cambio se escribe en disco al instante (no se pierde nada si el programa se corta)."
+
+        cuando = []
+        if self.cada > 1:
+            cuando.append(f"cada {self.cada} cambios")
+        if self.inactividad_ms is not None:
+            cuando.append(f"tras {self.inactividad_ms} ms sin cambios")
+        cuando.append("al guardar y al salir")
+
+        # Con cambios seguidos (sin pausas) el temporizador nunca vence: lo que acota
+        # la pérdida es la cantidad
+        if self.cada > 1:
+            perdida = f"se pierden a lo sumo los últimos {self.cada - 1} cambios"
+        elif self.inactividad_ms is not None:
+            perdida = f"se pierden los cambios hechos desde la última pausa de {self.inactividad_ms} ms"
+        else:
+            perdida = "se pierde todo lo que no se guardó"
+
+        return f"Guardado: {', '.join(cuando)}; si el programa se corta {perdida}."
+
+
+class Temporizador:
+    """
+    Hilo que llama a `accion` cuando pasan `segundos` desde el último tocar().
+    Cada cambio solo anota una hora de vencimiento (sin crear hilos ni timers).
+    """
+
+    def __init__(self, segundos: float, accion: Callable[[], object]):
+        self.segundos = segundos
+        self.__accion = accion
+
+        self.__condicion = threading.Condition()
+        self.__vence: Optional[float] = None
+        self.__detenido = False
+
+        self.__hilo = threading.Thread(target=self._correr, name="autoguardado", daemon=True)
+        self.__hilo.start()
+
+    # Hubo un cambio: la cuenta vuelve a empezar
+    def tocar(self) -> None:
+        with self.__condicion:
+            dormido = self.__vence is None
+            self.__vence = time.monotonic() + self.segundos
+            if dormido:
+                self.__condicion.notify()
+
+    # Termina el hilo (si está guardando, espera a que termine)
+    def detener(self) -> None:
+        with self.__condicion:
+            self.__detenido = True
+            self.__condicion.notify()
+
+        if self.__hilo is not threading.current_thread():
+            self.__hilo.join()
+
+    def _correr(self) -> None:
+        while True:
+            with self.__condicion:
+                while not self.__detenido:
+                    if self.__vence is None:
+                        self.__condicion.wait()
+                        continue
+
+                    restante = self.__vence - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self.__condicion.wait(restante)
+
+                if self.__detenido:
+                    return
+                self.__vence = None
+
+            # Fuera de la condición: mientras se guarda, los cambios pueden seguir tocando
+            try:
+                self.__accion()
+            except Exception as e:
+                print(f"Error al guardar: {e}")
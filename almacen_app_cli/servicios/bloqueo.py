@@ -0,0 +1,199 @@
+"""
+Módulo: bloqueo.py
+
+Clases BloqueoArchivo, BloqueoLecturaEscritura y SinBloqueo.
+
+BloqueoArchivo: bloqueo exclusivo entre procesos sobre un archivo auxiliar (inventario.txt.lock).
+
+Si la consola y la ventana Tkinter usan el mismo inventario a la vez, cada una
+debe esperar a que la otra termine de escribir. El bloqueo es "advisory": solo
+lo respetan los procesos que también lo piden (los de esta aplicación).
+
+- Linux / macOS: fcntl.flock
+- Windows: msvcrt.locking
+El bloqueo es reentrante: dentro de un `with bloqueo:` se puede volver a pedir.
+
+BloqueoLecturaEscritura: entre hilos de un mismo proceso (Inventario multihilo).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class BloqueoArchivo:
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.__archivo = None
+        self.__nivel = 0
+
+        # También ordena a los hilos del mismo proceso
+        self.__hilos = threading.RLock()
+
+    def __enter__(self) -> "BloqueoArchivo":
+        self.__hilos.acquire()
+
+        if self.__nivel == 0:
+            try:
+                self._bloquear()
+            except BaseException:
+                self.__hilos.release()
+                raise
+
+        self.__nivel += 1
+        return self
+
+    def __exit__(self, *error) -> None:
+        self.__nivel -= 1
+
+        try:
+            if self.__nivel == 0:
+                self._desbloquear()
+        finally:
+            self.__hilos.release()
+
+    def _bloquear(self) -> None:
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta, exist_ok=True)
+
+        archivo = open(self.ruta, "a+b")
+
+        try:
+            if fcntl is not None:
+                # Espera hasta que ningún otro proceso tenga el bloqueo
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+            else:
+                # msvcrt.locking reintenta unos segundos y luego falla: se sigue esperando
+                archivo.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(archivo.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(0.05)
+        except BaseException:
+            archivo.close()
+            raise
+
+        self.__archivo = archivo
+
+    def _desbloquear(self) -> None:
+        archivo, self.__archivo = self.__archivo, None
+
+        try:
+            if fcntl is not None:
+                fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+            else:
+                archivo.seek(0)
+                msvcrt.locking(archivo.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            archivo.close()
+
+
+class BloqueoLecturaEscritura:
+    """
+    Bloqueo entre hilos del mismo proceso: muchos lectores a la vez o un solo escritor.
+
+    - lectura(): varios hilos pueden leer al mismo tiempo.
+    - escritura(): espera a que terminen los lectores y no deja entrar a nadie más.
+    - Si hay un escritor esperando, los lectores nuevos esperan (el escritor no se queda
+      esperando para siempre).
+    - El hilo que escribe puede volver a leer o escribir (reentrante); un hilo que
+      está leyendo no puede pasar a escribir.
+    """
+
+    def __init__(self):
+        self.__condicion = threading.Condition(threading.Lock())
+        self.__lectores = 0
+        self.__escritores_esperando = 0
+
+        # Hilo que tiene la escritura
+        self.__escritor = None
+
+        # Lecturas anidadas de cada hilo
+        self.__local = threading.local()
+
+    # Se usa como `with bloqueo.lectura():`. Es la operación más frecuente, por eso
+    # lectura() devuelve el propio objeto en vez de un generador (@contextmanager).
+    def lectura(self) -> "BloqueoLecturaEscritura":
+        return self
+
+    def __enter__(self) -> None:
+        # El escritor ya tiene acceso exclusivo
+        if self.__escritor == threading.get_ident():
+            return
+
+        local = self.__local
+        nivel = getattr(local, "nivel", 0)
+
+        if nivel == 0:
+            with self.__condicion:
+                while self.__escritor is not None or self.__escritores_esperando:
+                    self.__condicion.wait()
+                self.__lectores += 1
+
+        local.nivel = nivel + 1
+
+    def __exit__(self, *error) -> None:
+        if self.__escritor == threading.get_ident():
+            return
+
+        local = self.__local
+        local.nivel -= 1
+
+        if local.nivel == 0:
+            with self.__condicion:
+                self.__lectores -= 1
+                if self.__lectores == 0:
+                    self.__condicion.notify_all()
+
+    @contextmanager
+    def escritura(self):
+        yo = threading.get_ident()
+
+        # Escritura anidada: ya la tiene este hilo
+        if self.__escritor == yo:
+            yield
+            return
+
+        if getattr(self.__local, "nivel", 0):
+            raise RuntimeError("No se puede escribir mientras este hilo está leyendo.")
+
+        with self.__condicion:
+            self.__escritores_esperando += 1
+            try:
+                while self.__escritor is not None or self.__lectores:
+                    self.__condicion.wait()
+            finally:
+                self.__escritores_esperando -= 1
+
+            self.__escritor = yo
+
+        try:
+            yield
+        finally:
+            with self.__condicion:
+                self.__escritor = None
+                self.__condicion.notify_all()
+
+
+class SinBloqueo:
+    """Misma interfaz que BloqueoLecturaEscritura, sin costo (un solo hilo)."""
+
+    def __init__(self):
+        self.__nulo = nullcontext()
+
+    def lectura(self):
+        return self.__nulo
+
+    def escritura(self):
+        return self.__nulo
@@ -0,0 +1,194 @@
+"""
+Módulo: comandos.py
+
+Operaciones del inventario descritas como datos ({"op": ..., ...}), para usarlas
+sin el menú interactivo: desde scripts (python main.py lote < cambios.txt) y desde
+el servidor HTTP (servicios/servidor_http.py).
+
+Operaciones:
+    {"op": "agregar", "id", "nombre", "cantidad", "precio"}
+    {"op": "actualizar", "id", "cantidad"?, "precio"?}     (None o ausente = sin cambio)
+    {"op": "eliminar", "id"}
+    {"op": "entrada", "id", "unidades"}                    (suma unidades al stock)
+    {"op": "salida", "id", "unidades"}                     (resta; error si no alcanza)
+    {"op": "obtener", "id"}
+    {"op": "buscar", "nombre"}
+
+Cada línea de entrada puede ser JSON (como arriba) o texto separado por "|",
+igual que el archivo del inventario:
+    agregar|12|Pan integral|5|1.50
+    actualizar|12|8|          (campo vacío = sin cambio)
+    eliminar|12
+    entrada|12|30
+    salida|12|4
+    obtener|12
+    buscar|pan
+También se aceptan los nombres en inglés (add, update, delete, in, out, get, search).
+
+Las líneas se procesan de a bloques: cada bloque se aplica en una sola transacción
+(un solo registro en el diario) y sus resultados se entregan apenas termina, así la
+memoria no depende del largo de la entrada y la salida va apareciendo mientras se lee.
+"""
+
+import json
+from http import HTTPStatus
+from itertools import islice
+from typing import Iterable, Iterator
+from modelos.producto import Producto
+
+
+# Comandos aplicados por transacción
+TAMANO_BLOQUE = 1000
+
+# Nombres alternativos de cada operación
+ALIAS = {
+    "add": "agregar",
+    "update": "actualizar",
+    "delete": "eliminar",
+    "in": "entrada",
+    "out": "salida",
+    "get": "obtener",
+    "search": "buscar",
+}
+
+
+# -------- APLICAR --------
+# Lee un campo numérico opcional (None = no cambiar)
+def _campo(datos: dict, nombre: str):
+    valor = datos.get(nombre)
+    if valor is not None and (isinstance(valor, bool) or not isinstance(valor, (int, float))):
+        raise ValueError(f"'{nombre}' debe ser un número.")
+    return valor
+
+
+# Aplica una operación sobre el inventario; devuelve (estado, respuesta).
+# Los errores se devuelven, no se lanzan: así no deshacen el resto de la transacción.
+# Los de datos son 400; cualquier otro fallo de la línea, 500 (solo para esa línea).
+def aplicar_operacion(inventario, datos: dict) -> tuple[int, dict]:
+    try:
+        if not isinstance(datos, dict):
+            raise ValueError("Cada operación debe ser un objeto JSON.")
+
+        op = datos.get("op")
+        if not isinstance(op, str):
+            raise ValueError("'op' debe ser un texto.")
+        op = ALIAS.get(op, op)
+
+        if op == "agregar":
+            producto = Producto.from_dict(datos)
+            if not inventario.agregar_producto(producto):
+                return HTTPStatus.CONFLICT, {"error": "El ID ya existe."}
+            return HTTPStatus.CREATED, producto.to_dict()
+
+        if op == "buscar":
+            texto = datos.get("nombre")
+            if not isinstance(texto, str):
+                raise ValueError("'nombre' debe ser un texto.")
+            return HTTPStatus.OK, {"productos": [p.to_dict() for p in inventario.buscar_por_nombre(texto)]}
+
+        producto_id = datos.get("id")
+        if isinstance(producto_id, bool) or not isinstance(producto_id, int):
+            raise ValueError("'id' debe ser un entero.")
+
+        if op == "actualizar":
+            cantidad, precio = _campo(datos, "cantidad"), _campo(datos, "precio")
+            if not inventario.actualizar_producto(producto_id, cantidad, precio):
+                return HTTPStatus.NOT_FOUND, {"error": "No existe producto con ese ID."}
+            return HTTPStatus.OK, inventario.buscar_por_id(producto_id).to_dict()
+
+        if op == "eliminar":
+            if not inventario.eliminar_producto(producto_id):
+                return HTTPStatus.NOT_FOUND, {"error": "No existe producto con ese ID."}
+            return HTTPStatus.OK, {"eliminado": producto_id}
+
+        if op in ("entrada", "salida"):
+            unidades = datos.get("unidades")
+            movimiento = inventario.entrada if op == "entrada" else inventario.salida
+            if not movimiento(producto_id, unidades):
+                return HTTPStatus.NOT_FOUND, {"error": "No existe producto con ese ID."}
+            return HTTPStatus.OK, inventario.buscar_por_id(producto_id).to_dict()
+
+        if op == "obtener":
+            producto = inventario.buscar_por_id(producto_id)
+            if producto is None:
+                return HTTPStatus.NOT_FOUND, {"error": "No encontrado."}
+            return HTTPStatus.OK, producto.to_dict()
+
+        raise ValueError(f"Operación desconocida: {op!r}.")
+
+    except (ValueError, TypeError) as e:
+        return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+    except Exception as e:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Error interno: {e}"}
+
+
+# -------- LEER --------
+# Convierte una línea (JSON o texto con "|") en una operación; ValueError si no se entiende
+def leer_comando(linea: str) -> dict:
+    linea = linea.strip()
+
+    if linea.startswith("{"):
+        try:
+            return json.loads(linea)
+        except ValueError:
+            raise ValueError("JSON inválido.")
+
+    partes = linea.split(Producto.SEPARADOR)
+    op = ALIAS.get(partes[0].strip().lower(), partes[0].strip().lower())
+    campos = partes[1:]
+
+    def numero(texto: str, tipo):
+        texto = texto.strip()
+        if not texto:
+            return None
+        try:
+            return tipo(texto)
+        except ValueError:
+            raise ValueError(f"Número inválido: {texto!r}.")
+
+    if op == "agregar" and len(campos) == 4:
+        return {"op": op, "id": numero(campos[0], int), "nombre": campos[1],
+                "cantidad": numero(campos[2], int), "precio": numero(campos[3], float)}
+
+    if op == "actualizar" and len(campos) in (2, 3):
+        precio = numero(campos[2], float) if len(campos) == 3 else None
+        return {"op": op, "id": numero(campos[0], int), "cantidad": numero(campos[1], int), "precio": precio}
+
+    if op in ("entrada", "salida") and len(campos) == 2:
+        return {"op": op, "id": numero(campos[0], int), "unidades": numero(campos[1], int)}
+
+    if op in ("eliminar", "obtener") and len(campos) == 1:
+        return {"op": op, "id": numero(campos[0], int)}
+
+    if op == "buscar" and len(campos) == 1:
+        return {"op": op, "nombre": campos[0]}
+
+    raise ValueError(f"Comando inválido: {linea!r}.")
+
+
+# -------- EJECUTAR --------
+# Aplica las líneas de a bloques y entrega un resultado por línea (sin contar las vacías):
+# {"linea": n, "estado": 200, ...respuesta}
+def ejecutar_comandos(inventario, lineas: Iterable[str], tamano: int = TAMANO_BLOQUE) -> Iterator[dict]:
+    numeradas = ((n, linea) for n, linea in enumerate(lineas, start=1) if linea.strip())
+
+    while True:
+        bloque = list(islice(numeradas, tamano))
+        if not bloque:
+            return
+
+        resultados = []
+        with inventario.transaccion():
+            for numero, linea in bloque:
+                try:
+                    estado, respuesta = aplicar_operacion(inventario, leer_comando(linea))
+                except (ValueError, TypeError) as e:
+                    estado, respuesta = HTTPStatus.BAD_REQUEST, {"error": str(e)}
+                except Exception as e:
+                    estado, respuesta = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Error interno: {e}"}
+
+                resultados.append({"linea": numero, "estado": int(estado), **respuesta})
+
+        # Se entregan después de guardar el bloque
+        yield from resultados
+
@@ -0,0 +1,106 @@
+"""
+Módulo: indice_nombres.py
+
+Clase IndiceNombres.
+Índice invertido de trigramas para buscar productos por parte del nombre.
+
+- Cada nombre se normaliza una sola vez (minúsculas y sin tildes: "Pantalón" -> "pantalon").
+- Cada trigrama ("pan", "ant", "nta", ...) apunta al conjunto de IDs que lo contienen.
+- Una búsqueda solo revisa los IDs que comparten todos los trigramas del texto buscado.
+"""
+
+import unicodedata
+
+
+# Quita tildes y pasa a minúsculas para comparar nombres
+def normalizar(texto: str) -> str:
+    texto = texto.strip()
+
+    # Camino rápido: un texto ASCII no tiene tildes que quitar
+    if texto.isascii():
+        return texto.lower()
+
+    descompuesto = unicodedata.normalize("NFD", texto)
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_tildes.casefold()
+
+
+class IndiceNombres:
+
+    # Largo de cada fragmento del índice
+    N = 3
+
+    def __init__(self):
+        # ID -> nombre normalizado (caché para no normalizar en cada búsqueda)
+        self.__nombres: dict[int, str] = {}
+
+        # ID -> posición de inserción, para devolver resultados en el orden del inventario
+        self.__posiciones: dict[int, int] = {}
+        self.__siguiente = 0
+
+        # Trigrama -> IDs que lo contienen
+        self.__gramas: dict[str, set[int]] = {}
+
+    # Trigramas distintos de un texto ya normalizado
+    def _gramas(self, texto: str) -> set[str]:
+        return {texto[i:i + self.N] for i in range(len(texto) - self.N + 1)}
+
+    # Registra el nombre de un producto
+    def agregar(self, producto_id: int, nombre: str) -> None:
+        anterior = self.__nombres.get(producto_id)
+
+        # Si ya estaba (p. ej. al reproducir el diario) conserva su posición
+        if anterior is None:
+            self.__posiciones[producto_id] = self.__siguiente
+            self.__siguiente += 1
+        else:
+            self._quitar_gramas(producto_id, anterior)
+
+        normalizado = normalizar(nombre)
+        self.__nombres[producto_id] = normalizado
+
+        for grama in self._gramas(normalizado):
+            self.__gramas.setdefault(grama, set()).add(producto_id)
+
+    # Elimina un producto del índice
+    def quitar(self, producto_id: int) -> None:
+        normalizado = self.__nombres.pop(producto_id, None)
+        if normalizado is None:
+            return
+
+        del self.__posiciones[producto_id]
+        self._quitar_gramas(producto_id, normalizado)
+
+    def _quitar_gramas(self, producto_id: int, normalizado: str) -> None:
+        for grama in self._gramas(normalizado):
+            ids = self.__gramas.get(grama)
+            if ids is not None:
+                ids.discard(producto_id)
+                if not ids:
+                    del self.__gramas[grama]
+
+    # Devuelve los IDs cuyo nombre contiene el texto (coincidencia parcial)
+    def buscar(self, texto: str) -> list[int]:
+        consulta = normalizar(texto)
+
+        # Textos más cortos que un trigrama: recorrido sobre los nombres ya normalizados
+        if len(consulta) < self.N:
+            return [pid for pid, nombre in self.__nombres.items() if consulta in nombre]
+
+        # Se intersecan los conjuntos empezando por el más pequeño
+        conjuntos = sorted((self.__gramas.get(g, set()) for g in self._gramas(consulta)), key=len)
+        if not conjuntos[0]:
+            return []
+
+        candidatos = conjuntos[0].intersection(*conjuntos[1:])
+
+        # Los trigramas pueden estar en otro orden: se confirma la subcadena completa
+        encontrados = [pid for pid in candidatos if consulta in self.__nombres[pid]]
+        encontrados.sort(key=self.__posiciones.__getitem__)
+        return encontrados
+
+    # Filtra IDs ya conocidos (p. ej. resultados de una búsqueda anterior) con un texto nuevo
+    def filtrar(self, ids: list[int], texto: str) -> list[int]:
+        consulta = normalizar(texto)
+        nombres = self.__nombres
+        return [pid for pid in ids if consulta in nombres.get(pid, "")]
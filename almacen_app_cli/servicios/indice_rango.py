@@ -0,0 +1,56 @@
+"""
+Módulo: indice_rango.py
+
+Clase IndiceOrdenado.
+Índice secundario ordenado por un valor numérico (cantidad o precio) para
+consultas por rango, por ejemplo "precio entre 10 y 20" o "menos de 10 unidades".
+
+- Guarda pares (valor, id) en una lista ordenada; las búsquedas usan bisect (O(log n)).
+- Un diccionario id -> valor permite mover un producto cuando su valor cambia.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from math import inf
+from typing import Iterable, Optional
+
+
+class IndiceOrdenado:
+
+    def __init__(self, pares: Iterable[tuple[int, float]] = ()):
+        # ID -> valor actual
+        self.__valores: dict[int, float] = dict(pares)
+
+        # Pares (valor, id) ordenados; el id desempata valores iguales
+        self.__orden: list[tuple[float, int]] = sorted((v, pid) for pid, v in self.__valores.items())
+
+    # Inserta o mueve un producto a su nuevo valor
+    def poner(self, producto_id: int, valor: float) -> None:
+        anterior = self.__valores.get(producto_id)
+
+        if anterior is not None:
+            if anterior == valor:
+                return
+            self._sacar(anterior, producto_id)
+
+        self.__valores[producto_id] = valor
+        insort(self.__orden, (valor, producto_id))
+
+    # Elimina un producto del índice
+    def quitar(self, producto_id: int) -> None:
+        valor = self.__valores.pop(producto_id, None)
+        if valor is not None:
+            self._sacar(valor, producto_id)
+
+    def _sacar(self, valor: float, producto_id: int) -> None:
+        del self.__orden[bisect_left(self.__orden, (valor, producto_id))]
+
+    # IDs con minimo <= valor <= maximo, de menor a mayor valor (None = sin límite)
+    def rango(self, minimo: Optional[float] = None, maximo: Optional[float] = None) -> list[int]:
+        inicio = 0 if minimo is None else bisect_left(self.__orden, (minimo,))
+        fin = len(self.__orden) if maximo is None else bisect_right(self.__orden, (maximo, inf))
+        return [pid for _, pid in self.__orden[inicio:fin]]
+
+    # IDs con valor estrictamente menor que el límite
+    def menores_que(self, limite: float) -> list[int]:
+        fin = bisect_left(self.__orden, (limite,))
+        return [pid for _, pid in self.__orden[:fin]]
@@ -0,0 +1,356 @@
+"""
+Módulo: intercambio.py
+
+Importar y exportar el inventario en CSV y JSON Lines (además del formato propio
+id|nombre|cantidad|precio, que cambia "|" por "/" en los nombres).
+
+- CSV: primera fila con los encabezados id,nombre,cantidad,precio (en cualquier
+  orden; otras columnas se ignoran).
+- JSON Lines: un objeto {"id", "nombre", "cantidad", "precio"} por línea.
+
+Todo funciona con generadores: el archivo se lee fila por fila y se aplica de a
+bloques (una transacción por bloque), así la memoria usada no depende del tamaño
+del archivo. Las filas con errores no detienen la importación: se informan
+una por una con su número de línea.
+
+Archivos muy grandes (txt o jsonl): leer_en_paralelo() divide el archivo en tramos
+de bytes que terminan en fin de línea y los analiza y valida en varios procesos;
+las filas vuelven en el orden del archivo.
+
+Si un ID ya existe en el inventario (o aparece repetido en el archivo), el modo decide:
+    error        la fila se informa como error (por defecto)
+    omitir       la fila se salta
+    actualizar   se cambian cantidad y precio (el nombre se conserva)
+    reemplazar   se reemplaza el producto completo (queda al final del listado)
+"""
+
+import csv
+import gc
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, Optional, TextIO, Union
+from modelos.producto import Producto
+
+
+FORMATOS = ("csv", "jsonl", "txt")
+MODOS = ("error", "omitir", "actualizar", "reemplazar")
+
+COLUMNAS = ("id", "nombre", "cantidad", "precio")
+
+# Filas aplicadas por transacción
+TAMANO_BLOQUE = 1000
+
+# Bytes que analiza cada proceso por vez (lectura en paralelo)
+TAMANO_TRAMO = 8 * 1024 * 1024
+
+# Cada fila leída: (número de línea, Producto o el error que impidió crearlo)
+Fila = tuple[int, Union[Producto, ValueError]]
+
+
+# Formato según la extensión del archivo (.csv, .jsonl / .json, cualquier otra = txt)
+def formato_de(ruta: str) -> str:
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson", ".json"):
+        return "jsonl"
+    return "txt"
+
+
+# -------- LECTURA --------
+def leer_csv(archivo: TextIO) -> Iterator[Fila]:
+    lector = csv.DictReader(archivo)
+
+    faltan = [c for c in COLUMNAS if c not in (lector.fieldnames or ())]
+    if faltan:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltan)}.")
+
+    for fila in lector:
+        try:
+            producto = Producto(
+                _numero(fila["id"], int, "id"),
+                fila["nombre"] or "",
+                _numero(fila["cantidad"], int, "cantidad"),
+                _numero(fila["precio"], float, "precio"),
+            )
+        except ValueError as e:
+            producto = e
+
+        # line_num es la línea donde terminó la fila (un nombre entre comillas puede ocupar varias)
+        yield lector.line_num, producto
+
+
+def leer_jsonl(archivo: TextIO) -> Iterator[Fila]:
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+
+        try:
+            try:
+                datos = json.loads(linea)
+            except ValueError:
+                raise ValueError("JSON inválido.")
+            producto = Producto.from_dict(datos)
+        except ValueError as e:
+            producto = e
+
+        yield numero, producto
+
+
+def leer_txt(archivo: TextIO) -> Iterator[Fila]:
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+
+        try:
+            producto = Producto.from_linea(linea)
+        except ValueError as e:
+            producto = e
+
+        yield numero, producto
+
+
+# Convierte un texto del CSV en número con un mensaje claro si no se puede
+def _numero(texto, tipo, columna: str):
+    try:
+        return tipo(texto)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{columna}' inválido: {texto!r}.")
+
+
+LECTORES = {"csv": leer_csv, "jsonl": leer_jsonl, "txt": leer_txt}
+
+
+# -------- LECTURA EN PARALELO --------
+# Formatos de una fila por línea (en CSV un nombre entre comillas puede tener saltos de línea)
+FORMATOS_PARALELOS = ("jsonl", "txt")
+
+
+# Divide el archivo en tramos [inicio, fin) de unos `tamano` bytes que terminan justo
+# después de un salto de línea
+def tramos(ruta: str, tamano: int = TAMANO_TRAMO) -> Iterator[tuple[int, int]]:
+    total = os.path.getsize(ruta)
+    inicio = 0
+
+    with open(ruta, "rb") as f:
+        while inicio < total:
+            f.seek(min(inicio + tamano, total))
+            f.readline()
+            fin = min(f.tell(), total)
+            yield inicio, fin
+            inicio = fin
+
+
+# (Proceso de trabajo) lee y valida un tramo.
+# Devuelve (líneas del tramo, [(línea relativa, (id, nombre, cantidad, precio) o mensaje de error)]).
+# Se devuelven tuplas y no Productos: se envían mucho más rápido entre procesos.
+def _analizar_tramo(ruta: str, formato: str, inicio: int, fin: int) -> tuple[int, list]:
+    with open(ruta, "rb") as f:
+        f.seek(inicio)
+        datos = f.read(fin - inicio)
+
+    # El primer tramo puede empezar con BOM (archivos guardados por Excel / Notepad)
+    texto = datos.decode("utf-8-sig" if inicio == 0 else "utf-8")
+    lineas = texto.split("\n")
+    if lineas[-1] == "":
+        lineas.pop()
+
+    # Igual que al cargar el inventario: crear tantos objetos dispara el recolector de
+    # basura una y otra vez, y aquí no hay ciclos que recolectar
+    gc_activo = gc.isenabled()
+    gc.disable()
+
+    try:
+        filas = []
+        for numero, linea in enumerate(lineas, start=1):
+            if not linea.strip():
+                continue
+
+            try:
+                if formato == "txt":
+                    p = Producto.from_linea(linea)
+                else:
+                    try:
+                        objeto = json.loads(linea)
+                    except ValueError:
+                        raise ValueError("JSON inválido.")
+                    p = Producto.from_dict(objeto)
+                filas.append((numero, (p.get_id(), p.get_nombre(), p.get_cantidad(), p.get_precio())))
+            except ValueError as e:
+                filas.append((numero, str(e)))
+    finally:
+        if gc_activo:
+            gc.enable()
+
+    return len(lineas), filas
+
+
+# Lee un archivo txt o jsonl analizando sus tramos en `procesos` procesos a la vez.
+# Entrega lo mismo que leer_txt / leer_jsonl y en el mismo orden. Con un solo proceso
+# (o un archivo de un solo tramo) lee en este mismo proceso.
+def leer_en_paralelo(ruta: str, formato: str = "txt", procesos: Optional[int] = None,
+                     tamano: int = TAMANO_TRAMO) -> Iterator[Fila]:
+    if formato not in FORMATOS_PARALELOS:
+        raise ValueError(f"El formato {formato} no se puede leer en paralelo.")
+
+    procesos = procesos or os.cpu_count() or 1
+
+    if procesos == 1 or os.path.getsize(ruta) <= tamano:
+        with open(ruta, "r", encoding="utf-8-sig") as f:
+            yield from LECTORES[formato](f)
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos) as grupo:
+        # Como máximo dos tramos por proceso en vuelo: la memoria no depende del tamaño del archivo
+        pendientes = deque()
+        por_enviar = tramos(ruta, tamano)
+        desplazamiento = 0
+
+        def enviar() -> None:
+            for inicio, fin in islice(por_enviar, 2 * procesos - len(pendientes)):
+                pendientes.append(grupo.submit(_analizar_tramo, ruta, formato, inicio, fin))
+
+        enviar()
+        while pendientes:
+            lineas, filas = pendientes.popleft().result()
+            enviar()
+
+            for numero, fila in filas:
+                if isinstance(fila, str):
+                    yield desplazamiento + numero, ValueError(fila)
+                else:
+                    # Ya se validó en el proceso de trabajo
+                    yield desplazamiento + numero, Producto._sin_validar(*fila)
+
+            desplazamiento += lineas
+
+
+# -------- ESCRITURA --------
+def escribir_csv(productos: Iterable[Producto], archivo: TextIO) -> int:
+    escritor = csv.writer(archivo, lineterminator="\n")
+    escritor.writerow(COLUMNAS)
+
+    total = 0
+    for p in productos:
+        escritor.writerow((p.get_id(), p.get_nombre(), p.get_cantidad(), p.get_precio()))
+        total += 1
+
+    return total
+
+
+def escribir_jsonl(productos: Iterable[Producto], archivo: TextIO) -> int:
+    total = 0
+    for p in productos:
+        archivo.write(json.dumps(p.to_dict(), ensure_ascii=False) + "\n")
+        total += 1
+
+    return total
+
+
+def escribir_txt(productos: Iterable[Producto], archivo: TextIO) -> int:
+    total = 0
+    for p in productos:
+        archivo.write(p.to_linea() + "\n")
+        total += 1
+
+    return total
+
+
+ESCRITORES = {"csv": escribir_csv, "jsonl": escribir_jsonl, "txt": escribir_txt}
+
+
+# Escribe todo el inventario; devuelve cuántos productos se exportaron.
+# La instantánea no cambia aunque otro hilo agregue o elimine mientras tanto.
+def exportar(inventario, archivo: TextIO, formato: str = "txt") -> int:
+    return ESCRITORES[formato](inventario.instantanea(), archivo)
+
+
+# -------- IMPORTACIÓN --------
+class Importacion:
+    """
+    Aplica las filas de un archivo sobre el inventario.
+
+    ejecutar() es un generador: entrega un diccionario {"fila": n, "error": ...} por
+    cada fila que falló, apenas termina su bloque. Al final los contadores
+    (agregados, actualizados, omitidos, errores) tienen el resumen.
+    """
+
+    def __init__(self, inventario, modo: str = "error", tamano: int = TAMANO_BLOQUE):
+        if modo not in MODOS:
+            raise ValueError(f"Modo desconocido: {modo}")
+
+        self.inventario = inventario
+        self.modo = modo
+        self.tamano = tamano
+
+        self.agregados = 0
+        self.actualizados = 0
+        self.omitidos = 0
+        self.errores = 0
+
+    @property
+    def filas(self) -> int:
+        return self.agregados + self.actualizados + self.omitidos + self.errores
+
+    def ejecutar(self, filas: Iterable[Fila]) -> Iterator[dict]:
+        filas = iter(filas)
+
+        while True:
+            bloque = list(islice(filas, self.tamano))
+            if not bloque:
+                return
+
+            errores = []
+            inventario = self.inventario
+
+            with inventario.transaccion():
+                # Los IDs nuevos se agregan todos juntos (agregar_productos es mucho más
+                # rápido que uno por uno); antes de tratar un repetido se agregan los anteriores
+                nuevos = {}
+
+                for numero, producto in bloque:
+                    if isinstance(producto, ValueError):
+                        mensaje = str(producto)
+                    else:
+                        producto_id = producto.get_id()
+                        if producto_id not in nuevos and inventario.buscar_por_id(producto_id) is None:
+                            nuevos[producto_id] = producto
+                            continue
+
+                        if nuevos:
+                            self.agregados += inventario.agregar_productos(nuevos.values())
+                            nuevos = {}
+
+                        mensaje = self._repetido(producto)
+
+                    if mensaje is not None:
+                        self.errores += 1
+                        errores.append({"fila": numero, "error": mensaje})
+
+                if nuevos:
+                    self.agregados += inventario.agregar_productos(nuevos.values())
+
+            yield from errores
+
+    # Aplica una fila cuyo ID ya existe según el modo; devuelve el mensaje de error o None
+    def _repetido(self, producto: Producto) -> Union[str, None]:
+        inventario = self.inventario
+
+        if self.modo == "error":
+            return f"El ID {producto.get_id()} ya existe."
+
+        if self.modo == "omitir":
+            self.omitidos += 1
+            return None
+
+        if self.modo == "actualizar":
+            inventario.actualizar_producto(producto.get_id(), producto.get_cantidad(), producto.get_precio())
+        else:
+            inventario.eliminar_producto(producto.get_id())
+            inventario.agregar_producto(producto)
+
+        self.actualizados += 1
+        return None
@@ -3,139 +3,1002 @@ Módulo: inventario.py
 
 Clase Inventario.
 Responsable de:
-- Gestionar la colección de productos (lista en memoria).
+- Gestionar la colección de productos (diccionario en memoria indexado por ID).
 - Ejecutar operaciones CRUD.
-- Manejar persistencia en archivo TXT.
+- Delegar la persistencia en un almacenamiento (TXT con diario o SQLite),
+  ver servicios/almacenamiento.py.
+
+Transacciones:
+- Dentro de `with inventario.transaccion():` los cambios se aplican en memoria
+  y se guardan una sola vez al final.
+- Si ocurre un error, se deshacen los cambios en memoria y no se escribe nada.
+- Una transacción anidada es un punto de guardado: si falla, se deshace solo lo
+  suyo y el error sigue hacia afuera (quien lo atrapa conserva lo anterior).
+
+Varios procesos (p. ej. la consola y la ventana Tkinter sobre el mismo archivo):
+- Cada modificación bloquea el almacenamiento, trae primero los cambios de los
+  otros procesos y recién entonces escribe, así ninguna actualización se pierde.
+- sincronizar() trae esos cambios sin modificar nada (útil antes de listar).
+
+Varios hilos (Inventario(multihilo=True), p. ej. la UI con su hilo de fondo):
+- Las consultas (buscar_*, pagina, listar_productos) pueden ejecutarse a la vez.
+- Las modificaciones esperan a que terminen las consultas y se hacen de a una.
+- listar_productos copia una instantánea (tupla) que solo se rehace tras altas o
+  bajas, así recorrerla no bloquea a quien escribe.
+
+Movimientos de stock (servicios/movimientos.py):
+- Cada alta, entrada, salida, ajuste o baja queda anotada en un libro con fecha.
+- unidades_totales() y valor_inventario() se mantienen al día en cada
+  modificación: leerlos es O(1), no recorre los productos.
+
+Carga diferida (Inventario(carga_diferida=True)): el constructor vuelve enseguida y
+los productos llegan de a partes desde un hilo (almacenamiento.cargar_por_partes()).
+- pagina, total_productos y buscar_por_id (si el producto ya llegó) responden con
+  lo cargado hasta el momento; `cargando` indica si falta algo.
+- Las demás consultas y toda modificación o guardado esperan a que termine la
+  carga: nunca se escribe un inventario a medias.
+
+Guardado diferido (Inventario(guardado=PoliticaGuardado(...)), servicios/autoguardado.py):
+- Por defecto cada modificación se guarda al terminar. Con otra política los cambios
+  se juntan en memoria y se escriben de una vez (cada N cambios, tras T ms sin
+  cambios, con volcar(), guardar_en_archivo() o cerrar()).
+- Al juntarlos se resumen: varias actualizaciones del mismo producto quedan en la
+  última y un alta que se elimina antes de guardar no llega al disco.
+- Lo no guardado sigue valiendo en memoria: si otro proceso guarda antes, sus cambios
+  se traen y los propios se vuelven a aplicar encima (en disco quedarán después: si
+  los dos cambian el mismo producto, gana el último que guarda).
+
+Deshacer / rehacer (Inventario(historial=N)):
+- deshacer() y rehacer() recorren las últimas N modificaciones (una transacción es
+  un solo paso). Un cambio nuevo descarta lo que se había deshecho.
+- Cada paso guarda solo las operaciones inversas de lo que cambió, que apuntan a los
+  mismos productos (no se copia el inventario): la memoria crece con la cantidad de
+  ediciones y deshacer cuesta lo mismo que la modificación original.
+- Deshacer es una modificación más: se guarda (según la política de guardado) y queda
+  en el libro de movimientos. Se aplica por ID sobre lo que haya en ese momento, así
+  que también funciona si otro proceso recargó o cambió el producto.
+
+Métricas (Inventario(metricas=True) o activar_metricas(), servicios/metricas.py):
+- Latencia p50/p95/p99 de cada operación, bytes leídos y escritos, tiempo de carga.
 """
 
-import os
-from typing import Optional
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, Iterator, Mapping, Optional
 from modelos.producto import Producto
+from servicios.indice_nombres import IndiceNombres
+from servicios.indice_rango import IndiceOrdenado
+from servicios.almacenamiento import AlmacenamientoTxt
+from servicios.bloqueo import BloqueoLecturaEscritura, SinBloqueo
+from servicios.movimientos import LibroMovimientos, Movimiento, Totales
+from servicios.metricas import Metricas
+from servicios.autoguardado import PoliticaGuardado, Temporizador
 
 
 class Inventario:
 
-    def __init__(self, ruta_archivo: str = None):
-        # Lista que almacena los productos en memoria|
-        self.__productos: list[Producto] = []
+    # Métodos que se cronometran con activar_metricas()
+    OPERACIONES_MEDIDAS = (
+        "cargar_desde_archivo", "guardar_en_archivo", "sincronizar",
+        "agregar_producto", "eliminar_producto", "actualizar_producto", "entrada", "salida",
+        "agregar_productos", "actualizar_productos", "volcar", "deshacer", "rehacer",
+        "buscar_por_id", "buscar_por_nombre", "refinar_busqueda", "buscar_por_cantidad",
+        "buscar_por_precio", "productos_bajo_stock", "pagina", "instantanea", "listar_productos",
+    )
+
+    def __init__(self, ruta_archivo: str = None, usar_diario: bool = True,
+                 confiar_archivo: bool = False, almacenamiento=None, multihilo: bool = False,
+                 registrar_movimientos: bool = True, metricas: bool = False,
+                 carga_diferida: bool = False, guardado: Optional[PoliticaGuardado] = None,
+                 historial: int = 0):
+        # Diccionario ID -> Producto: búsquedas, altas y bajas en O(1).
+        # Conserva el orden de inserción, así listar_productos mantiene el orden.
+        self.__productos: dict[int, Producto] = {}
+
+        # Índice de trigramas para buscar_por_nombre; se construye en la primera búsqueda
+        self.__indice_nombres: Optional[IndiceNombres] = None
+
+        # Índices ordenados por cantidad y por precio para consultas por rango (también diferidos)
+        self.__indice_cantidad: Optional[IndiceOrdenado] = None
+        self.__indice_precio: Optional[IndiceOrdenado] = None
+
+        # Tupla con los IDs en orden, para paginar sin recorrer el diccionario.
+        # Se rehace (una copia rápida) solo después de altas o bajas.
+        # Guarda IDs y no Productos para no crearlos todos con la foto binaria.
+        self.__vista: Optional[tuple[int, ...]] = None
+
+        # Instantánea de los productos para listar_productos (también se rehace tras altas o bajas)
+        self.__instantanea: Optional[tuple[Producto, ...]] = None
+
+        # Unidades y valor totales; se calculan la primera vez que se piden y luego se mantienen
+        self.__totales: Optional[Totales] = None
+
+        # Cuándo se escriben las modificaciones (por defecto, cada una al terminar)
+        self.guardado = guardado if guardado is not None else PoliticaGuardado()
+        self.guardado.validar()
+
+        # Lectores en paralelo / escritores de a uno (sin costo si multihilo=False).
+        # La carga diferida y el guardado tras inactividad trabajan desde otro hilo:
+        # necesitan el bloqueo real.
+        en_otro_hilo = carga_diferida or self.guardado.con_temporizador
+        self.__hilos = BloqueoLecturaEscritura() if multihilo or en_otro_hilo else SinBloqueo()
+
+        # Los índices diferidos se construyen durante una lectura: uno a la vez
+        self.__construccion = threading.Lock()
+
+        # Por defecto se usa el archivo TXT (registros/inventario.txt) con diario
+        if almacenamiento is None:
+            almacenamiento = AlmacenamientoTxt(ruta_archivo, usar_diario, confiar_archivo)
+
+        self.almacenamiento = almacenamiento
+
+        # Libro de movimientos junto al archivo del inventario (inventario.txt.movimientos)
+        self.libro = LibroMovimientos(almacenamiento.ruta + ".movimientos") if registrar_movimientos else None
+
+        # Transacción activa: operaciones inversas (para deshacer) y registros pendientes
+        self.__inversas: Optional[list[tuple]] = None
+        self.__pendientes: list[tuple] = []
+        self.__movimientos: list[tuple] = []
+
+        # Deshacer / rehacer: pilas de pasos (un paso = las inversas de una modificación o
+        # transacción, hasta `historial` pasos). __paso junta las de la modificación en curso.
+        # Con historial=0 no se junta nada.
+        self.__pasos_deshacer: Optional[deque] = deque(maxlen=historial) if historial > 0 else None
+        self.__pasos_rehacer: deque = deque(maxlen=max(historial, 0))
+        self.__paso: list[tuple] = []
+
+        # Guardado diferido: operaciones y grupos (fecha, movimientos) todavía sin escribir,
+        # posición de la última operación de cada ID (para resumirlas) y cuántos cambios son
+        self.__sin_guardar: list[Optional[tuple]] = []
+        self.__movimientos_sin_guardar: list[tuple] = []
+        self.__ultima_sin_guardar: dict[int, int] = {}
+        self.__cambios_sin_guardar = 0
+        self.__sin_guardar_desde: Optional[float] = None
+
+        # Hilo que guarda tras un rato sin cambios (solo si la política lo pide)
+        self.__temporizador: Optional[Temporizador] = None
+        if self.guardado.con_temporizador:
+            # (lambda: así con métricas activas también se mide el volcado del temporizador)
+            self.__temporizador = Temporizador(self.guardado.inactividad_ms / 1000, lambda: self.volcar())
 
-        # Se define la ruta donde se guardará el archivo
-        # dirname(dirname(__file__)) permite subir un nivel
-        # desde servicios/ hacia almacen_app_cli/
-        base_dir = os.path.dirname(os.path.dirname(__file__))
+        # Veces que se trajeron cambios de otros procesos (la UI lo usa para saber si repintar)
+        self.sincronizaciones = 0
 
-        if ruta_archivo is None:
-            ruta_archivo = os.path.join(base_dir, "registros", "inventario.txt")
+        # Métricas de latencia y bytes (servicios/metricas.py); desactivadas no cuestan nada.
+        # Se activan antes de la carga inicial para medir también cuánto tarda.
+        self.metricas: Optional[Metricas] = None
+        if metricas:
+            self.activar_metricas()
 
-        self.ruta_archivo = ruta_archivo
+        # Se marca al terminar la carga (enseguida si no es diferida)
+        self.__cargado = threading.Event()
+        self.__cancelar_carga = False
+        # Avisa cada parte que llega (buscar_por_id espera la próxima, no la carga entera)
+        self.__parte_nueva = threading.Condition()
 
-        # Al iniciar el programa se cargan los datos guardados
-        self.cargar_desde_archivo()
+        # Al iniciar el programa se cargan los datos guardados: aquí mismo o, con
+        # carga diferida, de a partes en un hilo mientras el programa ya responde
+        if carga_diferida:
+            threading.Thread(target=self._cargar_por_partes, name="carga-inventario", daemon=True).start()
+        else:
+            self.__cargado.set()
+            self.cargar_desde_archivo()
 
     # -------- MÉTODOS INTERNOS --------
-    # Busca el índice de un producto por ID
-    def _buscar_indice_por_id(self, producto_id: int) -> int:
-        for i, producto in enumerate(self.__productos):
-            if producto.get_id() == producto_id:
-                return i
-        return -1
-
-    # Asegura que la carpeta y archivo existan antes de leer/escribir
+    # Ruta del archivo o base de datos donde se guarda el inventario
+    @property
+    def ruta_archivo(self) -> str:
+        return self.almacenamiento.ruta
+
+    # Líneas dañadas encontradas en la última carga
+    @property
+    def lineas_invalidas(self) -> int:
+        return self.almacenamiento.lineas_invalidas
+
+    # Asegura que el archivo (o la base) exista antes de leer/escribir
     def asegurar_archivo(self) -> None:
-        carpeta = os.path.dirname(self.ruta_archivo)
+        self.almacenamiento.asegurar()
+
+    # Anota una operación (y su movimiento de stock); se guarda al terminar la modificación
+    # (o la transacción)
+    def _registrar(self, operacion: tuple, inversa: tuple, tipo: str, cantidad: int, producto: Producto) -> None:
+        if self.__inversas is not None:
+            self.__inversas.append(inversa)
+
+        if self.__pasos_deshacer is not None:
+            self.__paso.append(inversa)
+
+        self.__pendientes.append(operacion)
+
+        if self.libro is not None:
+            saldo = producto.get_cantidad() if operacion[0] != "D" else 0
+            self.__movimientos.append((producto.get_id(), tipo, cantidad, saldo, producto.get_precio()))
+
+    # Entrega operaciones al almacenamiento y los movimientos al libro, en grupos
+    # (fecha, movimientos): la fecha es None si los cambios se acaban de hacer
+    def _persistir(self, operaciones: list[tuple], grupos: list[tuple]) -> None:
+        if operaciones:
+            try:
+                self.almacenamiento.registrar(operaciones, self.__productos)
+            except Exception as e:
+                print(f"Error al guardar cambios: {e}")
+                return
+
+        # Todavía con el almacenamiento bloqueado: el libro queda en el mismo orden que el diario
+        # (puede haber movimientos sin operaciones: un alta y su baja antes de guardar)
+        if not grupos:
+            return
+
+        try:
+            self.libro.anotar_grupos(grupos)
+        except OSError as e:
+            print(f"Error al anotar movimientos: {e}")
+
+    # Inserta un producto en el diccionario y en los índices
+    def _poner(self, producto: Producto) -> None:
+        self.__productos[producto.get_id()] = producto
+        self.__vista = None
+        self.__instantanea = None
+
+        if self.__indice_nombres is not None:
+            self.__indice_nombres.agregar(producto.get_id(), producto.get_nombre())
+
+        if self.__totales is not None:
+            self.__totales.sumar(producto.get_cantidad(), producto.get_precio())
+
+        self._reindexar_valores(producto)
+
+    # Quita un producto del diccionario y de los índices; devuelve el producto o None
+    def _quitar(self, producto_id: int) -> Optional[Producto]:
+        producto = self.__productos.pop(producto_id, None)
+
+        if producto is not None:
+            self.__vista = None
+            self.__instantanea = None
+
+            if self.__indice_nombres is not None:
+                self.__indice_nombres.quitar(producto_id)
+
+            if self.__indice_cantidad is not None:
+                self.__indice_cantidad.quitar(producto_id)
+                self.__indice_precio.quitar(producto_id)
+
+            if self.__totales is not None:
+                self.__totales.restar(producto.get_cantidad(), producto.get_precio())
+
+        return producto
+
+    # Cambia cantidad y precio (ya validados) manteniendo índices y totales
+    def _poner_valores(self, producto: Producto, cantidad: int, precio: float) -> None:
+        anteriores = producto.get_cantidad(), producto.get_precio()
+        producto.set_cantidad(cantidad)
+        producto.set_precio(precio)
+        self._valores_cambiados(producto, *anteriores)
+
+    # Lleva a índices y totales un cambio de cantidad o precio (recibe los valores anteriores)
+    def _valores_cambiados(self, producto: Producto, cantidad: int, precio: float) -> None:
+        if self.__totales is not None:
+            self.__totales.restar(cantidad, precio)
+            self.__totales.sumar(producto.get_cantidad(), producto.get_precio())
+
+        self._reindexar_valores(producto)
 
-        if not os.path.exists(carpeta):
-            os.makedirs(carpeta, exist_ok=True)
+    # Mueve el producto en los índices de rango tras cambiar cantidad o precio
+    def _reindexar_valores(self, producto: Producto) -> None:
+        if self.__indice_cantidad is not None:
+            self.__indice_cantidad.poner(producto.get_id(), producto.get_cantidad())
+            self.__indice_precio.poner(producto.get_id(), producto.get_precio())
 
-        if not os.path.exists(self.ruta_archivo):
-            with open(self.ruta_archivo, "w", encoding="utf-8"):
-                pass
+    # Construye el índice de nombres la primera vez que se necesita.
+    # Se arma completo antes de publicarlo: otro lector nunca ve un índice a medias.
+    def _indice_nombres(self) -> IndiceNombres:
+        if self.__indice_nombres is None:
+            with self.__construccion:
+                if self.__indice_nombres is None:
+                    indice = IndiceNombres()
+                    for p in self.__productos.values():
+                        indice.agregar(p.get_id(), p.get_nombre())
+                    self.__indice_nombres = indice
+
+        return self.__indice_nombres
+
+    # Construye los índices de rango la primera vez que se necesitan
+    def _indices_rango(self) -> tuple[IndiceOrdenado, IndiceOrdenado]:
+        if self.__indice_cantidad is None:
+            with self.__construccion:
+                if self.__indice_cantidad is None:
+                    productos = self.__productos.values()
+                    self.__indice_precio = IndiceOrdenado((p.get_id(), p.get_precio()) for p in productos)
+                    self.__indice_cantidad = IndiceOrdenado((p.get_id(), p.get_cantidad()) for p in productos)
+
+        return self.__indice_cantidad, self.__indice_precio
+
+    # Calcula los totales la primera vez que se piden; después se mantienen en cada cambio
+    def _totales(self) -> Totales:
+        if self.__totales is None:
+            with self.__construccion:
+                if self.__totales is None:
+                    self.__totales = Totales(self.__productos.values())
+
+        return self.__totales
+
+    # Revierte una operación en memoria a partir de su inversa
+    def _revertir(self, inversa: tuple) -> None:
+        tipo = inversa[0]
+
+        if tipo == "quitar":
+            self._quitar(inversa[1])
+
+        elif tipo == "poner":
+            self._poner(inversa[1])
+
+        elif tipo == "valores":
+            _, producto, cantidad, precio = inversa
+            self._poner_valores(producto, cantidad, precio)
 
     # -------- PERSISTENCIA --------
-    # Carga los productos desde el archivo
+    # Carga los productos desde el almacenamiento
     def cargar_desde_archivo(self) -> None:
+        self._esperar_carga()
+
+        with self.__hilos.escritura():
+            self.__indice_nombres = None
+            self.__indice_cantidad = None
+            self.__indice_precio = None
+            self.__vista = None
+            self.__instantanea = None
+            self.__totales = None
+
+            try:
+                self.__productos = self.almacenamiento.cargar()
+            except Exception as e:
+                self.__productos = {}
+                print(f"Error al cargar archivo: {e}")
+
+    # Guarda todos los productos actuales (en TXT compacta el diario)
+    def guardar_en_archivo(self) -> None:
+        self._esperar_carga()
+
+        try:
+            with ExitStack() as procesos:
+                with self.__hilos.escritura():
+                    procesos.enter_context(self.almacenamiento.bloqueo)
+                    self._sincronizar()
+                    operaciones, grupos = self._tomar_sin_guardar()
+
+                # Lo pendiente del guardado diferido se entrega antes (en SQLite
+                # guardar_todo no escribe filas) y también va al libro
+                self._persistir(operaciones, grupos)
+
+                # Se escribe sin bloquear a los lectores; los demás escritores
+                # esperan el bloqueo del almacenamiento, así nadie modifica mientras tanto
+                self.almacenamiento.guardar_todo(self.__productos)
+        except Exception as e:
+            print(f"Error al guardar archivo: {e}")
+
+    # Guarda lo pendiente y libera el almacenamiento (p. ej. cierra la conexión SQLite);
+    # una carga diferida en curso se interrumpe
+    def cerrar(self) -> None:
+        self.__cancelar_carga = True
+        self._esperar_carga()
+
+        if self.__temporizador is not None:
+            self.__temporizador.detener()
+        self.volcar()
+
+        with self.__hilos.escritura(), self.almacenamiento.bloqueo:
+            self.almacenamiento.cerrar()
+
+    # -------- CARGA DIFERIDA --------
+    # True mientras la carga diferida no terminó (pagina y total_productos muestran una parte)
+    @property
+    def cargando(self) -> bool:
+        return not self.__cargado.is_set()
+
+    # Lo que necesita todos los productos espera a que termine la carga.
+    # Se llama sin tener el bloqueo de hilos: la carga lo necesita para avanzar.
+    def _esperar_carga(self) -> None:
+        if not self.__cargado.is_set():
+            self.__cargado.wait()
+
+    # Espera a que llegue otra parte de la carga diferida (o a que termine); sin carga
+    # en curso vuelve enseguida. También se llama sin tener el bloqueo de hilos.
+    def esperar_parte(self) -> None:
+        with self.__parte_nueva:
+            if not self.__cargado.is_set():
+                self.__parte_nueva.wait()
+
+    # Hilo de la carga diferida. Cada parte se agrega con acceso exclusivo (breve): entre
+    # una y otra las consultas ven lo cargado hasta el momento. Con métricas activas se
+    # anota cuánto tardó la primera parte (lo que tarda en verse algo) y la carga entera.
+    def _cargar_por_partes(self) -> None:
+        inicio = time.perf_counter_ns()
+        partes = self.almacenamiento.cargar_por_partes()
+        primera = True
+
         try:
-            self.asegurar_archivo()
-            self.__productos.clear()
+            for parte in partes:
+                with self.__hilos.escritura():
+                    if primera:
+                        self.__productos = parte
+                    elif self.__productos.keys().isdisjoint(parte):
+                        self.__productos.update(parte)
+                    else:
+                        # Si un ID se repite vale el primero (como en la carga completa)
+                        productos = self.__productos
+                        for producto_id, producto in parte.items():
+                            productos.setdefault(producto_id, producto)
 
-            with open(self.ruta_archivo, "r", encoding="utf-8") as f:
-                for linea in f:
-                    linea = linea.strip()
+                    self.__vista = None
+                    self.__instantanea = None
 
-                    if not linea:
-                        continue
+                with self.__parte_nueva:
+                    self.__parte_nueva.notify_all()
 
-                    try:
-                        producto = Producto.from_linea(linea)
-                        self.__productos.append(producto)
-                    except Exception:
-                        # Si una línea está dañada, se ignora
-                        continue
+                if primera and self.metricas is not None:
+                    self.metricas.registrar("carga_diferida.primera_parte", time.perf_counter_ns() - inicio)
+                primera = False
 
+                if self.__cancelar_carga:
+                    break
         except Exception as e:
+            with self.__hilos.escritura():
+                self.__productos = {}
+                self.__vista = None
+                self.__instantanea = None
             print(f"Error al cargar archivo: {e}")
+        finally:
+            partes.close()
+            if self.metricas is not None:
+                self.metricas.registrar("carga_diferida.total", time.perf_counter_ns() - inicio)
+            with self.__parte_nueva:
+                self.__cargado.set()
+                self.__parte_nueva.notify_all()
 
-    # Guarda todos los productos actuales en el archivo
-    def guardar_en_archivo(self) -> None:
-        try:
-            self.asegurar_archivo()
+    # -------- VARIOS PROCESOS --------
+    # Trae los cambios que otro proceso (p. ej. la ventana Tkinter) guardó en el mismo archivo.
+    # Devuelve True si hubo alguno.
+    def sincronizar(self) -> bool:
+        self._esperar_carga()
 
-            with open(self.ruta_archivo, "w", encoding="utf-8") as f:
-                for p in self.__productos:
-                    f.write(p.to_linea() + "\n")
+        with self.__hilos.escritura(), self.almacenamiento.bloqueo:
+            return self._sincronizar()
 
+    def _sincronizar(self) -> bool:
+        try:
+            operaciones = self.almacenamiento.cambios_externos()
         except Exception as e:
-            print(f"Error al guardar archivo: {e}")
+            print(f"Error al leer cambios externos: {e}")
+            return False
+
+        # La foto fue reemplazada (otro proceso compactó o guardó todo): se recarga
+        if operaciones is None:
+            self.cargar_desde_archivo()
+        elif operaciones:
+            for operacion in operaciones:
+                self._aplicar(operacion)
+        else:
+            return False
+
+        # Lo propio que todavía no se guardó quedará después en disco: vuelve a ir encima
+        # (un alta repetida reemplaza a la anterior, también en el diario y en SQLite)
+        for operacion in self.__sin_guardar:
+            if operacion is not None:
+                self._aplicar(operacion)
+
+        self.sincronizaciones += 1
+        return True
+
+    # Aplica en memoria una operación hecha por otro proceso, manteniendo los índices
+    def _aplicar(self, operacion: tuple) -> None:
+        tipo = operacion[0]
+
+        if tipo == "A":
+            # Si el ID ya estaba (p. ej. un alta propia sin guardar), la última reemplaza
+            self._quitar(operacion[1].get_id())
+            self._poner(operacion[1])
+
+        elif tipo == "U":
+            _, producto_id, cantidad, precio = operacion
+            producto = self.__productos.get(producto_id)
+
+            if producto is not None:
+                self._poner_valores(producto, cantidad, precio)
+
+        elif tipo == "D":
+            self._quitar(operacion[1])
+
+    # Toda modificación se hace con acceso exclusivo entre hilos, con el almacenamiento
+    # bloqueado y después de traer los cambios ajenos; así nadie pisa actualizaciones.
+    # Dentro de una transacción ya está bloqueado y sincronizado.
+    # (Orden fijo: primero hilos, después procesos, para no trabarse.)
+    @contextmanager
+    def _escritura(self):
+        self._esperar_carga()
+
+        with ExitStack() as procesos:
+            with self.__hilos.escritura():
+                if self.__inversas is not None:
+                    yield
+                    return
+
+                procesos.enter_context(self.almacenamiento.bloqueo)
+                self._sincronizar()
+
+                try:
+                    yield
+                except BaseException:
+                    # Lo que falló ya se revirtió (o no llegó a cambiar nada): no es un paso
+                    self.__paso = []
+                    raise
+                finally:
+                    if self.__paso:
+                        self._anotar_paso()
+
+                    pendientes, self.__pendientes = self.__pendientes, []
+                    movimientos, self.__movimientos = self.__movimientos, []
+                    grupos = [(None, movimientos)] if movimientos else []
+
+                    # Con guardado diferido se juntan; solo se escriben si ya toca
+                    if not self.guardado.inmediata:
+                        pendientes, grupos = self._diferir(pendientes, grupos)
+
+            # Lo lento (escribir en disco) ya no bloquea a los lectores. El almacenamiento
+            # sigue bloqueado: el próximo escritor espera y el orden en disco se respeta.
+            self._persistir(pendientes, grupos)
+
+    # -------- GUARDADO DIFERIDO --------
+    # Cambios hechos que todavía no están en disco (siempre 0 con la política por defecto)
+    @property
+    def cambios_sin_guardar(self) -> int:
+        return self.__cambios_sin_guardar
+
+    # Qué falta guardar y desde cuándo, para mostrarlo ("" si no falta nada)
+    def estado_guardado(self) -> str:
+        cambios, desde = self.__cambios_sin_guardar, self.__sin_guardar_desde
+        if not cambios or desde is None:
+            return ""
+
+        return f"{cambios} cambio{'s' if cambios != 1 else ''} sin guardar (hace {time.monotonic() - desde:.1f} s)"
+
+    # Escribe ya lo pendiente, en una sola escritura; devuelve cuántos cambios guardó.
+    # Lo llama el temporizador, guardar/cerrar, o quien quiera asegurar lo hecho.
+    def volcar(self) -> int:
+        with ExitStack() as procesos:
+            with self.__hilos.escritura():
+                if not self.__cambios_sin_guardar:
+                    return 0
+
+                # Como en cualquier escritura: primero lo que guardaron los demás
+                procesos.enter_context(self.almacenamiento.bloqueo)
+                self._sincronizar()
+
+                cambios = self.__cambios_sin_guardar
+                operaciones, grupos = self._tomar_sin_guardar()
+
+            self._persistir(operaciones, grupos)
+
+        return cambios
+
+    # (Con _escritura tomada) suma las operaciones de una modificación a lo pendiente.
+    # Devuelve lo que hay que escribir ya (todo lo pendiente, si se llegó a `cada`) o nada.
+    def _diferir(self, operaciones: list[tuple], grupos: list[tuple]) -> tuple[list, list]:
+        if operaciones:
+            if not self.__cambios_sin_guardar:
+                self.__sin_guardar_desde = time.monotonic()
+
+            for operacion in operaciones:
+                self._anotar_sin_guardar(operacion)
+            self.__cambios_sin_guardar += len(operaciones)
+
+            # Los movimientos conservan la hora del cambio, no la del guardado
+            ahora = time.time()
+            self.__movimientos_sin_guardar.extend((ahora, movimientos) for _, movimientos in grupos)
+
+            if self.__temporizador is not None:
+                self.__temporizador.tocar()
+
+        cada = self.guardado.cada
+        if cada and self.__cambios_sin_guardar >= cada:
+            return self._tomar_sin_guardar()
+
+        return [], []
+
+    # Agrega una operación pendiente resumiendo con la anterior del mismo producto:
+    #   U tras U  -> queda solo la última actualización
+    #   U tras A  -> sobra (el alta guarda el producto con sus valores al escribirse)
+    #   D tras A  -> se anulan (el producto nunca llegó al disco)
+    def _anotar_sin_guardar(self, operacion: tuple) -> None:
+        tipo = operacion[0]
+        producto_id = operacion[1].get_id() if tipo == "A" else operacion[1]
+        pendientes = self.__sin_guardar
+
+        posicion = self.__ultima_sin_guardar.get(producto_id)
+        anterior = pendientes[posicion][0] if posicion is not None else None
+
+        if tipo == "U" and anterior == "U":
+            pendientes[posicion] = operacion
+            return
+
+        if tipo == "U" and anterior == "A":
+            return
+
+        if tipo == "D" and anterior == "A":
+            pendientes[posicion] = None
+            del self.__ultima_sin_guardar[producto_id]
+            return
+
+        self.__ultima_sin_guardar[producto_id] = len(pendientes)
+        pendientes.append(operacion)
+
+    # Saca todo lo pendiente (operaciones y grupos de movimientos) para escribirlo
+    def _tomar_sin_guardar(self) -> tuple[list, list]:
+        if not self.__cambios_sin_guardar:
+            return [], []
+
+        operaciones = [operacion for operacion in self.__sin_guardar if operacion is not None]
+        grupos = self.__movimientos_sin_guardar
+
+        self.__sin_guardar = []
+        self.__movimientos_sin_guardar = []
+        self.__ultima_sin_guardar = {}
+        self.__cambios_sin_guardar = 0
+        self.__sin_guardar_desde = None
+
+        return operaciones, grupos
+
+    # -------- DESHACER / REHACER --------
+    # Se creó con historial (si no, deshacer() nunca tiene nada que deshacer)
+    @property
+    def con_historial(self) -> bool:
+        return self.__pasos_deshacer is not None
+
+    @property
+    def puede_deshacer(self) -> bool:
+        return bool(self.__pasos_deshacer)
+
+    @property
+    def puede_rehacer(self) -> bool:
+        return bool(self.__pasos_rehacer)
+
+    # Deshace la última modificación (False si no hay nada que deshacer)
+    def deshacer(self) -> bool:
+        return self._mover_paso(self.__pasos_deshacer, self.__pasos_rehacer)
+
+    # Vuelve a hacer lo último que se deshizo
+    def rehacer(self) -> bool:
+        return self._mover_paso(self.__pasos_rehacer, self.__pasos_deshacer)
+
+    # La modificación que terminó es un paso más; un cambio nuevo descarta lo deshecho
+    def _anotar_paso(self) -> None:
+        paso, self.__paso = self.__paso, []
+        self.__pasos_deshacer.append(paso)
+        self.__pasos_rehacer.clear()
+
+    # Aplica las inversas del último paso de `origen` como una modificación más (se guarda
+    # y queda en el libro). Sus propias inversas, lo que lo deja como estaba, son el paso
+    # que pasa a `destino`: deshacer alimenta rehacer y al revés.
+    def _mover_paso(self, origen: Optional[deque], destino: deque) -> bool:
+        with self._escritura():
+            if self.__inversas is not None:
+                raise ValueError("No se puede deshacer dentro de una transacción.")
+
+            if not origen:
+                return False
+
+            for inversa in reversed(origen.pop()):
+                self._aplicar_inversa(inversa)
+
+            paso, self.__paso = self.__paso, []
+            if paso:
+                destino.append(paso)
+            return True
+
+    # A diferencia de _revertir, busca por ID: desde que se anotó, el producto pudo
+    # cambiar o recargarse (otro proceso). Si ya no aplica (p. ej. el ID se volvió a
+    # dar de alta), se omite.
+    def _aplicar_inversa(self, inversa: tuple) -> None:
+        tipo = inversa[0]
+
+        if tipo == "quitar":
+            producto = self._quitar(inversa[1])
+            if producto is not None:
+                self._registrar(("D", inversa[1]), ("poner", producto), "ajuste", -producto.get_cantidad(), producto)
+
+        elif tipo == "poner":
+            producto = inversa[1]
+            if producto.get_id() not in self.__productos:
+                self._poner(producto)
+                self._registrar(("A", producto), ("quitar", producto.get_id()),
+                                "entrada", producto.get_cantidad(), producto)
+
+        elif tipo == "valores":
+            _, anterior, cantidad, precio = inversa
+            producto = self.__productos.get(anterior.get_id())
+            if producto is not None:
+                self._actualizar(producto, cantidad, precio, "ajuste")
 
     # -------- CRUD --------
     # Agrega un producto si el ID no existe
     def agregar_producto(self, producto: Producto) -> bool:
-        if self._buscar_indice_por_id(producto.get_id()) != -1:
-            return False
+        with self._escritura():
+            if producto.get_id() in self.__productos:
+                return False
+
+            self._poner(producto)
+            self._registrar(("A", producto), ("quitar", producto.get_id()),
+                            "entrada", producto.get_cantidad(), producto)
+            return True
 
-        self.__productos.append(producto)
-        self.guardar_en_archivo()
-        return True
-    
     # Elimina un producto por ID
     def eliminar_producto(self, producto_id: int) -> bool:
-        indice = self._buscar_indice_por_id(producto_id)
+        with self._escritura():
+            producto = self._quitar(producto_id)
 
-        if indice == -1:
-            return False
+            if producto is None:
+                return False
 
-        self.__productos.pop(indice)
-        self.guardar_en_archivo()
-        return True
-    
-    # Actualiza cantidad y/o precio
+            self._registrar(("D", producto_id), ("poner", producto), "ajuste", -producto.get_cantidad(), producto)
+            return True
+
+    # Actualiza cantidad y/o precio (en el libro queda como ajuste)
     def actualizar_producto(self, producto_id: int, nueva_cantidad=None, nuevo_precio=None) -> bool:
-        indice = self._buscar_indice_por_id(producto_id)
+        with self._escritura():
+            producto = self.__productos.get(producto_id)
+            if producto is None:
+                return False
 
-        if indice == -1:
-            return False
+            self._actualizar(producto, nueva_cantidad, nuevo_precio, "ajuste")
+            return True
 
-        producto = self.__productos[indice]
+    # Suma unidades recibidas
+    def entrada(self, producto_id: int, unidades: int) -> bool:
+        self._validar_unidades(unidades)
 
-        if nueva_cantidad is not None:
-            producto.set_cantidad(nueva_cantidad)
+        with self._escritura():
+            producto = self.__productos.get(producto_id)
+            if producto is None:
+                return False
 
-        if nuevo_precio is not None:
-            producto.set_precio(nuevo_precio)
+            self._actualizar(producto, producto.get_cantidad() + unidades, None, "entrada")
+            return True
 
-        self.guardar_en_archivo()
-        return True
-    
+    # Resta unidades despachadas; ValueError si no alcanza el stock
+    def salida(self, producto_id: int, unidades: int) -> bool:
+        self._validar_unidades(unidades)
+
+        with self._escritura():
+            producto = self.__productos.get(producto_id)
+            if producto is None:
+                return False
+
+            if unidades > producto.get_cantidad():
+                raise ValueError(f"Stock insuficiente: hay {producto.get_cantidad()} unidades.")
+
+            self._actualizar(producto, producto.get_cantidad() - unidades, None, "salida")
+            return True
+
+    @staticmethod
+    def _validar_unidades(unidades: int) -> None:
+        if isinstance(unidades, bool) or not isinstance(unidades, int) or unidades <= 0:
+            raise ValueError("Las unidades deben ser un entero positivo.")
+
+    # (Con _escritura ya tomada) cambia cantidad y/o precio y anota el movimiento
+    def _actualizar(self, producto: Producto, nueva_cantidad, nuevo_precio, tipo: str) -> None:
+        cantidad, precio = producto.get_cantidad(), producto.get_precio()
+
+        try:
+            if nueva_cantidad is not None:
+                producto.set_cantidad(nueva_cantidad)
+
+            if nuevo_precio is not None:
+                producto.set_precio(nuevo_precio)
+        except BaseException:
+            # Si un dato es inválido (o algo falla) no se deja el producto a medio actualizar
+            producto.set_cantidad(cantidad)
+            producto.set_precio(precio)
+            raise
+
+        self._valores_cambiados(producto, cantidad, precio)
+        self._registrar(("U", producto.get_id(), producto.get_cantidad(), producto.get_precio()),
+                        ("valores", producto, cantidad, precio),
+                        tipo, producto.get_cantidad() - cantidad, producto)
+
+    # -------- LOTES Y TRANSACCIONES --------
+    # Agrupa varias operaciones: se guardan una sola vez o no se aplica ninguna
+    @contextmanager
+    def transaccion(self):
+        # Bloquea y sincroniza una sola vez; los registros se guardan todos al final
+        with self._escritura():
+            # Una transacción anidada se une a la exterior como punto de guardado:
+            # si falla, se deshace solo lo que hizo ella
+            if self.__inversas is not None:
+                marcas = (len(self.__inversas), len(self.__pendientes), len(self.__movimientos), len(self.__paso))
+                try:
+                    yield self
+                except BaseException:
+                    self._volver_a(*marcas)
+                    raise
+                return
+
+            self.__inversas = []
+
+            try:
+                yield self
+            except BaseException:
+                # Se deshace en memoria y no se escribe nada
+                for inversa in reversed(self.__inversas):
+                    self._revertir(inversa)
+                self.__pendientes = []
+                self.__movimientos = []
+                raise
+            finally:
+                self.__inversas = None
+
+    # Deshace lo hecho desde el punto de guardado (largos de cada lista en ese momento)
+    def _volver_a(self, inversas: int, pendientes: int, movimientos: int, paso: int) -> None:
+        for inversa in reversed(self.__inversas[inversas:]):
+            self._revertir(inversa)
+
+        del self.__inversas[inversas:]
+        del self.__pendientes[pendientes:]
+        del self.__movimientos[movimientos:]
+        del self.__paso[paso:]
+
+    # Agrega varios productos; si un ID está repetido no se agrega ninguno
+    def agregar_productos(self, productos: Iterable[Producto]) -> int:
+        total = 0
+
+        with self.transaccion():
+            # Ya bloqueado y sincronizado: se evita pasar por agregar_producto (y su
+            # _escritura) en cada producto, que era la mayor parte del costo
+            existentes = self.__productos
+
+            for producto in productos:
+                producto_id = producto.get_id()
+                if producto_id in existentes:
+                    raise ValueError(f"El ID {producto_id} ya existe.")
+
+                self._poner(producto)
+                self._registrar(("A", producto), ("quitar", producto_id), "entrada", producto.get_cantidad(), producto)
+                total += 1
+
+        return total
+
+    # Actualiza varios productos: {id: (cantidad, precio)}; None deja el valor igual
+    def actualizar_productos(self, cambios: Mapping[int, tuple]) -> int:
+        total = 0
+
+        with self.transaccion():
+            for producto_id, (cantidad, precio) in cambios.items():
+                if not self.actualizar_producto(producto_id, cantidad, precio):
+                    raise ValueError(f"No existe producto con ID {producto_id}.")
+                total += 1
+
+        return total
+
+    # -------- CONSULTAS --------
     # Busca producto por ID
     def buscar_por_id(self, producto_id: int) -> Optional[Producto]:
-        indice = self._buscar_indice_por_id(producto_id)
-        return None if indice == -1 else self.__productos[indice]
-    
-    # Búsqueda parcial por nombre
+        with self.__hilos.lectura():
+            producto = self.__productos.get(producto_id)
+
+        # Durante la carga diferida puede que todavía no haya llegado: se espera la próxima parte
+        while producto is None and not self.__cargado.is_set():
+            self.esperar_parte()
+            with self.__hilos.lectura():
+                producto = self.__productos.get(producto_id)
+
+        return producto
+
+    # Búsqueda parcial por nombre (sin distinguir mayúsculas ni tildes)
     def buscar_por_nombre(self, texto: str) -> list[Producto]:
-        texto = texto.strip().lower()
-        return [p for p in self.__productos if texto in p.get_nombre().lower()]
-    
-    # Devuelve copia de la lista para evitar modificación externa
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            indice = self._indice_nombres()
+            return [self.__productos[pid] for pid in indice.buscar(texto)]
+
+    # Refina resultados anteriores: solo revisa esos productos ("pan" -> "pant")
+    def refinar_busqueda(self, productos: list[Producto], texto: str) -> list[Producto]:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            indice = self._indice_nombres()
+            ids = indice.filtrar([p.get_id() for p in productos], texto)
+            return [self.__productos[pid] for pid in ids]
+
+    # Productos con minimo <= cantidad <= maximo, ordenados por cantidad (None = sin límite)
+    def buscar_por_cantidad(self, minimo=None, maximo=None) -> list[Producto]:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            indice_cantidad, _ = self._indices_rango()
+            return [self.__productos[pid] for pid in indice_cantidad.rango(minimo, maximo)]
+
+    # Productos con minimo <= precio <= maximo, ordenados por precio (None = sin límite)
+    def buscar_por_precio(self, minimo=None, maximo=None) -> list[Producto]:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            _, indice_precio = self._indices_rango()
+            return [self.__productos[pid] for pid in indice_precio.rango(minimo, maximo)]
+
+    # Productos con menos unidades que el umbral
+    def productos_bajo_stock(self, umbral: int) -> list[Producto]:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            indice_cantidad, _ = self._indices_rango()
+            return [self.__productos[pid] for pid in indice_cantidad.menores_que(umbral)]
+
+    # Cantidad total de productos (durante la carga diferida, los cargados hasta ahora)
+    def total_productos(self) -> int:
+        with self.__hilos.lectura():
+            return len(self.__productos)
+
+    # -------- STOCK --------
+    # Suma de unidades de todos los productos (O(1) tras la primera vez)
+    def unidades_totales(self) -> int:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            return self._totales().unidades
+
+    # Valor del inventario: suma de cantidad x precio (O(1) tras la primera vez)
+    def valor_inventario(self) -> float:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            return self._totales().valor
+
+    # Unidades actuales de un producto (None si no existe)
+    def saldo(self, producto_id: int) -> Optional[int]:
+        producto = self.buscar_por_id(producto_id)
+        return None if producto is None else producto.get_cantidad()
+
+    # Movimientos anotados en el libro (de todos o de un producto), del más viejo al más nuevo
+    def movimientos(self, producto_id: Optional[int] = None) -> Iterator[Movimiento]:
+        if self.libro is None:
+            return iter(())
+        return self.libro.leer(producto_id)
+
+    # Devuelve una página de productos (en orden de inserción) sin copiar todo el inventario.
+    # Durante la carga diferida ya responde con lo que llegó: así se ve la primera página.
+    def pagina(self, inicio: int, cantidad: int) -> list[Producto]:
+        with self.__hilos.lectura():
+            if self.__vista is None:
+                with self.__construccion:
+                    if self.__vista is None:
+                        self.__vista = tuple(self.__productos)
+
+            return [self.__productos[pid] for pid in self.__vista[inicio:inicio + cantidad]]
+
+    # Tupla inmutable con los productos en orden. Quien la recorre no bloquea a nadie:
+    # una alta o baja posterior crea otra tupla en vez de modificar esta.
+    # (Cantidad y precio de cada producto sí se ven actualizados.)
+    def instantanea(self) -> tuple[Producto, ...]:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            if self.__instantanea is None:
+                with self.__construccion:
+                    if self.__instantanea is None:
+                        self.__instantanea = tuple(self.__productos.values())
+
+            return self.__instantanea
+
+    # Devuelve copia de la lista para evitar modificación externa (copiada fuera del bloqueo)
     def listar_productos(self) -> list[Producto]:
-        return self.__productos.copy()    
\ No newline at end of file
+        return list(self.instantanea())
+
+    # -------- MÉTRICAS --------
+    # Cronometra las operaciones de OPERACIONES_MEDIDAS y las del almacenamiento
+    # (bytes leídos y escritos). Devuelve el objeto Metricas con los resultados.
+    def activar_metricas(self) -> Metricas:
+        if self.metricas is None:
+            self.metricas = Metricas()
+            self.metricas.instrumentar(self, self.OPERACIONES_MEDIDAS)
+            self.metricas.instrumentar_almacenamiento(self.almacenamiento)
+
+        return self.metricas
+
+    # Vuelve a los métodos sin medir y descarta lo medido
+    def desactivar_metricas(self) -> None:
+        if self.metricas is not None:
+            self.metricas.desinstrumentar()
+            self.metricas = None
@@ -0,0 +1,311 @@
+"""
+Módulo: metricas.py
+
+Medición opcional de lo que hace el inventario, para saber si lo lento es el disco,
+la lectura de los archivos o las búsquedas:
+- Por operación: cuántas veces se llamó, cuántas fallaron y su latencia
+  (p50 / p95 / p99 / máximo).
+- Almacenamiento: bytes leídos al cargar, bytes escritos por guardado y tiempo de carga.
+- Un perfil de cProfile a pedido (iniciar_perfil / detener_perfil).
+
+Desactivadas no cuestan nada: instrumentar() reemplaza los métodos medidos solo en
+la instancia (inventario.agregar_producto pasa a ser una versión cronometrada) y
+desinstrumentar() los quita; la clase no cambia.
+
+Las operaciones del almacenamiento se informan como "disco.cargar", "disco.registrar"
+(cada modificación), "disco.guardar_todo" (compactación / guardado completo) y
+"disco.cambios_externos" (leer lo que guardó otro proceso).
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from functools import wraps
+from typing import Iterable, Optional
+
+
+# Operaciones del almacenamiento: nombre del método -> cómo contar los bytes
+#   "leidos"     el tamaño de los archivos al empezar (se leen enteros)
+#   "agregados"  lo que crecieron los archivos (el diario se escribe al final)
+#   "escritos"   el tamaño del archivo principal al terminar (se reescribe entero)
+# En SQLite lo agregado se mide por el crecimiento de inventario.db-wal: es
+# aproximado, porque tras cada checkpoint el WAL se reutiliza desde el principio
+OPERACIONES_DISCO = {
+    "cargar": "leidos",
+    "registrar": "agregados",
+    "guardar_todo": "escritos",
+    "cambios_externos": None,
+}
+
+
+class Histograma:
+    """
+    Latencias agrupadas en cubetas logarítmicas: 8 por cada potencia de 2.
+    La memoria no depende de cuántas mediciones haya y cada percentil se informa
+    con el límite superior de su cubeta (a lo sumo 12,5 % por encima del real).
+    """
+
+    SUBDIVISIONES = 8
+
+    def __init__(self):
+        self.cubetas: dict[int, int] = {}
+        self.cuenta = 0
+        self.total_ns = 0
+        self.maximo_ns = 0
+
+    @classmethod
+    def _cubeta(cls, ns: int) -> int:
+        ns = max(ns, 1)
+        exponente = ns.bit_length() - 1
+        # Los 3 bits que siguen al primer 1 eligen la subdivisión
+        if exponente >= 3:
+            fraccion = (ns >> (exponente - 3)) & 7
+        else:
+            fraccion = (ns << (3 - exponente)) & 7
+        return exponente * cls.SUBDIVISIONES + fraccion
+
+    @classmethod
+    def _limite(cls, cubeta: int) -> float:
+        exponente, fraccion = divmod(cubeta, cls.SUBDIVISIONES)
+        return (2 ** exponente) * (cls.SUBDIVISIONES + fraccion + 1) / cls.SUBDIVISIONES
+
+    def registrar(self, ns: int) -> None:
+        cubeta = self._cubeta(ns)
+        self.cubetas[cubeta] = self.cubetas.get(cubeta, 0) + 1
+        self.cuenta += 1
+        self.total_ns += ns
+        if ns > self.maximo_ns:
+            self.maximo_ns = ns
+
+    # Latencia (ns) por debajo de la cual quedan el `p` por ciento de las mediciones
+    def percentil(self, p: float) -> float:
+        if not self.cuenta:
+            return 0.0
+
+        objetivo = self.cuenta * p / 100
+        acumulado = 0
+        for cubeta in sorted(self.cubetas):
+            acumulado += self.cubetas[cubeta]
+            if acumulado >= objetivo:
+                return min(self._limite(cubeta), self.maximo_ns)
+
+        return float(self.maximo_ns)
+
+
+class Metricas:
+    """Contadores, histogramas y bytes de un inventario (y de su servicio, si se indica)."""
+
+    def __init__(self):
+        # Varios hilos pueden medir a la vez (la UI y su trabajador, el servidor)
+        self.__cerrojo = threading.Lock()
+
+        self.operaciones: dict[str, Histograma] = {}
+        self.errores: dict[str, int] = {}
+
+        self.bytes_leidos = 0
+        self.bytes_escritos = 0
+        self.guardados = 0
+        self.ultima_carga_ns = 0
+
+        self.inicio = time.time()
+
+        # (objeto, nombre) de cada método reemplazado, para poder quitarlos
+        self.__instrumentados: list[tuple[object, str]] = []
+        self.__perfil: Optional[cProfile.Profile] = None
+
+    # -------- MEDIR --------
+    def registrar(self, nombre: str, ns: int, error: bool = False) -> None:
+        histograma = self._histograma(nombre)
+        with self.__cerrojo:
+            histograma.registrar(ns)
+            if error:
+                self.errores[nombre] = self.errores.get(nombre, 0) + 1
+
+    def _histograma(self, nombre: str) -> Histograma:
+        with self.__cerrojo:
+            histograma = self.operaciones.get(nombre)
+            if histograma is None:
+                histograma = self.operaciones[nombre] = Histograma()
+            return histograma
+
+    # Reemplaza en la instancia cada método por una versión cronometrada
+    def instrumentar(self, objeto, nombres: Iterable[str], prefijo: str = "") -> None:
+        for nombre in nombres:
+            original = getattr(objeto, nombre)
+            setattr(objeto, nombre, self._cronometrado(original, prefijo + nombre))
+            self.__instrumentados.append((objeto, nombre))
+
+    # Igual para el almacenamiento, contando además los bytes leídos o escritos
+    def instrumentar_almacenamiento(self, almacenamiento) -> None:
+        for nombre, bytes_ in OPERACIONES_DISCO.items():
+            original = getattr(almacenamiento, nombre)
+            if bytes_ is None:
+                cronometrado = self._cronometrado(original, "disco." + nombre)
+            else:
+                cronometrado = self._cronometrado_disco(original, "disco." + nombre, almacenamiento, bytes_)
+            setattr(almacenamiento, nombre, cronometrado)
+            self.__instrumentados.append((almacenamiento, nombre))
+
+    # Vuelve a los métodos originales (de la clase): sin ningún costo extra
+    def desinstrumentar(self) -> None:
+        for objeto, nombre in reversed(self.__instrumentados):
+            objeto.__dict__.pop(nombre, None)
+        self.__instrumentados = []
+
+    # Lo que se agrega a cada llamada (1-2 µs): dos lecturas del reloj y una cubeta
+    # del histograma (creado de antemano, así no se busca por nombre)
+    def _cronometrado(self, funcion, nombre: str):
+        histograma = self._histograma(nombre)
+        cerrojo = self.__cerrojo
+        reloj = time.perf_counter_ns
+
+        @wraps(funcion)
+        def cronometrado(*args, **kwargs):
+            inicio = reloj()
+            try:
+                resultado = funcion(*args, **kwargs)
+            except BaseException:
+                self.registrar(nombre, reloj() - inicio, error=True)
+                raise
+
+            duracion = reloj() - inicio
+            with cerrojo:
+                histograma.registrar(duracion)
+            return resultado
+
+        return cronometrado
+
+    # Las operaciones de disco son lentas: aquí sí se miran los tamaños de los archivos
+    def _cronometrado_disco(self, funcion, nombre: str, almacenamiento, bytes_: str):
+        @wraps(funcion)
+        def cronometrado(*args, **kwargs):
+            antes = _tamano(almacenamiento) if bytes_ != "escritos" else 0
+            inicio = time.perf_counter_ns()
+            try:
+                resultado = funcion(*args, **kwargs)
+            except BaseException:
+                self.registrar(nombre, time.perf_counter_ns() - inicio, error=True)
+                raise
+
+            duracion = time.perf_counter_ns() - inicio
+            self.registrar(nombre, duracion)
+            self._contar_bytes(bytes_, antes, almacenamiento, duracion)
+            return resultado
+
+        return cronometrado
+
+    def _contar_bytes(self, tipo: str, antes: int, almacenamiento, duracion: int) -> None:
+        with self.__cerrojo:
+            if tipo == "leidos":
+                self.bytes_leidos += antes
+                self.ultima_carga_ns = duracion
+            elif tipo == "agregados":
+                self.bytes_escritos += max(0, _tamano(almacenamiento) - antes)
+                self.guardados += 1
+            else:
+                self.bytes_escritos += _tamano(almacenamiento, solo_principal=True)
+                self.guardados += 1
+
+    # -------- PERFIL --------
+    # cProfile mide solo el hilo que lo inicia: hay que iniciarlo y detenerlo en el
+    # hilo que hace el trabajo (en la UI, el trabajador de fondo)
+    def iniciar_perfil(self) -> None:
+        if self.__perfil is not None:
+            return
+        self.__perfil = cProfile.Profile()
+        self.__perfil.enable()
+
+    @property
+    def perfilando(self) -> bool:
+        return self.__perfil is not None
+
+    # Detiene el perfil y lo guarda en `ruta` (se abre con pstats o snakeviz);
+    # devuelve las funciones que más tiempo acumularon
+    def detener_perfil(self, ruta: str, lineas: int = 15) -> str:
+        if self.__perfil is None:
+            return "No hay un perfil en curso."
+
+        perfil, self.__perfil = self.__perfil, None
+        perfil.disable()
+        perfil.dump_stats(ruta)
+
+        texto = io.StringIO()
+        pstats.Stats(perfil, stream=texto).sort_stats("cumulative").print_stats(lineas)
+        return texto.getvalue()
+
+    # -------- INFORMES --------
+    def resumen(self) -> dict:
+        with self.__cerrojo:
+            operaciones = {
+                nombre: {
+                    "cuenta": h.cuenta,
+                    "errores": self.errores.get(nombre, 0),
+                    "media_ms": round(h.total_ns / h.cuenta / 1e6, 3),
+                    "p50_ms": round(h.percentil(50) / 1e6, 3),
+                    "p95_ms": round(h.percentil(95) / 1e6, 3),
+                    "p99_ms": round(h.percentil(99) / 1e6, 3),
+                    "max_ms": round(h.maximo_ns / 1e6, 3),
+                }
+                for nombre, h in sorted(self.operaciones.items())
+                if h.cuenta
+            }
+
+            return {
+                "segundos": round(time.time() - self.inicio, 1),
+                "operaciones": operaciones,
+                "bytes_leidos": self.bytes_leidos,
+                "bytes_escritos": self.bytes_escritos,
+                "guardados": self.guardados,
+                "bytes_por_guardado": self.bytes_escritos // self.guardados if self.guardados else 0,
+                "carga_ms": round(self.ultima_carga_ns / 1e6, 1),
+            }
+
+    # Tabla para la consola
+    def texto(self) -> str:
+        datos = self.resumen()
+        lineas = [f"{'operación':<30} {'veces':>7} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'máx ms':>9}"]
+
+        for nombre, o in datos["operaciones"].items():
+            lineas.append(f"{nombre:<30} {o['cuenta']:>7} {o['errores']:>4} {o['p50_ms']:>9.3f} "
+                          f"{o['p95_ms']:>9.3f} {o['p99_ms']:>9.3f} {o['max_ms']:>9.3f}")
+
+        if len(lineas) == 1:
+            lineas.append("(sin operaciones medidas todavía)")
+
+        lineas.append(f"Carga: {datos['carga_ms']} ms, {_legible(datos['bytes_leidos'])} leídos | "
+                      f"Guardados: {datos['guardados']}, {_legible(datos['bytes_escritos'])} escritos "
+                      f"({_legible(datos['bytes_por_guardado'])} por guardado)")
+        return "\n".join(lineas)
+
+    # Una línea para la barra de estado: las operaciones más lentas (p95)
+    def linea(self, cuantas: int = 3) -> str:
+        datos = self.resumen()
+        lentas = sorted(datos["operaciones"].items(), key=lambda par: par[1]["p95_ms"], reverse=True)
+
+        partes = [f"{nombre} p95 {o['p95_ms']:.1f} ms" for nombre, o in lentas[:cuantas]]
+        partes.append(f"{_legible(datos['bytes_escritos'])} escritos")
+        return " | ".join(partes)
+
+
+# Suma de los tamaños de los archivos del almacenamiento (los que existan);
+# el primero de archivos() es el principal (la foto o la base)
+def _tamano(almacenamiento, solo_principal: bool = False) -> int:
+    archivos = almacenamiento.archivos()
+    total = 0
+    for ruta in archivos[:1] if solo_principal else archivos:
+        try:
+            total += os.path.getsize(ruta)
+        except OSError:
+            pass
+    return total
+
+
+def _legible(bytes_: int) -> str:
+    for unidad in ("B", "KB", "MB"):
+        if bytes_ < 1024:
+            return f"{bytes_:.0f} {unidad}" if unidad == "B" else f"{bytes_:.1f} {unidad}"
+        bytes_ /= 1024
+    return f"{bytes_:.1f} GB"
@@ -0,0 +1,557 @@
+"""
+Módulo: servidor_http.py
+
+Servidor HTTP/JSON local para que lectores de código de barras y cajas (POS)
+usen el inventario sin pasar por el menú de consola.
+Solo usa la biblioteca estándar (asyncio).
+
+Rutas:
+    GET    /productos?inicio=0&cantidad=100    página del listado ("cargando": true mientras
+                                               el inventario sigue cargando al arrancar)
+    GET    /productos/<id>                     un producto
+    POST   /productos                          alta {"id", "nombre", "cantidad", "precio"}
+    PATCH  /productos/<id>                     cambia {"cantidad"} y/o {"precio"} (PUT igual)
+    DELETE /productos/<id>                     baja
+    POST   /productos/<id>/entrada             suma {"unidades"} al stock
+    POST   /productos/<id>/salida              resta {"unidades"} (400 si no alcanza)
+    GET    /productos/<id>/movimientos         historial de entradas, salidas y ajustes
+    GET    /totales                            unidades y valor de todo el inventario
+    GET    /metricas                           latencias y bytes (con main.py --servidor --metricas)
+    GET    /buscar?nombre=pan                  búsqueda parcial por nombre
+    GET    /buscar?cantidad_min=&cantidad_max= rango de cantidad (también precio_min / precio_max)
+    GET    /buscar?bajo_stock=5                productos con menos de 5 unidades
+    POST   /lote                               varias operaciones en una sola petición
+    POST   /guardar                            guardado completo (compacta el diario)
+
+Lote: una lista de operaciones {"op": "agregar" | "actualizar" | "eliminar" | "entrada" | "salida" | "obtener" | "buscar", ...}
+(ver servicios/comandos.py); se responde una lista con el resultado de cada una.
+Con {"atomico": true, "operaciones": [...]} se aplican todas o ninguna.
+
+Conexiones keep-alive (HTTP/1.1): cada caja puede mandar muchas peticiones por la
+misma conexión sin volver a conectarse.
+
+Escrituras agrupadas: las altas, cambios y bajas que llegan mientras se está
+escribiendo esperan en una cola y se aplican juntas en una sola transacción, así
+el disco se toca una vez por grupo y no una vez por petición. Las consultas no
+esperan a las escrituras (Inventario(multihilo=True)).
+
+Uso:
+    python main.py --servidor [--puerto 8765]
+"""
+
+import asyncio
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+from modelos.producto import Producto
+from servicios.comandos import aplicar_operacion
+
+
+PUERTO = 8765
+
+# Límites de cada petición
+MAXIMO_CUERPO = 10 * 1024 * 1024      # bytes
+TIEMPO_INACTIVO = 30                  # segundos sin peticiones antes de cerrar la conexión
+
+# Como máximo tantas escrituras por transacción (la cola sigue en el grupo siguiente)
+MAXIMO_GRUPO = 1000
+
+# Cada cuánto se traen los cambios de otros procesos (la consola o la ventana)
+INTERVALO_SINCRONIZACION = 2.0        # segundos
+
+
+class ErrorPeticion(Exception):
+    """Petición inválida: se responde con ese código HTTP y el mensaje."""
+
+    def __init__(self, estado: int, mensaje: str):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+class _LoteRechazado(Exception):
+    """Una operación de un lote atómico falló: la transacción se deshace."""
+
+    def __init__(self, resultados: list):
+        super().__init__("Lote rechazado.")
+        self.resultados = resultados
+
+
+class AgrupadorEscrituras:
+    """
+    Cola de escrituras que se aplican de a grupos, en un único hilo.
+
+    Mientras se escribe un grupo, las peticiones nuevas se acumulan; al terminar
+    se toman todas juntas y se aplican en una sola transacción (un solo registro
+    en el diario y un solo fsync). Con poca carga cada grupo tiene una operación
+    y no se agrega espera; con mucha, los grupos crecen solos.
+    """
+
+    def __init__(self, inventario, maximo: int = MAXIMO_GRUPO):
+        self.__inventario = inventario
+        self.__maximo = maximo
+        self.__cola: Optional[asyncio.Queue] = None
+        self.__tarea: Optional[asyncio.Task] = None
+
+        # Un solo hilo: los grupos se escriben en el orden en que llegaron
+        self.__hilo = ThreadPoolExecutor(max_workers=1, thread_name_prefix="escrituras")
+
+        # Estadísticas (cuánto se agrupa)
+        self.operaciones = 0
+        self.grupos = 0
+
+    def iniciar(self) -> None:
+        self.__cola = asyncio.Queue()
+        self.__tarea = asyncio.create_task(self._procesar())
+
+    async def detener(self) -> None:
+        if self.__tarea is not None:
+            self.__tarea.cancel()
+            try:
+                await self.__tarea
+            except asyncio.CancelledError:
+                pass
+            self.__tarea = None
+
+        self.__hilo.shutdown(wait=True)
+
+    # Encola una operación; devuelve (estado, respuesta)
+    async def escribir(self, datos: dict) -> tuple[int, dict]:
+        return await self._encolar([datos], "simple")
+
+    # Encola las operaciones de un lote; devuelve (estado, {"resultados": [...]})
+    async def escribir_lote(self, operaciones: list, atomico: bool = False) -> tuple[int, dict]:
+        return await self._encolar(operaciones, "atomico" if atomico else "lote")
+
+    async def _encolar(self, operaciones: list, tipo: str) -> tuple[int, dict]:
+        futuro = asyncio.get_running_loop().create_future()
+        self.__cola.put_nowait((operaciones, tipo, futuro))
+        return await futuro
+
+    # Ejecuta una función en el hilo de escritura (p. ej. sincronizar o guardar)
+    async def en_hilo(self, funcion, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.__hilo, funcion, *args)
+
+    async def _procesar(self) -> None:
+        cola = self.__cola
+
+        while True:
+            grupo = [await cola.get()]
+            total = len(grupo[0][0])
+
+            # Todo lo que llegó mientras se escribía el grupo anterior va en este
+            while total < self.__maximo and not cola.empty():
+                pedido = cola.get_nowait()
+                grupo.append(pedido)
+                total += len(pedido[0])
+
+            try:
+                respuestas = await self.en_hilo(self._aplicar_grupo, grupo)
+            except Exception as e:
+                print(f"Error al aplicar escrituras: {e}")
+                respuestas = [(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})] * len(grupo)
+
+            for (_, _, futuro), respuesta in zip(grupo, respuestas):
+                if not futuro.done():
+                    futuro.set_result(respuesta)
+
+    # (Hilo de escritura) aplica el grupo; devuelve una respuesta por pedido, en orden.
+    # Los pedidos normales seguidos comparten una transacción; un lote atómico usa la suya.
+    # Cada pedido es un punto de guardado: si uno falla, los demás del grupo no se pierden.
+    def _aplicar_grupo(self, grupo: list) -> list:
+        inventario = self.__inventario
+        respuestas = []
+        i = 0
+
+        while i < len(grupo):
+            operaciones, tipo, _ = grupo[i]
+
+            if tipo == "atomico":
+                respuestas.append(self._aplicar_pedido(operaciones, tipo))
+                i += 1
+                continue
+
+            with inventario.transaccion():
+                while i < len(grupo) and grupo[i][1] != "atomico":
+                    operaciones, tipo, _ = grupo[i]
+                    respuestas.append(self._aplicar_pedido(operaciones, tipo))
+                    i += 1
+
+        self.operaciones += sum(len(operaciones) for operaciones, _, _ in grupo)
+        self.grupos += 1
+        return respuestas
+
+    # Un pedido con su propia transacción (dentro de la del grupo, un punto de guardado):
+    # si algo falla, se deshace solo lo suyo y se le responde 500 solo a él
+    def _aplicar_pedido(self, operaciones: list, tipo: str) -> tuple[int, dict]:
+        inventario = self.__inventario
+
+        try:
+            if tipo == "atomico":
+                return self._aplicar_atomico(operaciones)
+
+            with inventario.transaccion():
+                resultados = [aplicar_operacion(inventario, datos) for datos in operaciones]
+        except Exception as e:
+            print(f"Error al aplicar escrituras: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+        if tipo == "simple":
+            return resultados[0]
+        return HTTPStatus.OK, {"resultados": _resumir(resultados)}
+
+    # Todas las operaciones o ninguna: si alguna falla se deshace la transacción
+    def _aplicar_atomico(self, operaciones: list) -> tuple[int, dict]:
+        inventario = self.__inventario
+
+        try:
+            with inventario.transaccion():
+                resultados = [aplicar_operacion(inventario, datos) for datos in operaciones]
+                if any(estado >= 400 for estado, _ in resultados):
+                    raise _LoteRechazado(resultados)
+        except _LoteRechazado as e:
+            return HTTPStatus.CONFLICT, {
+                "error": "Lote rechazado: no se aplicó ninguna operación.",
+                "resultados": _resumir(e.resultados),
+            }
+
+        return HTTPStatus.OK, {"resultados": _resumir(resultados)}
+
+
+# [(estado, respuesta), ...] -> [{"estado": ..., ...respuesta}, ...] para la respuesta de un lote
+def _resumir(resultados: list) -> list:
+    return [{"estado": int(estado), **respuesta} for estado, respuesta in resultados]
+
+
+class ServidorInventario:
+    """
+    Servidor HTTP/1.1 mínimo sobre asyncio.
+
+    Un solo hilo atiende todas las conexiones. Las consultas van a un hilo aparte
+    (aun por ID pueden esperar: a la carga diferida, a una recarga por cambios de
+    otro proceso o al primer cálculo de los totales) y las escrituras al
+    AgrupadorEscrituras; así una espera nunca frena a las demás conexiones.
+    El inventario debe crearse con multihilo=True.
+    """
+
+    def __init__(self, inventario, host: str = "127.0.0.1", puerto: int = PUERTO):
+        self.inventario = inventario
+        self.host = host
+        self.puerto = puerto
+        self.escrituras = AgrupadorEscrituras(inventario)
+
+        self.__servidor: Optional[asyncio.AbstractServer] = None
+        self.__sincronizacion: Optional[asyncio.Task] = None
+
+        # Peticiones atendidas (para ver la carga)
+        self.peticiones = 0
+
+    # -------- CICLO DE VIDA --------
+    async def iniciar(self) -> None:
+        self.escrituras.iniciar()
+        self.__servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+
+        # Con puerto 0 el sistema elige uno libre
+        self.puerto = self.__servidor.sockets[0].getsockname()[1]
+        self.__sincronizacion = asyncio.create_task(self._sincronizar_periodico())
+
+    async def detener(self) -> None:
+        if self.__sincronizacion is not None:
+            self.__sincronizacion.cancel()
+            self.__sincronizacion = None
+
+        if self.__servidor is not None:
+            self.__servidor.close()
+            await self.__servidor.wait_closed()
+            self.__servidor = None
+
+        await self.escrituras.detener()
+
+    async def servir(self) -> None:
+        await self.iniciar()
+        print(f"Servidor escuchando en http://{self.host}:{self.puerto} (Ctrl+C para salir)")
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.detener()
+
+    # Trae cada tanto lo que la consola o la ventana guardaron en el mismo archivo
+    async def _sincronizar_periodico(self) -> None:
+        while True:
+            await asyncio.sleep(INTERVALO_SINCRONIZACION)
+            try:
+                await self.escrituras.en_hilo(self.inventario.sincronizar)
+            except Exception as e:
+                print(f"Error al sincronizar: {e}")
+
+    # -------- HTTP --------
+    # Atiende una conexión: varias peticiones seguidas mientras sea keep-alive
+    async def _atender(self, lector: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        try:
+            seguir = True
+            while seguir:
+                try:
+                    linea = await asyncio.wait_for(lector.readline(), TIEMPO_INACTIVO)
+                except asyncio.TimeoutError:
+                    break
+
+                if not linea:
+                    break
+                if not linea.strip():
+                    continue
+
+                try:
+                    metodo, destino, version, cabeceras = await self._leer_cabecera(lector, linea)
+                    seguir = self._mantener_conexion(version, cabeceras)
+                    cuerpo = await self._leer_cuerpo(lector, cabeceras)
+                except ErrorPeticion as e:
+                    # Después de una petición mal formada no se sabe dónde empieza la siguiente
+                    estado, respuesta, seguir = e.estado, {"error": str(e)}, False
+                else:
+                    try:
+                        estado, respuesta = await self._despachar(metodo, destino, cuerpo)
+                    except ErrorPeticion as e:
+                        estado, respuesta = e.estado, {"error": str(e)}
+                    except Exception as e:
+                        print(f"Error al atender {metodo} {destino}: {e}")
+                        estado, respuesta = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)}
+
+                self.peticiones += 1
+                escritor.write(_respuesta(estado, respuesta, seguir))
+                await escritor.drain()
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _leer_cabecera(self, lector: asyncio.StreamReader, linea: bytes) -> tuple:
+        try:
+            metodo, destino, version = linea.decode("latin-1").split()
+        except ValueError:
+            raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "Línea de petición inválida.")
+
+        cabeceras = {}
+        while True:
+            try:
+                linea = await lector.readline()
+            except ValueError:
+                # Cabecera más larga que el límite del StreamReader
+                raise ErrorPeticion(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Cabecera demasiado larga.")
+
+            if linea in (b"\r\n", b"\n", b""):
+                break
+
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+
+        return metodo.upper(), destino, version.upper(), cabeceras
+
+    @staticmethod
+    def _mantener_conexion(version: str, cabeceras: dict) -> bool:
+        conexion = cabeceras.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            return conexion != "close"
+        return conexion == "keep-alive"
+
+    async def _leer_cuerpo(self, lector: asyncio.StreamReader, cabeceras: dict) -> bytes:
+        if "transfer-encoding" in cabeceras:
+            raise ErrorPeticion(HTTPStatus.LENGTH_REQUIRED, "Se requiere Content-Length.")
+
+        try:
+            largo = int(cabeceras.get("content-length", "0"))
+        except ValueError:
+            raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "Content-Length inválido.")
+
+        if largo < 0:
+            raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "Content-Length inválido.")
+        if largo > MAXIMO_CUERPO:
+            raise ErrorPeticion(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Cuerpo demasiado grande.")
+
+        return await lector.readexactly(largo) if largo else b""
+
+    # -------- RUTAS --------
+    async def _despachar(self, metodo: str, destino: str, cuerpo: bytes) -> tuple[int, dict]:
+        url = urlsplit(destino)
+        partes = [p for p in url.path.split("/") if p]
+        consulta = {clave: valores[-1] for clave, valores in parse_qs(url.query).items()}
+
+        if partes == ["productos"]:
+            if metodo == "GET":
+                return await asyncio.to_thread(self._pagina, consulta)
+            if metodo == "POST":
+                datos = _json(cuerpo)
+                if not isinstance(datos, dict):
+                    raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "Se esperaba un objeto JSON.")
+                return await self.escrituras.escribir({**datos, "op": "agregar"})
+            raise ErrorPeticion(HTTPStatus.METHOD_NOT_ALLOWED, "Método no permitido.")
+
+        if len(partes) == 2 and partes[0] == "productos":
+            producto_id = _entero(partes[1], "id")
+
+            if metodo == "GET":
+                producto = await asyncio.to_thread(self.inventario.buscar_por_id, producto_id)
+                if producto is None:
+                    return HTTPStatus.NOT_FOUND, {"error": "No encontrado."}
+                return HTTPStatus.OK, producto.to_dict()
+            if metodo in ("PATCH", "PUT"):
+                datos = _json(cuerpo)
+                if not isinstance(datos, dict):
+                    raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "Se esperaba un objeto JSON.")
+                return await self.escrituras.escribir({**datos, "op": "actualizar", "id": producto_id})
+            if metodo == "DELETE":
+                return await self.escrituras.escribir({"op": "eliminar", "id": producto_id})
+            raise ErrorPeticion(HTTPStatus.METHOD_NOT_ALLOWED, "Método no permitido.")
+
+        if len(partes) == 3 and partes[0] == "productos" and partes[2] in ("entrada", "salida"):
+            if metodo != "POST":
+                raise ErrorPeticion(HTTPStatus.METHOD_NOT_ALLOWED, "Método no permitido.")
+            datos = _json(cuerpo)
+            if not isinstance(datos, dict):
+                raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "Se esperaba un objeto JSON.")
+            return await self.escrituras.escribir({**datos, "op": partes[2], "id": _entero(partes[1], "id")})
+
+        if len(partes) == 3 and partes[0] == "productos" and partes[2] == "movimientos" and metodo == "GET":
+            # Lee el libro desde el disco
+            producto_id = _entero(partes[1], "id")
+            movimientos = await asyncio.to_thread(lambda: list(self.inventario.movimientos(producto_id)))
+            return HTTPStatus.OK, {"movimientos": [m._asdict() for m in movimientos]}
+
+        if partes == ["totales"] and metodo == "GET":
+            # La primera vez (o tras una recarga) recorren el inventario
+            return HTTPStatus.OK, await asyncio.to_thread(self._totales)
+
+        if partes == ["metricas"] and metodo == "GET":
+            if self.inventario.metricas is None:
+                raise ErrorPeticion(HTTPStatus.NOT_FOUND, "Métricas desactivadas (iniciar con --metricas).")
+            return HTTPStatus.OK, self.inventario.metricas.resumen()
+
+        if partes == ["buscar"] and metodo == "GET":
+            # Puede recorrer todo el inventario (p. ej. la primera búsqueda arma el índice)
+            productos = await asyncio.to_thread(self._buscar, consulta)
+            return HTTPStatus.OK, {"total": len(productos), "productos": [p.to_dict() for p in productos]}
+
+        if partes == ["lote"] and metodo == "POST":
+            datos = _json(cuerpo)
+            atomico = False
+            if isinstance(datos, dict):
+                atomico = bool(datos.get("atomico", False))
+                datos = datos.get("operaciones")
+            if not isinstance(datos, list):
+                raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "Se esperaba una lista de operaciones.")
+            return await self.escrituras.escribir_lote(datos, atomico)
+
+        if partes == ["guardar"] and metodo == "POST":
+            await self.escrituras.en_hilo(self.inventario.guardar_en_archivo)
+            return HTTPStatus.OK, {"guardado": True}
+
+        raise ErrorPeticion(HTTPStatus.NOT_FOUND, "Ruta inexistente.")
+
+    # (Hilo aparte) una página del listado
+    def _pagina(self, consulta: dict) -> tuple[int, dict]:
+        inicio = _entero(consulta.get("inicio", "0"), "inicio")
+        cantidad = min(_entero(consulta.get("cantidad", "100"), "cantidad"), 10000)
+        # Un inicio negativo cortaría desde el final (como en una lista de Python)
+        if inicio < 0 or cantidad < 0:
+            raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "'inicio' y 'cantidad' deben ser >= 0.")
+        productos = self.inventario.pagina(inicio, cantidad)
+
+        return HTTPStatus.OK, {
+            "total": self.inventario.total_productos(),
+            "inicio": inicio,
+            "cargando": self.inventario.cargando,
+            "productos": [p.to_dict() for p in productos],
+        }
+
+    def _totales(self) -> dict:
+        return {
+            "productos": self.inventario.total_productos(),
+            "unidades": self.inventario.unidades_totales(),
+            "valor": round(self.inventario.valor_inventario(), 2),
+        }
+
+    # (Hilo aparte) elige la búsqueda según los parámetros
+    def _buscar(self, consulta: dict) -> list[Producto]:
+        inventario = self.inventario
+
+        if "nombre" in consulta:
+            return inventario.buscar_por_nombre(consulta["nombre"])
+
+        if "bajo_stock" in consulta:
+            return inventario.productos_bajo_stock(_entero(consulta["bajo_stock"], "bajo_stock"))
+
+        if "cantidad_min" in consulta or "cantidad_max" in consulta:
+            return inventario.buscar_por_cantidad(
+                _numero(consulta.get("cantidad_min"), "cantidad_min", int),
+                _numero(consulta.get("cantidad_max"), "cantidad_max", int),
+            )
+
+        if "precio_min" in consulta or "precio_max" in consulta:
+            return inventario.buscar_por_precio(
+                _numero(consulta.get("precio_min"), "precio_min", float),
+                _numero(consulta.get("precio_max"), "precio_max", float),
+            )
+
+        raise ErrorPeticion(HTTPStatus.BAD_REQUEST,
+                            "Indica nombre, bajo_stock, cantidad_min/max o precio_min/max.")
+
+
+# -------- AUXILIARES --------
+def _json(cuerpo: bytes):
+    try:
+        return json.loads(cuerpo or b"null", parse_constant=_rechazar_constante)
+    except ValueError:
+        raise ErrorPeticion(HTTPStatus.BAD_REQUEST, "JSON inválido.")
+
+
+# NaN / Infinity no son JSON válido: json.loads los acepta salvo que se rechacen aquí
+def _rechazar_constante(nombre: str):
+    raise ValueError(f"Número inválido: {nombre}.")
+
+
+def _entero(texto: str, nombre: str) -> int:
+    try:
+        return int(texto)
+    except ValueError:
+        raise ErrorPeticion(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser un entero.")
+
+
+def _numero(texto: Optional[str], nombre: str, tipo):
+    if texto is None or texto == "":
+        return None
+    try:
+        valor = tipo(texto)
+    except ValueError:
+        raise ErrorPeticion(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser un número.")
+
+    # float("nan") no falla, pero no se puede comparar con los índices por rango
+    if not math.isfinite(valor):
+        raise ErrorPeticion(HTTPStatus.BAD_REQUEST, f"'{nombre}' debe ser un número.")
+    return valor
+
+
+# Arma la respuesta HTTP completa (cabecera + JSON)
+def _respuesta(estado: int, datos: dict, seguir: bool) -> bytes:
+    estado = HTTPStatus(estado)
+    cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+    cabecera = (
+        f"HTTP/1.1 {estado.value} {estado.phrase}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(cuerpo)}\r\n"
+        f"Connection: {'keep-alive' if seguir else 'close'}\r\n"
+        f"\r\n"
+    )
+    return cabecera.encode("latin-1") + cuerpo
+
+
+# Ejecuta el servidor hasta Ctrl+C
+def ejecutar(inventario, host: str = "127.0.0.1", puerto: int = PUERTO) -> None:
+    servidor = ServidorInventario(inventario, host, puerto)
+
+    try:
+        asyncio.run(servidor.servir())
+    except KeyboardInterrupt:
+        print("Servidor detenido.")
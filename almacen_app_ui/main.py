@@ -8,23 +8,70 @@ Aquí solo "conectamos" las capas:
 3) AppTk (interfaz Tkinter)
 
 main.py no debe tener lógica de negocio.
+
+Arranque rápido: el inventario se carga de a partes en un hilo (carga diferida) y
+empieza antes de importar y construir Tkinter, así las dos cosas se solapan y la
+ventana muestra la primera página sin esperar a leer todo el archivo.
+
+Guardado: las ediciones se juntan y se escriben cada 100 cambios o tras 1 s sin
+cambios (--guardar-cada / --guardar-inactividad; --guardar-cada 1 = cada cambio al
+instante). Guardar y cerrar la ventana escriben lo pendiente.
+
+Las últimas 100 ediciones se pueden deshacer y rehacer (Ctrl+Z / Ctrl+Y).
 """
 
+import argparse
+
 from servicios.inventario import Inventario
+from servicios.almacenamiento import TIPOS_ALMACENAMIENTO, crear_almacenamiento
+from servicios.autoguardado import PoliticaGuardado
 from servicios.servicio_inventario import ServicioInventario
-from ui.app_tk import AppTk 
+
+# Ediciones que se pueden deshacer (Ctrl+Z)
+HISTORIAL = 100
 
 def main():
-    # 1) Crea inventario (carga productos desde archivo)
-    inventario = Inventario()
+    # --almacenamiento txt|sqlite (txt por defecto)
+    # --metricas: latencias en la barra de estado y resumen al salir
+    # --perfil ARCHIVO: perfil cProfile del hilo de fondo, guardado al cerrar
+    # --guardar-cada N / --guardar-inactividad MS: cuándo se escriben las ediciones
+    parser = argparse.ArgumentParser(description="Sistema de inventario (Tkinter)")
+    parser.add_argument("--almacenamiento", choices=TIPOS_ALMACENAMIENTO, default="txt")
+    parser.add_argument("--metricas", action="store_true")
+    parser.add_argument("--perfil", metavar="ARCHIVO")
+    parser.add_argument("--guardar-cada", type=int, default=100, metavar="N")
+    parser.add_argument("--guardar-inactividad", type=int, default=1000, metavar="MS")
+    args = parser.parse_args()
+
+    guardado = PoliticaGuardado(args.guardar_cada, args.guardar_inactividad)
+    try:
+        guardado.validar()
+    except ValueError as e:
+        parser.error(str(e))
+    print(guardado.describir())
+
+    # 1) Crea inventario: vuelve enseguida y los productos se cargan en segundo plano
+    # multihilo: la tabla lee desde el hilo de Tkinter mientras el trabajador escribe
+    # historial: pasos que se pueden deshacer con Ctrl+Z
+    inventario = Inventario(almacenamiento=crear_almacenamiento(args.almacenamiento), multihilo=True,
+                            metricas=args.metricas or args.perfil is not None, carga_diferida=True,
+                            guardado=guardado, historial=HISTORIAL)
 
     # 2) Crea el servicio (puente para la UI)
     servicio = ServicioInventario(inventario)
+    if inventario.metricas is not None:
+        servicio.activar_metricas()
+    if args.perfil:
+        servicio.iniciar_perfil(args.perfil)
 
-    # 3) Crea y ejecuta la interfaz
+    # 3) Crea y ejecuta la interfaz (Tkinter se importa aquí, mientras el inventario carga)
+    from ui.app_tk import AppTk
     app = AppTk(servicio)
     app.run()
 
+    if inventario.metricas is not None:
+        print(inventario.metricas.texto())
+
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,98 @@
+# servicios/autoguardado.py
+"""
+Política de guardado: cada cambio al instante (por defecto) o juntando cambios y
+escribiéndolos de una vez (cada N cambios, tras T ms sin cambios, al guardar o al
+cerrar). describir() explica la ventana de durabilidad: qué se pierde si se corta.
+"""
+
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+
+class PoliticaGuardado(NamedTuple):
+    """cada: cambios por guardado (1 = al instante, 0 = sin límite); inactividad_ms: None = no."""
+
+    cada: int = 1
+    inactividad_ms: Optional[int] = None
+
+    @property
+    def inmediata(self) -> bool:
+        return self.cada == 1
+
+    @property
+    def con_temporizador(self) -> bool:
+        return not self.inmediata and self.inactividad_ms is not None
+
+    def validar(self) -> None:
+        if self.cada < 0:
+            raise ValueError("La cantidad de cambios por guardado debe ser >= 0.")
+        if self.inactividad_ms is not None and self.inactividad_ms <= 0:
+            raise ValueError("La espera sin cambios debe ser mayor que 0 ms.")
+
+    def describir(self) -> str:
+        if self.inmediata:
+            return "Guardado: cada cambio se escribe en disco al instante (no se pierde nada si el programa se corta)."
+
+        cuando = []
+        if self.cada > 1:
+            cuando.append(f"cada {self.cada} cambios")
+        if self.inactividad_ms is not None:
+            cuando.append(f"tras {self.inactividad_ms} ms sin cambios")
+        cuando.append("al guardar y al salir")
+
+        # Con cambios seguidos el temporizador no vence: la pérdida la acota la cantidad
+        if self.cada > 1:
+            perdida = f"se pierden a lo sumo los últimos {self.cada - 1} cambios"
+        elif self.inactividad_ms is not None:
+            perdida = f"se pierden los cambios hechos desde la última pausa de {self.inactividad_ms} ms"
+        else:
+            perdida = "se pierde todo lo que no se guardó"
+        return f"Guardado: {', '.join(cuando)}; si el programa se corta {perdida}."
+
+
+class Temporizador:
+    """Llama a accion() cuando pasan `segundos` desde el último tocar() (un solo hilo)."""
+
+    def __init__(self, segundos: float, accion: Callable[[], object]):
+        self.segundos = segundos
+        self.__accion = accion
+        self.__condicion = threading.Condition()
+        self.__vence: Optional[float] = None
+        self.__detenido = False
+        self.__hilo = threading.Thread(target=self._correr, name="autoguardado", daemon=True)
+        self.__hilo.start()
+
+    def tocar(self) -> None:
+        with self.__condicion:
+            dormido = self.__vence is None
+            self.__vence = time.monotonic() + self.segundos
+            if dormido:
+                self.__condicion.notify()
+
+    def detener(self) -> None:
+        with self.__condicion:
+            self.__detenido = True
+            self.__condicion.notify()
+        if self.__hilo is not threading.current_thread():
+            self.__hilo.join()
+
+    def _correr(self) -> None:
+        while True:
+            with self.__condicion:
+                while not self.__detenido:
+                    if self.__vence is None:
+                        self.__condicion.wait()
+                        continue
+                    restante = self.__vence - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self.__condicion.wait(restante)
+                if self.__detenido:
+                    return
+                self.__vence = None
+            # Fuera de la condición: mientras se guarda se puede seguir tocando
+            try:
+                self.__accion()
+            except Exception as e:
+                print(f"Error al guardar: {e}")
@@ -0,0 +1,312 @@
+# servicios/formato_binario.py
+"""
+Formato binario del inventario (inventario.bin) y lectura perezosa con mmap.
+
+Estructura del archivo:
+    cabecera   "INVB", versión, total de productos
+    registros  uno por producto, en orden del inventario, todos del mismo tamaño:
+               id, cantidad, precio, inicio y largo del nombre
+    índice     pares (id, posición del registro) ordenados por id
+    nombres    todos los nombres en UTF-8, uno detrás de otro
+
+Como los registros tienen tamaño fijo, el producto n está en una posición conocida
+y no hace falta leer todo el archivo para encontrarlo: el archivo se abre con mmap
+y cada Producto se crea recién cuando alguien lo pide.
+
+También se puede usar desde consola para convertir archivos:
+    python -m servicios.formato_binario a-binario registros/inventario.txt registros/inventario.bin
+    python -m servicios.formato_binario a-texto registros/inventario.bin registros/inventario.txt
+"""
+
+import mmap
+import os
+import struct
+import sys
+from collections.abc import MutableMapping, ValuesView
+from typing import Iterable, Iterator, Optional
+from modelos.producto import Producto
+
+
+MAGICO = b"INVB"
+VERSION = 1
+
+# Little-endian fijo para que el archivo sirva en cualquier máquina
+CABECERA = struct.Struct("<4sIQ")     # mágico, versión, total
+REGISTRO = struct.Struct("<qqdQI")    # id, cantidad, precio, inicio del nombre, largo del nombre
+INDICE = struct.Struct("<qQ")         # id, posición del registro
+
+
+# -------- ESCRITURA --------
+# Escribe los productos (en el orden recibido) en formato binario
+def escribir_binario(productos: Iterable[Producto], ruta: str) -> int:
+    registros = bytearray()
+    nombres = bytearray()
+    indice = []
+
+    for posicion, p in enumerate(productos):
+        nombre = p.get_nombre().encode("utf-8")
+        registros += REGISTRO.pack(p.get_id(), p.get_cantidad(), p.get_precio(), len(nombres), len(nombre))
+        nombres += nombre
+        indice.append((p.get_id(), posicion))
+
+    # El índice ordenado por id permite buscar con búsqueda binaria
+    indice.sort()
+
+    with open(ruta, "wb") as f:
+        f.write(CABECERA.pack(MAGICO, VERSION, len(indice)))
+        f.write(registros)
+        f.write(b"".join(INDICE.pack(pid, posicion) for pid, posicion in indice))
+        f.write(nombres)
+        f.flush()
+        os.fsync(f.fileno())
+
+    return len(indice)
+
+
+# -------- LECTURA --------
+class ArchivoBinario:
+    """
+    Acceso de solo lectura a un inventario.bin abierto con mmap.
+    El sistema operativo trae a memoria solo las páginas que se leen.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+        with open(ruta, "rb") as f:
+            self.__datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.__datos) < CABECERA.size:
+            self.__datos.close()
+            raise ValueError("Archivo binario inválido.")
+
+        magico, version, total = CABECERA.unpack_from(self.__datos, 0)
+        if magico != MAGICO or version != VERSION:
+            self.__datos.close()
+            raise ValueError("Archivo binario inválido.")
+
+        self.total = total
+
+        # Dónde empieza cada sección
+        self.__inicio_registros = CABECERA.size
+        self.__inicio_indice = self.__inicio_registros + total * REGISTRO.size
+        self.__inicio_nombres = self.__inicio_indice + total * INDICE.size
+
+        if len(self.__datos) < self.__inicio_nombres:
+            self.__datos.close()
+            raise ValueError("Archivo binario incompleto.")
+
+    def __len__(self) -> int:
+        return self.total
+
+    # Posición del registro con ese id (búsqueda binaria sobre el índice), o None
+    def posicion_de(self, producto_id: int) -> Optional[int]:
+        datos = self.__datos
+        inicio = self.__inicio_indice
+        bajo, alto = 0, self.total
+
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            clave, posicion = INDICE.unpack_from(datos, inicio + medio * INDICE.size)
+
+            if clave < producto_id:
+                bajo = medio + 1
+            elif clave > producto_id:
+                alto = medio
+            else:
+                return posicion
+
+        return None
+
+    # Crea el Producto del registro n (el archivo lo escribió el propio programa)
+    def producto(self, posicion: int) -> Producto:
+        pid, cantidad, precio, inicio, largo = REGISTRO.unpack_from(
+            self.__datos, self.__inicio_registros + posicion * REGISTRO.size
+        )
+        return Producto._sin_validar(pid, self.nombre(inicio, largo), cantidad, precio)
+
+    def nombre(self, inicio: int, largo: int) -> str:
+        inicio += self.__inicio_nombres
+        return self.__datos[inicio:inicio + largo].decode("utf-8")
+
+    # Recorre los registros en orden sin crear Productos: (id, cantidad, precio, inicio, largo)
+    def registros(self) -> Iterator[tuple]:
+        vista = memoryview(self.__datos)[self.__inicio_registros:self.__inicio_indice]
+        try:
+            yield from REGISTRO.iter_unpack(vista)
+        finally:
+            vista.release()
+
+    def productos(self) -> Iterator[Producto]:
+        for pid, cantidad, precio, inicio, largo in self.registros():
+            yield Producto._sin_validar(pid, self.nombre(inicio, largo), cantidad, precio)
+
+    def cerrar(self) -> None:
+        if not self.__datos.closed:
+            self.__datos.close()
+
+
+class ProductosBinarios(MutableMapping):
+    """
+    Diccionario ID -> Producto respaldado por un ArchivoBinario.
+
+    Se comporta como el dict que usa Inventario (mismo orden de inserción), pero
+    cada Producto se crea la primera vez que se pide y luego se reutiliza.
+    Los cambios se guardan en memoria hasta que se reescribe el archivo.
+    """
+
+    def __init__(self, archivo: ArchivoBinario):
+        self.__archivo = archivo
+
+        # Productos del archivo ya creados (siempre se devuelve el mismo objeto)
+        self.__cargados: dict[int, Producto] = {}
+
+        # IDs del archivo eliminados (o eliminados y vueltos a agregar al final)
+        self.__borrados: set[int] = set()
+
+        # Productos agregados después de abrir el archivo (van al final, como en un dict)
+        self.__nuevos: dict[int, Producto] = {}
+
+    @property
+    def archivo(self) -> ArchivoBinario:
+        return self.__archivo
+
+    def _en_archivo(self, producto_id: int) -> bool:
+        if producto_id in self.__borrados:
+            return False
+        return producto_id in self.__cargados or self.__archivo.posicion_de(producto_id) is not None
+
+    def __getitem__(self, producto_id: int) -> Producto:
+        producto = self.__nuevos.get(producto_id)
+        if producto is not None:
+            return producto
+
+        if producto_id in self.__borrados:
+            raise KeyError(producto_id)
+
+        producto = self.__cargados.get(producto_id)
+        if producto is None:
+            posicion = self.__archivo.posicion_de(producto_id)
+            if posicion is None:
+                raise KeyError(producto_id)
+
+            # setdefault: si dos hilos lo crean a la vez, ambos se quedan con el mismo objeto
+            producto = self.__cargados.setdefault(producto_id, self.__archivo.producto(posicion))
+
+        return producto
+
+    def __setitem__(self, producto_id: int, producto: Producto) -> None:
+        # Igual que un dict: una clave existente conserva su lugar, una nueva va al final
+        if self._en_archivo(producto_id):
+            self.__cargados[producto_id] = producto
+        else:
+            self.__nuevos[producto_id] = producto
+
+    def __delitem__(self, producto_id: int) -> None:
+        if producto_id in self.__nuevos:
+            del self.__nuevos[producto_id]
+            return
+
+        if not self._en_archivo(producto_id):
+            raise KeyError(producto_id)
+
+        self.__borrados.add(producto_id)
+        self.__cargados.pop(producto_id, None)
+
+    def __contains__(self, producto_id) -> bool:
+        return producto_id in self.__nuevos or self._en_archivo(producto_id)
+
+    def __iter__(self) -> Iterator[int]:
+        borrados = self.__borrados
+        for registro in self.__archivo.registros():
+            if registro[0] not in borrados:
+                yield registro[0]
+
+        yield from list(self.__nuevos)
+
+    def __len__(self) -> int:
+        return len(self.__archivo) - len(self.__borrados) + len(self.__nuevos)
+
+    def values(self) -> ValuesView:
+        return _ValoresBinarios(self)
+
+    # Recorrido secuencial del archivo (mucho más rápido que buscar cada ID por separado)
+    def _recorrer(self) -> Iterator[Producto]:
+        archivo = self.__archivo
+        borrados = self.__borrados
+        cargados = self.__cargados
+
+        for pid, cantidad, precio, inicio, largo in archivo.registros():
+            if pid in borrados:
+                continue
+
+            producto = cargados.get(pid)
+            if producto is None:
+                producto = Producto._sin_validar(pid, archivo.nombre(inicio, largo), cantidad, precio)
+                producto = cargados.setdefault(pid, producto)
+            yield producto
+
+        yield from list(self.__nuevos.values())
+
+    # Cambia al archivo recién escrito, que ya contiene todos los cambios.
+    # Los Productos ya creados se conservan (otras partes del programa pueden tenerlos).
+    def reabrir(self, archivo: ArchivoBinario) -> None:
+        # En este orden un lector concurrente siempre encuentra cada producto
+        self.__cargados.update(self.__nuevos)
+        self.__archivo = archivo
+        self.__borrados = set()
+        self.__nuevos = {}
+
+
+class _ValoresBinarios(ValuesView):
+    def __iter__(self) -> Iterator[Producto]:
+        return self._mapping._recorrer()
+
+
+# -------- CONVERSIÓN --------
+# Convierte un archivo de texto (id|nombre|cantidad|precio) a binario
+def txt_a_binario(ruta_txt: str, ruta_bin: str) -> int:
+    def leer():
+        vistos = set()
+
+        with open(ruta_txt, "r", encoding="utf-8") as f:
+            for linea in f:
+                if not linea.strip():
+                    continue
+
+                # Igual que al cargar el TXT: se ignoran líneas dañadas e IDs repetidos
+                try:
+                    producto = Producto.from_linea(linea)
+                except ValueError:
+                    continue
+
+                if producto.get_id() not in vistos:
+                    vistos.add(producto.get_id())
+                    yield producto
+
+    return escribir_binario(leer(), ruta_bin)
+
+
+# Convierte un archivo binario al formato de texto (Producto.to_linea)
+def binario_a_txt(ruta_bin: str, ruta_txt: str) -> int:
+    archivo = ArchivoBinario(ruta_bin)
+    total = 0
+
+    try:
+        with open(ruta_txt, "w", encoding="utf-8") as f:
+            for producto in archivo.productos():
+                f.write(producto.to_linea() + "\n")
+                total += 1
+    finally:
+        archivo.cerrar()
+
+    return total
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("a-binario", "a-texto"):
+        print("Uso: python -m servicios.formato_binario a-binario|a-texto ORIGEN DESTINO")
+        sys.exit(1)
+
+    convertir = txt_a_binario if sys.argv[1] == "a-binario" else binario_a_txt
+    print(f"{convertir(sys.argv[2], sys.argv[3])} productos convertidos.")
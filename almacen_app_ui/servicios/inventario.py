@@ -1,108 +1,785 @@
 # servicios/inventario.py
+"""
+La persistencia la resuelve un almacenamiento (servicios/almacenamiento.py):
+TXT con diario (por defecto) o SQLite.
+Con `with inventario.transaccion():` los cambios se guardan una vez al final y,
+si algo falla, los cambios en memoria se deshacen (una anidada deshace solo lo suyo).
+Cada modificación bloquea el almacenamiento y antes trae los cambios de otros
+procesos (p. ej. la consola sobre el mismo archivo): no se pierden actualizaciones.
+Con multihilo=True las consultas corren en paralelo y las modificaciones de a una
+(la UI lee desde el hilo de Tkinter mientras el trabajador escribe).
+Cada cambio de stock queda en un libro de movimientos (servicios/movimientos.py) y
+los totales (unidades, valor) se mantienen al día: leerlos es O(1).
+Con carga_diferida=True el constructor vuelve enseguida y los productos llegan de a
+partes desde un hilo: pagina, total_productos y buscar_por_id responden con lo que
+ya llegó (la tabla se pinta enseguida); lo demás espera a que termine la carga.
+Con guardado=PoliticaGuardado(cada, inactividad_ms) (servicios/autoguardado.py) los
+cambios se juntan en memoria y se escriben de una vez (cada N cambios, tras T ms sin
+cambios, con volcar(), guardar o cerrar), resumidos: varias actualizaciones del mismo
+producto quedan en la última. Si otro proceso guarda antes, lo propio sin guardar se
+vuelve a aplicar encima de lo suyo (con el mismo producto, gana el último que guarda).
+Con historial=N se pueden deshacer / rehacer las últimas N modificaciones (deshacer(),
+rehacer()). Cada paso guarda solo las inversas de lo que cambió (referencias a los
+mismos productos, sin copiar el inventario): memoria proporcional a las ediciones y
+deshacer cuesta lo mismo que la modificación. Se deshace por ID, sobre lo que haya
+ahora (también si otro proceso cambió el producto), y se guarda como un cambio más.
+"""
 
-import os
-from typing import Optional
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from typing import Iterable, Iterator, Mapping, Optional
 from modelos.producto import Producto
+from servicios.indice_nombres import IndiceNombres
+from servicios.indice_rango import IndiceOrdenado
+from servicios.almacenamiento import AlmacenamientoTxt
+from servicios.bloqueo import BloqueoLecturaEscritura, SinBloqueo
+from servicios.movimientos import LibroMovimientos, Movimiento, Totales
+from servicios.metricas import Metricas
+from servicios.autoguardado import PoliticaGuardado, Temporizador
 
 
 class Inventario:
 
-    def __init__(self, ruta_archivo: str = None):
-        self.__productos: list[Producto] = []
+    # Métodos que se cronometran con activar_metricas()
+    OPERACIONES_MEDIDAS = (
+        "cargar_desde_archivo", "guardar_en_archivo", "sincronizar",
+        "agregar_producto", "eliminar_producto", "actualizar_producto", "entrada", "salida",
+        "agregar_productos", "actualizar_productos", "volcar", "deshacer", "rehacer",
+        "buscar_por_id", "buscar_por_nombre", "refinar_busqueda", "buscar_por_cantidad",
+        "buscar_por_precio", "productos_bajo_stock", "pagina", "instantanea", "listar_productos",
+    )
 
-        # Guarda en inventario_app_ui/registros/inventario.txt
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        if ruta_archivo is None:
-            ruta_archivo = os.path.join(base_dir, "registros", "inventario.txt")
+    def __init__(self, ruta_archivo: str = None, usar_diario: bool = True,
+                 confiar_archivo: bool = False, almacenamiento=None, multihilo: bool = False,
+                 registrar_movimientos: bool = True, metricas: bool = False,
+                 carga_diferida: bool = False, guardado: Optional[PoliticaGuardado] = None,
+                 historial: int = 0):
+        # ID -> Producto (el dict conserva el orden de inserción)
+        self.__productos: dict[int, Producto] = {}
+        # Trigramas para buscar_por_nombre (se construye en la primera búsqueda)
+        self.__indice_nombres: Optional[IndiceNombres] = None
+        # Índices ordenados por cantidad y precio (consultas por rango, también diferidos)
+        self.__indice_cantidad: Optional[IndiceOrdenado] = None
+        self.__indice_precio: Optional[IndiceOrdenado] = None
+        # IDs en orden para paginar; se rehace tras altas o bajas
+        self.__vista: Optional[tuple[int, ...]] = None
+        # Tupla inmutable para listar_productos (copy-on-write: se rehace tras altas o bajas)
+        self.__instantanea: Optional[tuple[Producto, ...]] = None
+        # Unidades y valor totales (se calculan al pedirlos y luego se mantienen)
+        self.__totales: Optional[Totales] = None
+        # Cuándo se escriben las modificaciones (por defecto, cada una al terminar)
+        self.guardado = guardado if guardado is not None else PoliticaGuardado()
+        self.guardado.validar()
+        # Lectores en paralelo / un escritor; SinBloqueo no cuesta nada con un solo hilo
+        # (la carga diferida y el guardado por inactividad usan otro hilo: bloqueo real)
+        en_otro_hilo = carga_diferida or self.guardado.con_temporizador
+        self.__hilos = BloqueoLecturaEscritura() if multihilo or en_otro_hilo else SinBloqueo()
+        self.__construccion = threading.Lock()
 
-        self.ruta_archivo = ruta_archivo
-        self.cargar_desde_archivo()
+        # Por defecto: inventario_app_ui/registros/inventario.txt con diario
+        if almacenamiento is None:
+            almacenamiento = AlmacenamientoTxt(ruta_archivo, usar_diario, confiar_archivo)
+        self.almacenamiento = almacenamiento
+        # Libro de movimientos junto al inventario (inventario.txt.movimientos)
+        self.libro = LibroMovimientos(almacenamiento.ruta + ".movimientos") if registrar_movimientos else None
+
+        # Transacción activa: inversas para deshacer y registros pendientes
+        self.__inversas: Optional[list[tuple]] = None
+        self.__pendientes: list[tuple] = []
+        self.__movimientos: list[tuple] = []
+        # Deshacer / rehacer: un paso (lista de inversas) por modificación o transacción;
+        # __paso junta las de la modificación en curso (None = sin historial)
+        self.__pasos_deshacer: Optional[deque] = deque(maxlen=historial) if historial > 0 else None
+        self.__pasos_rehacer: deque = deque(maxlen=max(historial, 0))
+        self.__paso: list[tuple] = []
+        # Guardado diferido: operaciones (None = anulada) y grupos (fecha, movimientos)
+        # sin escribir, posición de la última operación de cada ID y cuántos cambios son
+        self.__sin_guardar: list[Optional[tuple]] = []
+        self.__movimientos_sin_guardar: list[tuple] = []
+        self.__ultima_sin_guardar: dict[int, int] = {}
+        self.__cambios_sin_guardar = 0
+        self.__sin_guardar_desde: Optional[float] = None
+        self.__temporizador: Optional[Temporizador] = None
+        if self.guardado.con_temporizador:
+            # (lambda: así con métricas activas también se mide el volcado del temporizador)
+            self.__temporizador = Temporizador(self.guardado.inactividad_ms / 1000, lambda: self.volcar())
+        # Veces que se trajeron cambios de otros procesos (para repintar la tabla)
+        self.sincronizaciones = 0
+        # Métricas (servicios/metricas.py); se activan antes de cargar para medir la carga
+        self.metricas: Optional[Metricas] = None
+        if metricas:
+            self.activar_metricas()
+        # Se marca al terminar la carga (enseguida si no es diferida)
+        self.__cargado = threading.Event()
+        self.__cancelar_carga = False
+        # Avisa cada parte que llega (buscar_por_id espera la próxima, no la carga entera)
+        self.__parte_nueva = threading.Condition()
+        if carga_diferida:
+            threading.Thread(target=self._cargar_por_partes, name="carga-inventario", daemon=True).start()
+        else:
+            self.__cargado.set()
+            self.cargar_desde_archivo()
 
     # -------- INTERNOS --------
-    def _buscar_indice_por_id(self, producto_id: int) -> int:
-        for i, producto in enumerate(self.__productos):
-            if producto.get_id() == producto_id:
-                return i
-        return -1
+    @property
+    def ruta_archivo(self) -> str:
+        return self.almacenamiento.ruta
+
+    @property
+    def lineas_invalidas(self) -> int:
+        return self.almacenamiento.lineas_invalidas
 
     def asegurar_archivo(self) -> None:
-        carpeta = os.path.dirname(self.ruta_archivo)
-        if not os.path.exists(carpeta):
-            os.makedirs(carpeta, exist_ok=True)
+        self.almacenamiento.asegurar()
+
+    def _registrar(self, operacion: tuple, inversa: tuple, tipo: str, cantidad: int, producto: Producto) -> None:
+        # Se guarda al salir de _escritura (o al final de la transacción)
+        if self.__inversas is not None:
+            self.__inversas.append(inversa)
+        if self.__pasos_deshacer is not None:
+            self.__paso.append(inversa)
+        self.__pendientes.append(operacion)
+        if self.libro is not None:
+            saldo = producto.get_cantidad() if operacion[0] != "D" else 0
+            self.__movimientos.append((producto.get_id(), tipo, cantidad, saldo, producto.get_precio()))
+
+    def _persistir(self, operaciones: list[tuple], grupos: list[tuple]) -> None:
+        # grupos: (fecha, movimientos); fecha None = cambios recién hechos
+        if operaciones:
+            try:
+                self.almacenamiento.registrar(operaciones, self.__productos)
+            except Exception as e:
+                print(f"Error al guardar cambios: {e}")
+                return
+        # Con el almacenamiento todavía bloqueado: el libro sigue el orden del diario
+        # (puede haber movimientos sin operaciones: un alta y su baja antes de guardar)
+        if not grupos:
+            return
+        try:
+            self.libro.anotar_grupos(grupos)
+        except OSError as e:
+            print(f"Error al anotar movimientos: {e}")
+
+    def _poner(self, producto: Producto) -> None:
+        self.__productos[producto.get_id()] = producto
+        self.__vista = None
+        self.__instantanea = None
+        if self.__indice_nombres is not None:
+            self.__indice_nombres.agregar(producto.get_id(), producto.get_nombre())
+        if self.__totales is not None:
+            self.__totales.sumar(producto.get_cantidad(), producto.get_precio())
+        self._reindexar_valores(producto)
+
+    def _quitar(self, producto_id: int) -> Optional[Producto]:
+        producto = self.__productos.pop(producto_id, None)
+        if producto is not None:
+            self.__vista = None
+            self.__instantanea = None
+            if self.__indice_nombres is not None:
+                self.__indice_nombres.quitar(producto_id)
+            if self.__indice_cantidad is not None:
+                self.__indice_cantidad.quitar(producto_id)
+                self.__indice_precio.quitar(producto_id)
+            if self.__totales is not None:
+                self.__totales.restar(producto.get_cantidad(), producto.get_precio())
+        return producto
+
+    def _poner_valores(self, producto: Producto, cantidad: int, precio: float) -> None:
+        # Cantidad y precio ya validados
+        anteriores = producto.get_cantidad(), producto.get_precio()
+        producto.set_cantidad(cantidad)
+        producto.set_precio(precio)
+        self._valores_cambiados(producto, *anteriores)
+
+    def _valores_cambiados(self, producto: Producto, cantidad: int, precio: float) -> None:
+        # Recibe los valores anteriores; mantiene totales e índices
+        if self.__totales is not None:
+            self.__totales.restar(cantidad, precio)
+            self.__totales.sumar(producto.get_cantidad(), producto.get_precio())
+        self._reindexar_valores(producto)
 
-        if not os.path.exists(self.ruta_archivo):
-            with open(self.ruta_archivo, "w", encoding="utf-8"):
-                pass
+    def _reindexar_valores(self, producto: Producto) -> None:
+        if self.__indice_cantidad is not None:
+            self.__indice_cantidad.poner(producto.get_id(), producto.get_cantidad())
+            self.__indice_precio.poner(producto.get_id(), producto.get_precio())
+
+    def _indice_nombres(self) -> IndiceNombres:
+        # Se publica ya completo (otros lectores pueden estar consultando)
+        if self.__indice_nombres is None:
+            with self.__construccion:
+                if self.__indice_nombres is None:
+                    indice = IndiceNombres()
+                    for p in self.__productos.values():
+                        indice.agregar(p.get_id(), p.get_nombre())
+                    self.__indice_nombres = indice
+        return self.__indice_nombres
+
+    def _indices_rango(self) -> tuple[IndiceOrdenado, IndiceOrdenado]:
+        if self.__indice_cantidad is None:
+            with self.__construccion:
+                if self.__indice_cantidad is None:
+                    productos = self.__productos.values()
+                    self.__indice_precio = IndiceOrdenado((p.get_id(), p.get_precio()) for p in productos)
+                    self.__indice_cantidad = IndiceOrdenado((p.get_id(), p.get_cantidad()) for p in productos)
+        return self.__indice_cantidad, self.__indice_precio
+
+    def _totales(self) -> Totales:
+        if self.__totales is None:
+            with self.__construccion:
+                if self.__totales is None:
+                    self.__totales = Totales(self.__productos.values())
+        return self.__totales
+
+    def _revertir(self, inversa: tuple) -> None:
+        tipo = inversa[0]
+        if tipo == "quitar":
+            self._quitar(inversa[1])
+        elif tipo == "poner":
+            self._poner(inversa[1])
+        elif tipo == "valores":
+            _, producto, cantidad, precio = inversa
+            self._poner_valores(producto, cantidad, precio)
 
     # -------- PERSISTENCIA --------
     def cargar_desde_archivo(self) -> None:
+        self._esperar_carga()
+        with self.__hilos.escritura():
+            self.__indice_nombres = None
+            self.__indice_cantidad = None
+            self.__indice_precio = None
+            self.__vista = None
+            self.__instantanea = None
+            self.__totales = None
+            try:
+                self.__productos = self.almacenamiento.cargar()
+            except Exception as e:
+                self.__productos = {}
+                print(f"Error al cargar archivo: {e}")
+
+    def guardar_en_archivo(self) -> None:
+        # Nunca se guarda un inventario a medio cargar
+        self._esperar_carga()
         try:
-            self.asegurar_archivo()
-            self.__productos.clear()
+            with ExitStack() as procesos:
+                with self.__hilos.escritura():
+                    procesos.enter_context(self.almacenamiento.bloqueo)
+                    self._sincronizar()
+                    operaciones, grupos = self._tomar_sin_guardar()
+                # Lo pendiente va antes (en SQLite guardar_todo no escribe filas) y al libro
+                self._persistir(operaciones, grupos)
+                # Sin bloquear a los lectores (la tabla sigue pintando); los escritores esperan
+                self.almacenamiento.guardar_todo(self.__productos)
+        except Exception as e:
+            print(f"Error al guardar archivo: {e}")
+
+    def cerrar(self) -> None:
+        # Interrumpe una carga diferida en curso y guarda lo pendiente
+        self.__cancelar_carga = True
+        self._esperar_carga()
+        if self.__temporizador is not None:
+            self.__temporizador.detener()
+        self.volcar()
+        with self.__hilos.escritura(), self.almacenamiento.bloqueo:
+            self.almacenamiento.cerrar()
 
-            with open(self.ruta_archivo, "r", encoding="utf-8") as f:
-                for linea in f:
-                    linea = linea.strip()
-                    if not linea:
-                        continue
+    # -------- CARGA DIFERIDA --------
+    @property
+    def cargando(self) -> bool:
+        return not self.__cargado.is_set()
 
-                    try:
-                        producto = Producto.from_linea(linea)
-                        self.__productos.append(producto)
-                    except Exception:
-                        continue
+    def _esperar_carga(self) -> None:
+        # Sin tener el bloqueo de hilos: la carga lo necesita para avanzar
+        if not self.__cargado.is_set():
+            self.__cargado.wait()
 
+    def esperar_parte(self) -> None:
+        # La próxima parte de la carga diferida (o su fin); sin carga en curso vuelve enseguida
+        with self.__parte_nueva:
+            if not self.__cargado.is_set():
+                self.__parte_nueva.wait()
+
+    def _cargar_por_partes(self) -> None:
+        # Cada parte se agrega con acceso exclusivo breve; entre partes se ve lo ya cargado
+        inicio = time.perf_counter_ns()
+        partes = self.almacenamiento.cargar_por_partes()
+        primera = True
+        try:
+            for parte in partes:
+                with self.__hilos.escritura():
+                    if primera:
+                        self.__productos = parte
+                    elif self.__productos.keys().isdisjoint(parte):
+                        self.__productos.update(parte)
+                    else:
+                        # ID repetido: vale el primero (como en la carga completa)
+                        productos = self.__productos
+                        for producto_id, producto in parte.items():
+                            productos.setdefault(producto_id, producto)
+                    self.__vista = None
+                    self.__instantanea = None
+                with self.__parte_nueva:
+                    self.__parte_nueva.notify_all()
+                if primera and self.metricas is not None:
+                    self.metricas.registrar("carga_diferida.primera_parte", time.perf_counter_ns() - inicio)
+                primera = False
+                if self.__cancelar_carga:
+                    break
         except Exception as e:
+            with self.__hilos.escritura():
+                self.__productos = {}
+                self.__vista = None
+                self.__instantanea = None
             print(f"Error al cargar archivo: {e}")
+        finally:
+            partes.close()
+            if self.metricas is not None:
+                self.metricas.registrar("carga_diferida.total", time.perf_counter_ns() - inicio)
+            with self.__parte_nueva:
+                self.__cargado.set()
+                self.__parte_nueva.notify_all()
 
-    def guardar_en_archivo(self) -> None:
+    # -------- VARIOS PROCESOS --------
+    def sincronizar(self) -> bool:
+        # Trae lo que otro proceso guardó; True si hubo cambios
+        self._esperar_carga()
+        with self.__hilos.escritura(), self.almacenamiento.bloqueo:
+            return self._sincronizar()
+
+    def _sincronizar(self) -> bool:
         try:
-            self.asegurar_archivo()
-            with open(self.ruta_archivo, "w", encoding="utf-8") as f:
-                for p in self.__productos:
-                    f.write(p.to_linea() + "\n")
+            operaciones = self.almacenamiento.cambios_externos()
         except Exception as e:
-            print(f"Error al guardar archivo: {e}")
+            print(f"Error al leer cambios externos: {e}")
+            return False
 
-    # -------- CRUD --------
-    def agregar_producto(self, producto: Producto) -> bool:
-        if self._buscar_indice_por_id(producto.get_id()) != -1:
+        # None: la foto fue reemplazada, se recarga todo
+        if operaciones is None:
+            self.cargar_desde_archivo()
+        elif operaciones:
+            for operacion in operaciones:
+                self._aplicar(operacion)
+        else:
             return False
-        self.__productos.append(producto)
-        self.guardar_en_archivo()
+
+        # Lo propio sin guardar quedará después en disco: vuelve a ir encima
+        for operacion in self.__sin_guardar:
+            if operacion is not None:
+                self._aplicar(operacion)
+        self.sincronizaciones += 1
         return True
 
+    def _aplicar(self, operacion: tuple) -> None:
+        tipo = operacion[0]
+        if tipo == "A":
+            # Si el ID ya estaba (p. ej. un alta propia sin guardar), la última reemplaza
+            self._quitar(operacion[1].get_id())
+            self._poner(operacion[1])
+        elif tipo == "U":
+            _, producto_id, cantidad, precio = operacion
+            producto = self.__productos.get(producto_id)
+            if producto is not None:
+                self._poner_valores(producto, cantidad, precio)
+        elif tipo == "D":
+            self._quitar(operacion[1])
+
+    @contextmanager
+    def _escritura(self):
+        # Exclusivo entre hilos, luego entre procesos (siempre en ese orden) + cambios ajenos.
+        # Dentro de una transacción ya está hecho. Antes, que termine la carga diferida.
+        self._esperar_carga()
+        with ExitStack() as procesos:
+            with self.__hilos.escritura():
+                if self.__inversas is not None:
+                    yield
+                    return
+                procesos.enter_context(self.almacenamiento.bloqueo)
+                self._sincronizar()
+                try:
+                    yield
+                except BaseException:
+                    # Lo que falló ya se revirtió (o no llegó a cambiar): no es un paso
+                    self.__paso = []
+                    raise
+                finally:
+                    if self.__paso:
+                        self._anotar_paso()
+                    pendientes, self.__pendientes = self.__pendientes, []
+                    movimientos, self.__movimientos = self.__movimientos, []
+                    grupos = [(None, movimientos)] if movimientos else []
+                    # Con guardado diferido se juntan; solo se escriben si ya toca
+                    if not self.guardado.inmediata:
+                        pendientes, grupos = self._diferir(pendientes, grupos)
+            # El disco se escribe ya sin bloquear a los lectores (el almacenamiento sigue bloqueado)
+            self._persistir(pendientes, grupos)
+
+    # -------- GUARDADO DIFERIDO --------
+    @property
+    def cambios_sin_guardar(self) -> int:
+        return self.__cambios_sin_guardar
+
+    def estado_guardado(self) -> str:
+        # Para la barra de estado ("" si no falta guardar nada)
+        cambios, desde = self.__cambios_sin_guardar, self.__sin_guardar_desde
+        if not cambios or desde is None:
+            return ""
+        return f"{cambios} cambio{'s' if cambios != 1 else ''} sin guardar (hace {time.monotonic() - desde:.1f} s)"
+
+    def volcar(self) -> int:
+        # Escribe ya lo pendiente en una sola escritura; devuelve cuántos cambios guardó
+        with ExitStack() as procesos:
+            with self.__hilos.escritura():
+                if not self.__cambios_sin_guardar:
+                    return 0
+                procesos.enter_context(self.almacenamiento.bloqueo)
+                self._sincronizar()
+                cambios = self.__cambios_sin_guardar
+                operaciones, grupos = self._tomar_sin_guardar()
+            self._persistir(operaciones, grupos)
+        return cambios
+
+    def _diferir(self, operaciones: list[tuple], grupos: list[tuple]) -> tuple[list, list]:
+        # Suma a lo pendiente; devuelve todo lo pendiente si se llegó a `cada` (si no, nada)
+        if operaciones:
+            if not self.__cambios_sin_guardar:
+                self.__sin_guardar_desde = time.monotonic()
+            for operacion in operaciones:
+                self._anotar_sin_guardar(operacion)
+            self.__cambios_sin_guardar += len(operaciones)
+            # Los movimientos conservan la hora del cambio, no la del guardado
+            ahora = time.time()
+            self.__movimientos_sin_guardar.extend((ahora, movimientos) for _, movimientos in grupos)
+            if self.__temporizador is not None:
+                self.__temporizador.tocar()
+        cada = self.guardado.cada
+        if cada and self.__cambios_sin_guardar >= cada:
+            return self._tomar_sin_guardar()
+        return [], []
+
+    def _anotar_sin_guardar(self, operacion: tuple) -> None:
+        # Se resume con la anterior del mismo producto: U tras U queda la última, U tras A
+        # sobra (el alta se escribe con los valores actuales) y D tras A se anulan
+        tipo = operacion[0]
+        producto_id = operacion[1].get_id() if tipo == "A" else operacion[1]
+        pendientes = self.__sin_guardar
+        posicion = self.__ultima_sin_guardar.get(producto_id)
+        anterior = pendientes[posicion][0] if posicion is not None else None
+        if tipo == "U" and anterior == "U":
+            pendientes[posicion] = operacion
+        elif tipo == "U" and anterior == "A":
+            pass
+        elif tipo == "D" and anterior == "A":
+            pendientes[posicion] = None
+            del self.__ultima_sin_guardar[producto_id]
+        else:
+            self.__ultima_sin_guardar[producto_id] = len(pendientes)
+            pendientes.append(operacion)
+
+    def _tomar_sin_guardar(self) -> tuple[list, list]:
+        if not self.__cambios_sin_guardar:
+            return [], []
+        operaciones = [operacion for operacion in self.__sin_guardar if operacion is not None]
+        grupos = self.__movimientos_sin_guardar
+        self.__sin_guardar = []
+        self.__movimientos_sin_guardar = []
+        self.__ultima_sin_guardar = {}
+        self.__cambios_sin_guardar = 0
+        self.__sin_guardar_desde = None
+        return operaciones, grupos
+
+    # -------- DESHACER --------
+    @property
+    def con_historial(self) -> bool:
+        return self.__pasos_deshacer is not None
+
+    @property
+    def puede_deshacer(self) -> bool:
+        return bool(self.__pasos_deshacer)
+
+    @property
+    def puede_rehacer(self) -> bool:
+        return bool(self.__pasos_rehacer)
+
+    def deshacer(self) -> bool:
+        return self._mover_paso(self.__pasos_deshacer, self.__pasos_rehacer)
+
+    def rehacer(self) -> bool:
+        return self._mover_paso(self.__pasos_rehacer, self.__pasos_deshacer)
+
+    def _anotar_paso(self) -> None:
+        # Un cambio nuevo descarta lo que se había deshecho
+        paso, self.__paso = self.__paso, []
+        self.__pasos_deshacer.append(paso)
+        self.__pasos_rehacer.clear()
+
+    def _mover_paso(self, origen: Optional[deque], destino: deque) -> bool:
+        # Aplica las inversas del último paso de `origen` como una modificación más; las
+        # inversas de eso (lo que vuelve a dejarlo como estaba) son el paso de `destino`
+        with self._escritura():
+            if self.__inversas is not None:
+                raise ValueError("No se puede deshacer dentro de una transacción.")
+            if not origen:
+                return False
+            for inversa in reversed(origen.pop()):
+                self._aplicar_inversa(inversa)
+            paso, self.__paso = self.__paso, []
+            if paso:
+                destino.append(paso)
+            return True
+
+    def _aplicar_inversa(self, inversa: tuple) -> None:
+        # Por ID: el producto pudo cambiar o recargarse (otro proceso) desde entonces
+        tipo = inversa[0]
+        if tipo == "quitar":
+            producto = self._quitar(inversa[1])
+            if producto is not None:
+                self._registrar(("D", inversa[1]), ("poner", producto), "ajuste", -producto.get_cantidad(), producto)
+        elif tipo == "poner":
+            producto = inversa[1]
+            if producto.get_id() not in self.__productos:
+                self._poner(producto)
+                self._registrar(("A", producto), ("quitar", producto.get_id()),
+                                "entrada", producto.get_cantidad(), producto)
+        elif tipo == "valores":
+            _, anterior, cantidad, precio = inversa
+            producto = self.__productos.get(anterior.get_id())
+            if producto is not None:
+                self._actualizar(producto, cantidad, precio, "ajuste")
+
+    # -------- CRUD --------
+    def agregar_producto(self, producto: Producto) -> bool:
+        with self._escritura():
+            if producto.get_id() in self.__productos:
+                return False
+            self._poner(producto)
+            self._registrar(("A", producto), ("quitar", producto.get_id()),
+                            "entrada", producto.get_cantidad(), producto)
+            return True
+
     def eliminar_producto(self, producto_id: int) -> bool:
-        indice = self._buscar_indice_por_id(producto_id)
-        if indice == -1:
-            return False
-        self.__productos.pop(indice)
-        self.guardar_en_archivo()
-        return True
+        with self._escritura():
+            producto = self._quitar(producto_id)
+            if producto is None:
+                return False
+            self._registrar(("D", producto_id), ("poner", producto), "ajuste", -producto.get_cantidad(), producto)
+            return True
 
     def actualizar_producto(self, producto_id: int, nueva_cantidad=None, nuevo_precio=None) -> bool:
-        indice = self._buscar_indice_por_id(producto_id)
-        if indice == -1:
-            return False
+        # En el libro queda como ajuste
+        with self._escritura():
+            producto = self.__productos.get(producto_id)
+            if producto is None:
+                return False
+            self._actualizar(producto, nueva_cantidad, nuevo_precio, "ajuste")
+            return True
 
-        producto = self.__productos[indice]
+    def entrada(self, producto_id: int, unidades: int) -> bool:
+        self._validar_unidades(unidades)
+        with self._escritura():
+            producto = self.__productos.get(producto_id)
+            if producto is None:
+                return False
+            self._actualizar(producto, producto.get_cantidad() + unidades, None, "entrada")
+            return True
 
-        if nueva_cantidad is not None:
-            producto.set_cantidad(nueva_cantidad)
+    def salida(self, producto_id: int, unidades: int) -> bool:
+        self._validar_unidades(unidades)
+        with self._escritura():
+            producto = self.__productos.get(producto_id)
+            if producto is None:
+                return False
+            if unidades > producto.get_cantidad():
+                raise ValueError(f"Stock insuficiente: hay {producto.get_cantidad()} unidades.")
+            self._actualizar(producto, producto.get_cantidad() - unidades, None, "salida")
+            return True
 
-        if nuevo_precio is not None:
-            producto.set_precio(nuevo_precio)
+    @staticmethod
+    def _validar_unidades(unidades: int) -> None:
+        if isinstance(unidades, bool) or not isinstance(unidades, int) or unidades <= 0:
+            raise ValueError("Las unidades deben ser un entero positivo.")
 
-        self.guardar_en_archivo()
-        return True
-    
+    def _actualizar(self, producto: Producto, nueva_cantidad, nuevo_precio, tipo: str) -> None:
+        # Con _escritura ya tomada
+        cantidad, precio = producto.get_cantidad(), producto.get_precio()
+        try:
+            if nueva_cantidad is not None:
+                producto.set_cantidad(nueva_cantidad)
+
+            if nuevo_precio is not None:
+                producto.set_precio(nuevo_precio)
+        except BaseException:
+            producto.set_cantidad(cantidad)
+            producto.set_precio(precio)
+            raise
+
+        self._valores_cambiados(producto, cantidad, precio)
+        self._registrar(("U", producto.get_id(), producto.get_cantidad(), producto.get_precio()),
+                        ("valores", producto, cantidad, precio),
+                        tipo, producto.get_cantidad() - cantidad, producto)
+
+    # -------- LOTES --------
+    @contextmanager
+    def transaccion(self):
+        with self._escritura():
+            # Anidada: punto de guardado dentro de la exterior (si falla, se deshace solo lo suyo)
+            if self.__inversas is not None:
+                marcas = (len(self.__inversas), len(self.__pendientes), len(self.__movimientos), len(self.__paso))
+                try:
+                    yield self
+                except BaseException:
+                    self._volver_a(*marcas)
+                    raise
+                return
+
+            self.__inversas = []
+            try:
+                yield self
+            except BaseException:
+                for inversa in reversed(self.__inversas):
+                    self._revertir(inversa)
+                self.__pendientes = []
+                self.__movimientos = []
+                raise
+            finally:
+                self.__inversas = None
+
+    def _volver_a(self, inversas: int, pendientes: int, movimientos: int, paso: int) -> None:
+        for inversa in reversed(self.__inversas[inversas:]):
+            self._revertir(inversa)
+        del self.__inversas[inversas:]
+        del self.__pendientes[pendientes:]
+        del self.__movimientos[movimientos:]
+        del self.__paso[paso:]
+
+    def agregar_productos(self, productos: Iterable[Producto]) -> int:
+        total = 0
+        with self.transaccion():
+            # Sin pasar por agregar_producto: ya está bloqueado y sincronizado
+            existentes = self.__productos
+            for producto in productos:
+                producto_id = producto.get_id()
+                if producto_id in existentes:
+                    raise ValueError(f"El ID {producto_id} ya existe.")
+                self._poner(producto)
+                self._registrar(("A", producto), ("quitar", producto_id), "entrada", producto.get_cantidad(), producto)
+                total += 1
+        return total
+
+    def actualizar_productos(self, cambios: Mapping[int, tuple]) -> int:
+        # cambios: {id: (cantidad, precio)}; None deja el valor como está
+        total = 0
+        with self.transaccion():
+            for producto_id, (cantidad, precio) in cambios.items():
+                if not self.actualizar_producto(producto_id, cantidad, precio):
+                    raise ValueError(f"No existe producto con ID {producto_id}.")
+                total += 1
+        return total
+
+    # -------- CONSULTAS --------
     def buscar_por_id(self, producto_id: int) -> Optional[Producto]:
-        indice = self._buscar_indice_por_id(producto_id)
-        return None if indice == -1 else self.__productos[indice]
+        with self.__hilos.lectura():
+            producto = self.__productos.get(producto_id)
+        # Durante la carga diferida puede que todavía no haya llegado: se espera la próxima parte
+        while producto is None and not self.__cargado.is_set():
+            self.esperar_parte()
+            with self.__hilos.lectura():
+                producto = self.__productos.get(producto_id)
+        return producto
 
     def buscar_por_nombre(self, texto: str) -> list[Producto]:
-        texto = texto.strip().lower()
-        return [p for p in self.__productos if texto in p.get_nombre().lower()]
+        # Sin distinguir mayúsculas ni tildes ("pantalon" encuentra "Pantalón")
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            indice = self._indice_nombres()
+            return [self.__productos[pid] for pid in indice.buscar(texto)]
+
+    def refinar_busqueda(self, productos: list[Producto], texto: str) -> list[Producto]:
+        # Filtra solo los resultados anteriores ("pan" -> "pant")
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            indice = self._indice_nombres()
+            ids = indice.filtrar([p.get_id() for p in productos], texto)
+            return [self.__productos[pid] for pid in ids]
+
+    def buscar_por_cantidad(self, minimo=None, maximo=None) -> list[Producto]:
+        self._esperar_carga()
+        # minimo <= cantidad <= maximo (None = sin límite), ordenados por cantidad
+        with self.__hilos.lectura():
+            indice_cantidad, _ = self._indices_rango()
+            return [self.__productos[pid] for pid in indice_cantidad.rango(minimo, maximo)]
+
+    def buscar_por_precio(self, minimo=None, maximo=None) -> list[Producto]:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            _, indice_precio = self._indices_rango()
+            return [self.__productos[pid] for pid in indice_precio.rango(minimo, maximo)]
+
+    def productos_bajo_stock(self, umbral: int) -> list[Producto]:
+        self._esperar_carga()
+        # cantidad < umbral
+        with self.__hilos.lectura():
+            indice_cantidad, _ = self._indices_rango()
+            return [self.__productos[pid] for pid in indice_cantidad.menores_que(umbral)]
+
+    def total_productos(self) -> int:
+        with self.__hilos.lectura():
+            return len(self.__productos)
+
+    # -------- STOCK --------
+    def unidades_totales(self) -> int:
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            return self._totales().unidades
+
+    def valor_inventario(self) -> float:
+        self._esperar_carga()
+        # Suma de cantidad x precio
+        with self.__hilos.lectura():
+            return self._totales().valor
+
+    def saldo(self, producto_id: int) -> Optional[int]:
+        producto = self.buscar_por_id(producto_id)
+        return None if producto is None else producto.get_cantidad()
+
+    def movimientos(self, producto_id: Optional[int] = None) -> Iterator[Movimiento]:
+        # Del libro, del más viejo al más nuevo
+        if self.libro is None:
+            return iter(())
+        return self.libro.leer(producto_id)
+
+    def pagina(self, inicio: int, cantidad: int) -> list[Producto]:
+        # Solo materializa las filas pedidas (para la tabla virtual de la UI);
+        # durante la carga diferida responde con lo que ya llegó
+        with self.__hilos.lectura():
+            if self.__vista is None:
+                with self.__construccion:
+                    if self.__vista is None:
+                        self.__vista = tuple(self.__productos)
+            return [self.__productos[pid] for pid in self.__vista[inicio:inicio + cantidad]]
+
+    def instantanea(self) -> tuple[Producto, ...]:
+        # Tupla que nadie modifica: se recorre sin bloquear a los escritores
+        self._esperar_carga()
+        with self.__hilos.lectura():
+            if self.__instantanea is None:
+                with self.__construccion:
+                    if self.__instantanea is None:
+                        self.__instantanea = tuple(self.__productos.values())
+            return self.__instantanea
 
     def listar_productos(self) -> list[Producto]:
-        return self.__productos.copy()
\ No newline at end of file
+        return list(self.instantanea())
+
+    # -------- MÉTRICAS --------
+    def activar_metricas(self) -> Metricas:
+        if self.metricas is None:
+            self.metricas = Metricas()
+            self.metricas.instrumentar(self, self.OPERACIONES_MEDIDAS)
+            self.metricas.instrumentar_almacenamiento(self.almacenamiento)
+        return self.metricas
+
+    def desactivar_metricas(self) -> None:
+        if self.metricas is not None:
+            self.metricas.desinstrumentar()
+            self.metricas = None
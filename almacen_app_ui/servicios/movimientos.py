@@ -0,0 +1,106 @@
+# servicios/movimientos.py
+"""
+Libro de movimientos de stock (entrada / salida / ajuste) y totales del inventario.
+Cada línea: fecha|id|tipo|cantidad|saldo|precio (cantidad con signo, saldo después
+del movimiento). Solo se agrega al final; no se fuerza a disco con fsync.
+"""
+
+import os
+import time
+from datetime import datetime
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+
+TIPOS = ("entrada", "salida", "ajuste")
+
+
+class Movimiento(NamedTuple):
+    fecha: float
+    producto_id: int
+    tipo: str
+    cantidad: int
+    saldo: int
+    precio: float
+
+    SEPARADOR = "|"
+
+    @classmethod
+    def from_linea(cls, linea: str) -> "Movimiento":
+        partes = linea.strip().split(cls.SEPARADOR)
+        if len(partes) != 6 or partes[2] not in TIPOS:
+            raise ValueError("Línea inválida en el libro de movimientos.")
+
+        return cls(float(partes[0]), int(partes[1]), partes[2], int(partes[3]), int(partes[4]), float(partes[5]))
+
+    def __str__(self) -> str:
+        fecha = datetime.fromtimestamp(self.fecha).strftime("%Y-%m-%d %H:%M:%S")
+        return (
+            f"{fecha} | ID: {self.producto_id} | {self.tipo:<7} | "
+            f"{self.cantidad:+d} | Saldo: {self.saldo} | Precio: ${self.precio:.2f}"
+        )
+
+
+class LibroMovimientos:
+    """Archivo de movimientos: se agrega al final y se lee de a una línea."""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+
+    # Agrega (producto_id, tipo, cantidad, saldo, precio) con la misma fecha: la del guardado
+    def anotar(self, movimientos: Iterable[tuple], fecha: Optional[float] = None) -> None:
+        self.anotar_grupos([(fecha, movimientos)])
+
+    # Varios grupos (fecha, movimientos) en una sola escritura (guardado diferido:
+    # cada grupo conserva la fecha en que se hizo el cambio)
+    def anotar_grupos(self, grupos: Iterable[tuple]) -> None:
+        ahora = time.time()
+        lineas = []
+        for fecha, movimientos in grupos:
+            prefijo = f"{ahora if fecha is None else fecha:.3f}|"
+            lineas.extend(f"{prefijo}{i}|{t}|{c}|{s}|{p}\n" for i, t, c, s, p in movimientos)
+
+        texto = "".join(lineas)
+        if not texto:
+            return
+
+        carpeta = os.path.dirname(self.ruta)
+        if carpeta and not os.path.exists(carpeta):
+            os.makedirs(carpeta, exist_ok=True)
+
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(texto)
+
+    # Recorre el libro en orden (sin cargarlo entero); solo los de un producto si se indica
+    def leer(self, producto_id: Optional[int] = None) -> Iterator[Movimiento]:
+        if not os.path.exists(self.ruta):
+            return
+
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    movimiento = Movimiento.from_linea(linea)
+                except ValueError:
+                    # Línea dañada (p. ej. el programa se cortó mientras escribía)
+                    continue
+
+                if producto_id is None or movimiento.producto_id == producto_id:
+                    yield movimiento
+
+
+class Totales:
+    """Unidades y valor de todo el inventario, actualizados en cada modificación (O(1))."""
+
+    def __init__(self, productos: Iterable = ()):
+        self.unidades = 0
+        self.valor = 0.0
+
+        for p in productos:
+            self.sumar(p.get_cantidad(), p.get_precio())
+
+    def sumar(self, cantidad: int, precio: float) -> None:
+        self.unidades += cantidad
+        self.valor += cantidad * precio
+
+    def restar(self, cantidad: int, precio: float) -> None:
+        self.unidades -= cantidad
+        self.valor -= cantidad * precio
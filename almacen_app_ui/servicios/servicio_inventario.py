@@ -13,16 +13,54 @@ Este archivo actúa como un *adaptador* entre ambos mundos:
 - Devuelve (ok, mensaje) para que la UI muestre alerts.
 
 Así la UI no se llena de lógica de negocio y el Inventario no depende de Tkinter.
+
+Además el servicio es dueño de un Trabajador (hilo de fondo): la UI le pide
+ejecutar allí las operaciones que escriben en disco o buscan en todo el
+inventario, para que la ventana nunca se congele.
+
+Métricas (activar_metricas): mide también los métodos del servicio ("servicio.*"),
+así se ve cuánto suma la capa de la UI sobre el Inventario.
 """
 
+import threading
+
 from modelos.producto import Producto
+from servicios.indice_nombres import normalizar
+from servicios.trabajador import Trabajador
 
 
 class ServicioInventario:
+    # Métodos del servicio que se cronometran con activar_metricas()
+    OPERACIONES_MEDIDAS = (
+        "agregar_producto_gui", "actualizar_producto_gui", "eliminar_producto_gui",
+        "entrada_gui", "salida_gui", "deshacer_gui", "rehacer_gui", "guardar_en_archivo", "sincronizar",
+        "total_productos", "pagina", "buscar_por_nombre",
+    )
+
     def __init__(self, inventario):
         # inventario es una instancia de la clase Inventario (capa lógica)
         self.inventario = inventario
 
+        # Última búsqueda (texto, resultados): la tabla virtual pide varias páginas del mismo filtro
+        self._busqueda = None
+        # La caché se usa desde el hilo de Tkinter y desde el trabajador
+        self._cerrojo_busqueda = threading.Lock()
+
+        # Último resumen de totales, calculado en el trabajador: tras una recarga los
+        # totales recorren todo el inventario, y eso no debe pasar en el hilo de Tkinter
+        self.resumen_totales = ""
+
+        # Sincronizaciones con otros procesos ya mostradas en la tabla
+        self._sincronizaciones = inventario.sincronizaciones
+
+        # Hilo de fondo para disco y búsquedas pesadas
+        self.trabajador = Trabajador()
+
+        # Métricas con las que se midieron los métodos del servicio y archivo
+        # donde guardar el perfil de cProfile al cerrar (None: sin perfil)
+        self._metricas_servicio = None
+        self._ruta_perfil = None
+
     @property
     def productos(self):
         """Devuelve la lista actual de productos (copia) para mostrar en la tabla."""
@@ -41,6 +79,7 @@ class ServicioInventario:
         try:
             p = Producto(producto_id, nombre, cantidad, precio)
             ok = self.inventario.agregar_producto(p)
+            self._hubo_cambios()
             return (True, "Producto agregado.") if ok else (False, "El ID ya existe.")
         except Exception as e:
             return False, f"Error: {e}"
@@ -53,6 +92,8 @@ class ServicioInventario:
         """
         try:
             ok = self.inventario.actualizar_producto(producto_id, cantidad, precio)
+            # Antes de escribir se traen cambios de otros procesos (pueden ser altas o bajas)
+            self._hubo_cambios()
             return (True, "Producto actualizado.") if ok else (False, "No existe producto con ese ID.")
         except Exception as e:
             return False, f"Error: {e}"
@@ -61,14 +102,243 @@ class ServicioInventario:
         """Elimina un producto por ID."""
         try:
             ok = self.inventario.eliminar_producto(producto_id)
+            self._hubo_cambios()
             return (True, "Producto eliminado.") if ok else (False, "No existe producto con ese ID.")
         except Exception as e:
             return False, f"Error: {e}"
         
+    def entrada_gui(self, producto_id, unidades):
+        """Suma unidades recibidas al stock (queda en el libro de movimientos)."""
+        return self._mover_stock(self.inventario.entrada, producto_id, unidades)
+
+    def salida_gui(self, producto_id, unidades):
+        """Resta unidades despachadas; falla si no alcanza el stock."""
+        return self._mover_stock(self.inventario.salida, producto_id, unidades)
+
+    def _mover_stock(self, movimiento, producto_id, unidades):
+        try:
+            if not movimiento(producto_id, unidades):
+                return False, "No existe producto con ese ID."
+            self._hubo_cambios()
+            return True, f"Stock actual: {self.inventario.saldo(producto_id)} unidades."
+        except Exception as e:
+            return False, f"Error: {e}"
+
+    @property
+    def con_historial(self):
+        """True si las modificaciones se pueden deshacer (Inventario(historial=N))."""
+        return self.inventario.con_historial
+
+    def deshacer_gui(self):
+        """Deshace la última modificación (Ctrl+Z). Necesita Inventario(historial=N)."""
+        return self._mover_historial(self.inventario.deshacer, "Cambio deshecho.", "No hay nada para deshacer.")
+
+    def rehacer_gui(self):
+        """Vuelve a hacer lo último que se deshizo (Ctrl+Y)."""
+        return self._mover_historial(self.inventario.rehacer, "Cambio rehecho.", "No hay nada para rehacer.")
+
+    def _mover_historial(self, paso, hecho, nada):
+        try:
+            if not paso():
+                return False, nada
+            self._hubo_cambios()
+            return True, hecho
+        except Exception as e:
+            return False, f"Error: {e}"
+
+    def texto_totales(self):
+        """Resumen para la barra de estado; queda en resumen_totales.
+
+        Los totales se mantienen al día (O(1)), salvo tras recargar el archivo: entonces
+        se recorre el inventario. Por eso se llama desde el trabajador.
+        """
+        self.resumen_totales = (f"Productos: {self.inventario.total_productos()} | "
+                                f"Unidades: {self.inventario.unidades_totales()} | "
+                                f"Valor: ${self.inventario.valor_inventario():,.2f}")
+        return self.resumen_totales
+
     def guardar_en_archivo(self):
-        """Fuerza el guardado en el archivo (útil para botón Guardar o al cerrar)."""
+        """Fuerza el guardado en el archivo (útil para botón Guardar o al cerrar).
+
+        También escribe lo que el guardado diferido tenía pendiente.
+        """
         self.inventario.guardar_en_archivo()
 
+    def texto_guardado(self):
+        """Cambios que todavía no están en disco (guardado diferido); vacío si no hay."""
+        return self.inventario.estado_guardado()
+
+    def sincronizar(self):
+        """Trae cambios guardados por otro proceso (p. ej. la consola). True si hubo alguno.
+
+        También cuenta los que llegaron al sincronizar antes de un CRUD.
+        """
+        self.inventario.sincronizar()
+        if self.inventario.sincronizaciones == self._sincronizaciones:
+            return False
+
+        self._sincronizaciones = self.inventario.sincronizaciones
+        self._hubo_cambios()
+        return True
+
+    # -----------------
+    # SEGUNDO PLANO
+    # -----------------
+
+    def en_segundo_plano(self, funcion, *args, al_terminar=None, visible=True):
+        """Ejecuta funcion(*args) en el hilo de fondo.
+
+        Las tareas se ejecutan en orden, así nunca hay dos operaciones del
+        inventario al mismo tiempo. al_terminar(resultado) se llama cuando la UI
+        invoca entregar_resultados().
+        """
+        self.trabajador.enviar(funcion, *args, al_terminar=al_terminar, visible=visible)
+
+    def entregar_resultados(self):
+        """Ejecuta los callbacks pendientes; la UI lo llama desde root.after."""
+        self.trabajador.entregar_resultados()
+
+    @property
+    def cargando(self):
+        """True mientras el inventario sigue cargando (carga diferida): la tabla muestra una parte."""
+        return self.inventario.cargando
+
+    @property
+    def ocupado(self):
+        """True mientras haya operaciones en segundo plano sin terminar."""
+        return self.trabajador.ocupado
+
+    def cerrar(self):
+        """Guarda y espera a que terminen todas las tareas (llamar al cerrar la app)."""
+        self.trabajador.enviar(self.guardar_en_archivo)
+        self.detener_perfil()
+        self.trabajador.enviar(self.inventario.cerrar)
+        self.trabajador.detener()
+
+    # -----------------
+    # MÉTRICAS
+    # -----------------
+
+    @property
+    def metricas(self):
+        """Objeto Metricas del inventario, o None si están desactivadas."""
+        return self.inventario.metricas
+
+    def activar_metricas(self):
+        """Mide el Inventario, su almacenamiento y los métodos de este servicio."""
+        metricas = self.inventario.activar_metricas()
+        # El inventario pudo activarlas antes (Inventario(metricas=True)): falta el servicio
+        if self._metricas_servicio is not metricas:
+            metricas.instrumentar(self, self.OPERACIONES_MEDIDAS, prefijo="servicio.")
+            self._metricas_servicio = metricas
+        return metricas
+
+    def desactivar_metricas(self):
+        """Quita toda la medición (también la del servicio)."""
+        self.inventario.desactivar_metricas()
+
+    def texto_metricas(self):
+        """Operaciones más lentas (p95) para la barra de estado; vacío si no se mide."""
+        metricas = self.inventario.metricas
+        return metricas.linea() if metricas is not None else ""
+
+    def iniciar_perfil(self, ruta):
+        """Perfila con cProfile el hilo de fondo (donde corren disco y búsquedas).
+
+        El perfil se guarda en 'ruta' al llamar detener_perfil() o al cerrar.
+        """
+        self._ruta_perfil = ruta
+        self.en_segundo_plano(self.activar_metricas().iniciar_perfil, visible=False)
+
+    def detener_perfil(self, al_terminar=None):
+        """Detiene el perfil y lo guarda; al_terminar(texto) recibe las funciones más costosas.
+
+        cProfile solo se detiene desde el hilo que lo inició: se envía al trabajador.
+        """
+        ruta, self._ruta_perfil = self._ruta_perfil, None
+        if ruta is not None and self.inventario.metricas is not None:
+            self.en_segundo_plano(self.inventario.metricas.detener_perfil, ruta,
+                                  al_terminar=al_terminar, visible=False)
+
     def buscar_por_nombre(self, texto):
         """Devuelve productos que coincidan parcialmente con el texto."""
-        return self.inventario.buscar_por_nombre(texto)
\ No newline at end of file
+        return self.inventario.buscar_por_nombre(texto)
+
+    def _hubo_cambios(self):
+        """Tras modificar o sincronizar (en el trabajador): búsqueda vieja y totales nuevos."""
+        self._olvidar_busqueda()
+        self.texto_totales()
+
+    def _olvidar_busqueda(self):
+        """Descarta la búsqueda guardada (el inventario cambió)."""
+        with self._cerrojo_busqueda:
+            self._busqueda = None
+
+    def _resultados(self, texto):
+        """Resultados de buscar 'texto', reutilizando la última búsqueda cuando se puede.
+
+        - Mismo texto: se devuelven los resultados guardados.
+        - Texto que contiene al anterior ("pan" -> "pant"): solo puede quitar
+          coincidencias, así que se filtran los resultados previos sin volver a buscar.
+        """
+        with self._cerrojo_busqueda:
+            if self._busqueda is not None:
+                anterior, encontrados = self._busqueda
+                if texto == anterior:
+                    return encontrados
+
+                if anterior and normalizar(anterior) in normalizar(texto):
+                    encontrados = self.inventario.refinar_busqueda(encontrados, texto)
+                    self._busqueda = (texto, encontrados)
+                    return encontrados
+
+            self._busqueda = (texto, self.inventario.buscar_por_nombre(texto))
+            return self._busqueda[1]
+
+    def total_productos(self, texto=""):
+        """Cantidad de productos del listado (solo los que coinciden con 'texto', si se indica)."""
+        if not texto:
+            return self.inventario.total_productos()
+        return len(self._resultados(texto))
+
+    def pagina(self, inicio, cantidad, texto=""):
+        """Devuelve solo las filas [inicio, inicio + cantidad) del listado.
+
+        La tabla virtual pide únicamente lo que se ve en pantalla, así la memoria
+        y el tiempo de pintado no dependen del tamaño del inventario.
+        """
+        if not texto:
+            return self.inventario.pagina(inicio, cantidad)
+        return self._resultados(texto)[inicio:inicio + cantidad]
+
+    def ventana(self, inicio, cantidad, texto=""):
+        """Filas visibles de la tabla: (inicio, total, filas), sin pasarse del final
+        (cantidad None = todas).
+
+        Con un filtro cuya búsqueda se descartó (hubo un cambio) devuelve None en vez de
+        buscar: la UI la pide al hilo de fondo y no se congela.
+        """
+        filas = None
+        if texto:
+            with self._cerrojo_busqueda:
+                if self._busqueda is None or self._busqueda[0] != texto:
+                    return None
+                filas = self._busqueda[1]
+            total = len(filas)
+        else:
+            total = self.inventario.total_productos()
+
+        if cantidad is None:
+            cantidad = total
+        inicio = max(0, min(inicio, total - cantidad))
+        if filas is None:
+            return inicio, total, self.inventario.pagina(inicio, cantidad)
+        return inicio, total, filas[inicio:inicio + cantidad]
+
+    def buscar_por_id(self, producto_id):
+        """Devuelve el producto con ese ID o None."""
+        return self.inventario.buscar_por_id(producto_id)
+
+    def coincide_nombre(self, producto, texto):
+        """Indica si el producto aparecería al buscar 'texto' (misma regla que buscar_por_nombre)."""
+        return normalizar(texto) in normalizar(producto.get_nombre())
\ No newline at end of file
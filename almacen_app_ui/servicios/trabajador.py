@@ -0,0 +1,79 @@
+# servicios/trabajador.py
+"""
+Trabajador (hilo en segundo plano)
+
+Tkinter solo puede tocar la ventana desde su propio hilo, y mientras un evento
+se ejecuta la ventana queda congelada. Este trabajador ejecuta las tareas lentas
+(escrituras a disco, búsquedas grandes) en un hilo aparte, una por una y en orden:
+
+- enviar(funcion, *args, al_terminar=callback) encola una tarea.
+- El hilo la ejecuta y deja el resultado en una cola de resultados.
+- La UI llama a entregar_resultados() periódicamente (root.after) y así los
+  callbacks se ejecutan en el hilo de Tkinter.
+"""
+
+import queue
+import threading
+
+
+class Trabajador:
+    def __init__(self):
+        self._tareas = queue.Queue()
+        self._resultados = queue.Queue()
+
+        # Tareas enviadas cuyo resultado aún no se entregó (para el indicador "Guardando…")
+        self._pendientes = 0
+
+        self._hilo = threading.Thread(target=self._bucle, name="trabajador-inventario", daemon=True)
+        self._hilo.start()
+
+    @property
+    def ocupado(self):
+        """True mientras quede alguna tarea por terminar o por entregar."""
+        return self._pendientes > 0
+
+    def enviar(self, funcion, *args, al_terminar=None, visible=True):
+        """Encola funcion(*args); al_terminar(resultado) se llamará desde entregar_resultados().
+
+        visible=False: tarea de rutina que no cuenta para `ocupado` (no muestra "Guardando…").
+        """
+        if visible:
+            self._pendientes += 1
+        self._tareas.put((funcion, args, al_terminar, visible))
+
+    def _bucle(self):
+        """Hilo de fondo: ejecuta las tareas en orden de llegada."""
+        while True:
+            tarea = self._tareas.get()
+            if tarea is None:
+                return
+
+            funcion, args, al_terminar, visible = tarea
+            try:
+                self._resultados.put((al_terminar, visible, funcion(*args), None))
+            except Exception as e:
+                self._resultados.put((al_terminar, visible, None, e))
+
+    def entregar_resultados(self):
+        """Ejecuta, en el hilo que llama, los callbacks de las tareas ya terminadas."""
+        while True:
+            try:
+                al_terminar, visible, resultado, error = self._resultados.get_nowait()
+            except queue.Empty:
+                return
+
+            if visible:
+                self._pendientes -= 1
+            if error is not None:
+                print(f"Error en segundo plano: {error}")
+            elif al_terminar is not None:
+                # Un callback que falla no impide entregar los demás resultados
+                try:
+                    al_terminar(resultado)
+                except Exception as e:
+                    print(f"Error al entregar un resultado: {e}")
+
+    def detener(self):
+        """Termina las tareas pendientes y cierra el hilo (bloquea hasta entonces)."""
+        self._tareas.put(None)
+        self._hilo.join()
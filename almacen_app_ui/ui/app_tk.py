@@ -7,6 +7,13 @@ Esta clase construye la interfaz gráfica:
 - Botones para acciones CRUD.
 - Tabla (Treeview) para mostrar los productos.
 - Búsqueda por nombre.
+- Entradas y salidas de stock, con los totales del inventario en la barra de estado.
+- Con métricas activas (main.py --metricas), las operaciones más lentas (p95) también.
+- Los cambios sin guardar (guardado diferido) se ven en la barra de estado.
+- Ctrl+Z / Ctrl+Y deshacen y rehacen las modificaciones (si el inventario tiene
+  historial, eliminar ya no pide confirmación: se deshace).
+- Con carga diferida la ventana se abre enseguida y la tabla crece mientras llegan
+  los productos ("Cargando… N productos" en la barra de estado).
 
 Regla de oro:
 - La UI NO implementa la lógica del inventario.
@@ -16,14 +23,44 @@ Así mantenemos separación de capas: UI -> Servicio -> Inventario -> Archivo.
 """
 
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, simpledialog
 
 
 class AppTk:
-    def __init__(self, servicio):
+    # Con más productos que esto la tabla pasa a modo virtual
+    LIMITE_TABLA_COMPLETA = 5000
+
+    # Alto aproximado de una fila del Treeview (px), para saber cuántas caben
+    ALTO_FILA = 20
+
+    # Cada cuánto se recogen los resultados del hilo de fondo (ms)
+    INTERVALO_REVISION_MS = 50
+
+    # Espera tras la última tecla antes de buscar (ms)
+    RETARDO_BUSQUEDA_MS = 200
+
+    # Cada cuánto se buscan cambios de otros procesos en el mismo archivo (ms)
+    INTERVALO_SINCRONIZACION_MS = 2000
+
+    # Cada cuánto se actualizan las métricas de la barra de estado (ms)
+    INTERVALO_METRICAS_MS = 1000
+
+    def __init__(self, servicio, modo_virtual=None):
         # ServicioInventario: puente entre la UI y la lógica
         self.servicio = servicio
 
+        # Modo virtual: la tabla solo contiene las filas visibles y se rellena al desplazarse.
+        # Por defecto se activa solo si el inventario es grande (o si sigue cargando:
+        # todavía no se sabe cuántos productos tendrá).
+        if modo_virtual is None:
+            modo_virtual = servicio.cargando or servicio.total_productos() > self.LIMITE_TABLA_COMPLETA
+        self.modo_virtual = modo_virtual
+        self._cargando = servicio.cargando
+        self.inicio_ventana = 0
+        self.filas_visibles = 14
+        # Modo virtual: ya se pidió al hilo de fondo rehacer la búsqueda del filtro
+        self._ventana_pendiente = False
+
         # Ventana principal
         self.root = tk.Tk()
         self.root.title("Inventario (Tkinter)")
@@ -62,11 +99,21 @@ class AppTk:
         buscar_frame.pack(fill="x", padx=10, pady=0)
 
         self.var_buscar = tk.StringVar()
+
+        # Búsqueda mientras se escribe: se espera a que el usuario deje de teclear
+        self.var_buscar.trace_add("write", self.on_texto_buscar)
+        self._busqueda_programada = None
+
+        # Cada búsqueda recibe un número; los resultados de una búsqueda vieja se descartan
+        self._generacion_busqueda = 0
         ttk.Label(buscar_frame, text="Buscar por nombre:").pack(side="left", padx=5)
         ttk.Entry(buscar_frame, textvariable=self.var_buscar, width=35).pack(side="left", padx=5)
         ttk.Button(buscar_frame, text="Buscar", command=self.on_buscar).pack(side="left", padx=5)
         ttk.Button(buscar_frame, text="Ver todo", command=self.refrescar_tabla).pack(side="left", padx=5)
 
+        # Filtro aplicado a la tabla ("" = todos los productos)
+        self.filtro_actual = ""
+
         # =====================
         # BOTONES CRUD
         # =====================
@@ -76,6 +123,8 @@ class AppTk:
         ttk.Button(btns, text="Agregar", command=self.on_agregar).pack(side="left", padx=5)
         ttk.Button(btns, text="Actualizar", command=self.on_actualizar).pack(side="left", padx=5)
         ttk.Button(btns, text="Eliminar", command=self.on_eliminar).pack(side="left", padx=5)
+        ttk.Button(btns, text="Entrada", command=self.on_entrada).pack(side="left", padx=5)
+        ttk.Button(btns, text="Salida", command=self.on_salida).pack(side="left", padx=5)
         ttk.Button(btns, text="Limpiar", command=self.on_limpiar).pack(side="left", padx=5)
         ttk.Button(btns, text="Guardar", command=self.on_guardar).pack(side="left", padx=5)
 
@@ -99,14 +148,57 @@ class AppTk:
         self.tree.column("cantidad", width=120, anchor="center")
         self.tree.column("precio", width=140, anchor="e")
 
+        # En modo virtual la barra no desplaza el Treeview: indica qué página pedir al servicio
+        if self.modo_virtual:
+            self.scroll = ttk.Scrollbar(tabla_frame, orient="vertical", command=self.on_scroll)
+            self.scroll.pack(side="right", fill="y", pady=8)
+            self.tree.bind("<Configure>", self.on_redimensionar)
+            self.tree.bind("<MouseWheel>", self.on_rueda)
+            self.tree.bind("<Button-4>", self.on_rueda)
+            self.tree.bind("<Button-5>", self.on_rueda)
+
         self.tree.pack(fill="both", expand=True, padx=8, pady=8)
 
         # Evento: al seleccionar una fila, llenar el formulario
         self.tree.bind("<<TreeviewSelect>>", self.on_select_row)
 
+        # =====================
+        # BARRA DE ESTADO
+        # =====================
+        estado_frame = ttk.Frame(self.root)
+        estado_frame.pack(fill="x", padx=10, pady=(0, 6))
+
+        self.var_estado = tk.StringVar()
+        ttk.Label(estado_frame, textvariable=self.var_estado).pack(side="left")
+
+        # Unidades y valor del inventario (se leen en O(1) en cada revisión)
+        self.var_totales = tk.StringVar()
+        ttk.Label(estado_frame, textvariable=self.var_totales).pack(side="right")
+
+        # Latencias p95 más altas (solo si el servicio mide)
+        self.var_metricas = tk.StringVar()
+        if self.servicio.metricas is not None:
+            ttk.Label(estado_frame, textvariable=self.var_metricas, foreground="gray").pack(side="left", padx=20)
+            self._actualizar_metricas()
+
+        # La primera vez los totales recorren el inventario: que sea en el hilo de fondo
+        self.servicio.en_segundo_plano(self.servicio.texto_totales, visible=False)
+
         # Carga inicial de tabla
         self.refrescar_tabla()
 
+        # Revisa periódicamente los resultados del hilo de fondo
+        self._revisar_segundo_plano()
+
+        # Y los cambios que otro proceso (p. ej. la consola) guarde en el mismo archivo
+        self.root.after(self.INTERVALO_SINCRONIZACION_MS, self._sincronizar_periodico)
+
+        # Deshacer / rehacer (también con Bloq Mayús activado)
+        for tecla in ("<Control-z>", "<Control-Z>"):
+            self.root.bind(tecla, self.on_deshacer)
+        for tecla in ("<Control-y>", "<Control-Y>"):
+            self.root.bind(tecla, self.on_rehacer)
+
         # Evento: al cerrar ventana, guardar
         self.root.protocol("WM_DELETE_WINDOW", self.on_cerrar)
 
@@ -117,27 +209,205 @@ class AppTk:
         """Inicia el loop de Tkinter (la app se queda escuchando eventos)."""
         self.root.mainloop()
 
+    def _revisar_segundo_plano(self):
+        """Entrega en el hilo de Tkinter los resultados del trabajador y actualiza el estado."""
+        try:
+            self.servicio.entregar_resultados()
+            if self._cargando:
+                self._seguir_carga()
+            elif self.servicio.ocupado:
+                self.var_estado.set("Guardando…")
+            else:
+                # Con guardado diferido: cuántos cambios se perderían si la app se cortara ahora
+                self.var_estado.set(self.servicio.texto_guardado())
+                # Solo se lee el último resumen: lo calcula el trabajador tras cada cambio
+                self.var_totales.set(self.servicio.resumen_totales)
+        finally:
+            # Aunque algo falle, la revisión sigue (si no, no se entregaría nada más)
+            self.root.after(self.INTERVALO_REVISION_MS, self._revisar_segundo_plano)
+
+    def _seguir_carga(self):
+        """Carga diferida: repinta lo visible mientras llegan productos (la barra crece)."""
+        self._cargando = self.servicio.cargando
+        total = self.servicio.total_productos()
+        self.var_estado.set(f"Cargando… {total:,} productos" if self._cargando else "")
+
+        # Con un filtro, la búsqueda ya espera en segundo plano a que termine la carga
+        if self.filtro_actual:
+            return
+        if self.modo_virtual:
+            self._pintar_ventana()
+        elif not self._cargando:
+            self._pintar(self.servicio.productos)
+
+    def _actualizar_metricas(self):
+        """Muestra las operaciones más lentas; calcular percentiles no es gratis, así que cada segundo."""
+        try:
+            self.var_metricas.set(self.servicio.texto_metricas())
+        finally:
+            self.root.after(self.INTERVALO_METRICAS_MS, self._actualizar_metricas)
+
+    def _sincronizar_periodico(self):
+        """Trae en segundo plano los cambios de otros procesos y repinta si hubo alguno."""
+        # Si hay operaciones en cola, ellas mismas sincronizan antes de escribir
+        if not self.servicio.ocupado:
+            filtro = self.filtro_actual
+
+            # En el hilo de fondo: sincroniza y deja lista la búsqueda del filtro actual
+            def sincronizar():
+                if not self.servicio.sincronizar():
+                    return None
+                return filtro, self.servicio.total_productos(filtro)
+
+            def al_terminar(resultado):
+                if resultado is None or resultado[0] != self.filtro_actual:
+                    return
+
+                self._pintar_filtro(filtro)
+
+            self.servicio.en_segundo_plano(sincronizar, al_terminar=al_terminar, visible=False)
+
+        self.root.after(self.INTERVALO_SINCRONIZACION_MS, self._sincronizar_periodico)
+
     # =====================
     # UTILIDADES
     # =====================
+    def _valores_fila(self, p):
+        """Valores que muestra la tabla para un producto."""
+        return (p.get_id(), p.get_nombre(), p.get_cantidad(), f"{p.get_precio():.2f}")
+
     def _pintar(self, productos):
-        """Pinta una lista de productos en la tabla."""
-        # 1) Limpiar filas anteriores
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """Repinta la tabla completa (solo cuando cambia el filtro).
+
+        Cada fila usa el ID del producto como identificador (iid) del Treeview,
+        así luego se puede actualizar o borrar una sola fila sin recorrer la tabla.
+        """
+        # 1) Limpiar filas anteriores (una sola llamada)
+        self.tree.delete(*self.tree.get_children())
 
         # 2) Insertar filas nuevas
         for p in productos:
-            self.tree.insert("", "end", values=(
-                p.get_id(),
-                p.get_nombre(),
-                p.get_cantidad(),
-                f"{p.get_precio():.2f}"
-            ))
+            self.tree.insert("", "end", iid=str(p.get_id()), values=self._valores_fila(p))
+
+    def _pintar_ventana(self):
+        """Modo virtual: pinta solo las filas visibles a partir de inicio_ventana.
+
+        Si un cambio descartó la búsqueda del filtro, se rehace en el hilo de fondo y
+        se pinta al terminar (nunca se busca en el hilo de Tkinter).
+        """
+        filtro = self.filtro_actual
+        ventana = self.servicio.ventana(self.inicio_ventana, self.filas_visibles, filtro)
+        if ventana is None:
+            self._buscar_ventana(filtro)
+            return
+
+        self.inicio_ventana, total, filas = ventana
+        self._pintar(filas)
+
+        # La barra refleja qué parte del listado se está viendo
+        if total:
+            fin = min(1.0, (self.inicio_ventana + self.filas_visibles) / total)
+            self.scroll.set(self.inicio_ventana / total, fin)
+        else:
+            self.scroll.set(0.0, 1.0)
+
+    def _pintar_filtro(self, filtro):
+        """Repinta con la búsqueda de 'filtro' que el hilo de fondo acaba de dejar lista."""
+        if self.modo_virtual:
+            self._pintar_ventana()
+            return
+
+        ventana = self.servicio.ventana(0, None, filtro)
+        if ventana is None:
+            self._buscar_ventana(filtro)
+        else:
+            self._pintar(ventana[2])
+
+    def _buscar_ventana(self, filtro):
+        """Rehace la búsqueda del filtro en segundo plano y repinta al terminar (una vez)."""
+        if self._ventana_pendiente:
+            return
+        self._ventana_pendiente = True
+
+        def al_terminar(_):
+            self._ventana_pendiente = False
+            if filtro == self.filtro_actual:
+                self._pintar_filtro(filtro)
+
+        # total_productos(filtro) deja los resultados en la caché del servicio
+        self.servicio.en_segundo_plano(self.servicio.total_productos, filtro,
+                                       al_terminar=al_terminar, visible=False)
+
+    def _pintar_fila(self, producto_id):
+        """Inserta o actualiza solo la fila de un producto (si pasa el filtro actual)."""
+        if self.modo_virtual:
+            self._pintar_ventana()
+            return
+
+        iid = str(producto_id)
+        p = self.servicio.buscar_por_id(producto_id)
+
+        if p is None or not self.servicio.coincide_nombre(p, self.filtro_actual):
+            self._quitar_fila(producto_id)
+        elif self.tree.exists(iid):
+            self.tree.item(iid, values=self._valores_fila(p))
+        else:
+            self.tree.insert("", "end", iid=iid, values=self._valores_fila(p))
+
+    def _quitar_fila(self, producto_id):
+        """Borra solo la fila de un producto."""
+        if self.modo_virtual:
+            self._pintar_ventana()
+            return
+
+        iid = str(producto_id)
+        if self.tree.exists(iid):
+            self.tree.delete(iid)
 
     def refrescar_tabla(self):
         """Muestra todos los productos."""
-        self._pintar(self.servicio.productos)
+        self.filtro_actual = ""
+        self.inicio_ventana = 0
+
+        if self.modo_virtual:
+            self._pintar_ventana()
+        elif self._cargando:
+            # Listar todo esperaría a que termine la carga: por ahora, lo que ya llegó
+            self._pintar(self.servicio.pagina(0, self.servicio.total_productos()))
+        else:
+            self._pintar(self.servicio.productos)
+
+    # =====================
+    # DESPLAZAMIENTO (MODO VIRTUAL)
+    # =====================
+    def on_scroll(self, *args):
+        """Comando de la barra: ("moveto", fracción) o ("scroll", n, "units"/"pages")."""
+        if args[0] == "moveto":
+            ventana = self.servicio.ventana(0, 0, self.filtro_actual)
+            if ventana is None:
+                self._buscar_ventana(self.filtro_actual)
+                return
+            self.inicio_ventana = int(float(args[1]) * ventana[1])
+        elif args[0] == "scroll":
+            paso = self.filas_visibles if args[2] == "pages" else 1
+            self.inicio_ventana += int(args[1]) * paso
+
+        self._pintar_ventana()
+
+    def on_rueda(self, event):
+        """Rueda del ratón (Windows/macOS usan delta; Linux, botones 4 y 5)."""
+        if event.num == 4 or event.delta > 0:
+            self.on_scroll("scroll", -3, "units")
+        else:
+            self.on_scroll("scroll", 3, "units")
+        return "break"
+
+    def on_redimensionar(self, event):
+        """Ajusta cuántas filas se materializan según el alto de la tabla."""
+        filas = max(1, event.height // self.ALTO_FILA)
+        if filas != self.filas_visibles:
+            self.filas_visibles = filas
+            self._pintar_ventana()
 
     def leer_formulario(self):
         """Lee y valida datos del formulario.
@@ -185,6 +455,19 @@ class AppTk:
     # =====================
     # EVENTOS (CRUD)
     # =====================
+    def _al_terminar_crud(self, producto_id, limpiar):
+        """Crea el callback que recibe (ok, mensaje) de una operación hecha en segundo plano."""
+        def al_terminar(resultado):
+            ok, msg = resultado
+            if ok:
+                self._pintar_fila(producto_id)
+                if limpiar:
+                    self.on_limpiar()
+                messagebox.showinfo("OK", msg)
+            else:
+                messagebox.showwarning("Atención", msg)
+        return al_terminar
+
     def on_agregar(self):
         """Evento botón Agregar."""
         datos = self.leer_formulario()
@@ -192,13 +475,10 @@ class AppTk:
             return
         id_p, nombre, cantidad, precio = datos
 
-        ok, msg = self.servicio.agregar_producto_gui(id_p, nombre, cantidad, precio)
-        if ok:
-            self.refrescar_tabla()
-            self.on_limpiar()
-            messagebox.showinfo("OK", msg)
-        else:
-            messagebox.showwarning("Atención", msg)
+        self.servicio.en_segundo_plano(
+            self.servicio.agregar_producto_gui, id_p, nombre, cantidad, precio,
+            al_terminar=self._al_terminar_crud(id_p, limpiar=True)
+        )
 
     def on_actualizar(self):
         """Evento botón Actualizar."""
@@ -207,12 +487,10 @@ class AppTk:
             return
         id_p, nombre, cantidad, precio = datos
 
-        ok, msg = self.servicio.actualizar_producto_gui(id_p, cantidad, precio)
-        if ok:
-            self.refrescar_tabla()
-            messagebox.showinfo("OK", msg)
-        else:
-            messagebox.showwarning("Atención", msg)
+        self.servicio.en_segundo_plano(
+            self.servicio.actualizar_producto_gui, id_p, cantidad, precio,
+            al_terminar=self._al_terminar_crud(id_p, limpiar=False)
+        )
 
     def on_eliminar(self):
         """Evento botón Eliminar."""
@@ -222,36 +500,122 @@ class AppTk:
             messagebox.showwarning("Atención", "Selecciona un producto (ID) para eliminar.")
             return
 
-        # Confirmación antes de borrar
-        if not messagebox.askyesno("Confirmar", f"¿Eliminar el producto ID {id_p}?"):
+        # Confirmación antes de borrar (con historial no hace falta: Ctrl+Z lo devuelve)
+        if not self.servicio.con_historial and not messagebox.askyesno("Confirmar", f"¿Eliminar el producto ID {id_p}?"):
             return
 
-        ok, msg = self.servicio.eliminar_producto_gui(id_p)
-        if ok:
-            self.refrescar_tabla()
-            self.on_limpiar()
-            messagebox.showinfo("OK", msg)
-        else:
-            messagebox.showwarning("Atención", msg)
+        self.servicio.en_segundo_plano(
+            self.servicio.eliminar_producto_gui, id_p,
+            al_terminar=self._al_terminar_crud(id_p, limpiar=True)
+        )
+
+    def on_deshacer(self, event=None):
+        """Ctrl+Z: deshace la última modificación."""
+        self._mover_historial(self.servicio.deshacer_gui)
+
+    def on_rehacer(self, event=None):
+        """Ctrl+Y: vuelve a hacer lo último que se deshizo."""
+        self._mover_historial(self.servicio.rehacer_gui)
+
+    def _mover_historial(self, operacion):
+        # No se sabe qué filas cambian: en el hilo de fondo se deja lista la búsqueda del filtro
+        filtro = self.filtro_actual
+
+        def mover():
+            ok, msg = operacion()
+            if ok:
+                self.servicio.total_productos(filtro)
+            return ok, msg
+
+        def al_terminar(resultado):
+            ok, msg = resultado
+            if not ok:
+                messagebox.showwarning("Atención", msg)
+            elif filtro == self.filtro_actual:
+                self._pintar_filtro(filtro)
+
+        self.servicio.en_segundo_plano(mover, al_terminar=al_terminar)
+
+    def on_entrada(self):
+        """Evento botón Entrada: pide cuántas unidades llegaron."""
+        self._mover_stock(self.servicio.entrada_gui, "Entrada de stock", "¿Cuántas unidades llegaron?")
+
+    def on_salida(self):
+        """Evento botón Salida: pide cuántas unidades salen."""
+        self._mover_stock(self.servicio.salida_gui, "Salida de stock", "¿Cuántas unidades salen?")
+
+    def _mover_stock(self, operacion, titulo, pregunta):
+        try:
+            id_p = int(self.var_id.get().strip())
+        except Exception:
+            messagebox.showwarning("Atención", "Selecciona un producto (ID).")
+            return
+
+        unidades = simpledialog.askinteger(titulo, pregunta, parent=self.root, minvalue=1)
+        if unidades is None:
+            return
+
+        self.servicio.en_segundo_plano(
+            operacion, id_p, unidades,
+            al_terminar=self._al_terminar_crud(id_p, limpiar=False)
+        )
 
     def on_guardar(self):
         """Evento botón Guardar."""
-        self.servicio.guardar_en_archivo()
-        messagebox.showinfo("Guardado", "Cambios guardados en el archivo.")
+        self.servicio.en_segundo_plano(
+            self.servicio.guardar_en_archivo,
+            al_terminar=lambda _: messagebox.showinfo("Guardado", "Cambios guardados en el archivo.")
+        )
 
     def on_cerrar(self):
-        """Al cerrar ventana: guarda y termina la app."""
-        self.servicio.guardar_en_archivo()
+        """Al cerrar ventana: espera lo pendiente, guarda y termina la app."""
+        self.var_estado.set("Guardando…")
+        self.root.update_idletasks()
+        self.servicio.cerrar()
         self.root.destroy()
 
     # =====================
     # BÚSQUEDA
     # =====================
-    def on_buscar(self):
+    def on_texto_buscar(self, *_):
+        """Cada tecla reinicia la espera; solo se busca cuando se deja de escribir."""
+        if self._busqueda_programada is not None:
+            self.root.after_cancel(self._busqueda_programada)
+        self._busqueda_programada = self.root.after(self.RETARDO_BUSQUEDA_MS, self._buscar_programada)
+
+    def _buscar_programada(self):
+        """Búsqueda lanzada al escribir (sin ventana emergente si no hay resultados)."""
+        self._busqueda_programada = None
+        self.on_buscar(avisar=False)
+
+    def on_buscar(self, avisar=True):
         """Filtra la tabla por coincidencia parcial de nombre."""
+        if self._busqueda_programada is not None:
+            self.root.after_cancel(self._busqueda_programada)
+            self._busqueda_programada = None
+
         texto = self.var_buscar.get().strip()
-        encontrados = self.servicio.buscar_por_nombre(texto)
-        self._pintar(encontrados)
+        self._generacion_busqueda += 1
+        generacion = self._generacion_busqueda
+
+        # Si mientras esperaba en la cola llegó otra búsqueda, esta ya no se ejecuta
+        def buscar():
+            if generacion != self._generacion_busqueda:
+                return None
+            # total_productos(texto) deja los resultados en la caché del servicio
+            return self.servicio.total_productos(texto)
+
+        # Al terminar se pinta en el hilo de Tkinter (solo si sigue siendo la última búsqueda)
+        def al_terminar(total):
+            if total is None or generacion != self._generacion_busqueda:
+                return
+
+            self.filtro_actual = texto
+            self.inicio_ventana = 0
+
+            self._pintar_filtro(texto)
+
+            if avisar and texto and not total:
+                messagebox.showinfo("Resultado", "No se encontraron productos con ese nombre.")
 
-        if texto and not encontrados:
-            messagebox.showinfo("Resultado", "No se encontraron productos con ese nombre.")
\ No newline at end of file
+        self.servicio.en_segundo_plano(buscar, al_terminar=al_terminar)
\ No newline at end of file
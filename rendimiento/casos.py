@@ -0,0 +1,295 @@
+"""
+Módulo: casos.py
+
+Casos que mide rendimiento/medir.py sobre un catálogo sintético de n productos.
+
+Funciona con cualquiera de las dos aplicaciones (almacen_app_cli o almacen_app_ui):
+medir.py pone la carpeta de la aplicación elegida en sys.path antes de importar
+este módulo, así `modelos` y `servicios` son los de esa aplicación.
+
+Cada caso es un Caso(nombre, ops, ejecutar, preparar):
+    preparar()     deja todo listo para una repetición (no se mide)
+    ejecutar(x)    lo que se mide; recibe lo que devolvió preparar
+    ops            cuántas operaciones hace ejecutar (para informar ns por operación)
+
+El catálogo es siempre el mismo para una semilla y un tamaño: los resultados de
+dos corridas (o de dos versiones del código) se pueden comparar.
+"""
+
+import os
+import random
+import sys
+import threading
+from typing import Callable, Iterator, NamedTuple, Optional
+from modelos.producto import Producto
+from servicios.inventario import Inventario
+from servicios.almacenamiento import AlmacenamientoBinario, AlmacenamientoSqlite, AlmacenamientoTxt
+from servicios.autoguardado import PoliticaGuardado
+
+
+SEMILLA = 11
+
+# Operaciones sueltas (cada una se guarda en disco) por repetición: con más, un
+# catálogo grande tardaría minutos sin aportar nada
+MAXIMO_SUELTAS = 500
+
+# Consultas de buscar_por_id por repetición
+MAXIMO_CONSULTAS = 100_000
+
+# Hilos lectores del caso concurrente (más el escritor) y consultas de cada uno
+LECTORES = 4
+CONSULTAS_POR_LECTOR = 5_000
+
+# Intervalo de cambio de hilo durante el caso concurrente (s; el de Python es 0.005):
+# con muchos cambios la competencia por el bloqueo es pareja entre repeticiones
+INTERVALO_HILOS = 0.0001
+
+# Filas de la primera página que se esperan con carga diferida (lo que muestra la tabla)
+FILAS_PRIMERA_PAGINA = 50
+
+PALABRAS = ("Pan", "Leche", "Arroz", "Tornillo", "Cable", "Pantalón", "Camisa",
+            "Jabón", "Café", "Azúcar", "Lápiz", "Cuaderno", "Martillo", "Galleta")
+ADJETIVOS = ("integral", "grande", "chico", "rojo", "azul", "premium", "económico",
+             "de acero", "orgánico", "extra", "mediano", "negro")
+
+# Textos para buscar_por_nombre: frecuentes, raros, con y sin tildes, y sin resultados
+BUSQUEDAS = ("pan", "pantalon", "acero", "cafe", "gran", "azul 1", "jabon premium",
+             "lápiz", "12", "zzz")
+
+
+class Caso(NamedTuple):
+    nombre: str
+    ops: int
+    ejecutar: Callable
+    preparar: Optional[Callable] = None
+
+
+# -------- CATÁLOGO --------
+# Datos (id, nombre, cantidad, precio) de n productos; siempre los mismos para la misma semilla
+def datos_catalogo(n: int, semilla: int = SEMILLA) -> list[tuple]:
+    azar = random.Random(semilla)
+    return [
+        (i, f"{azar.choice(PALABRAS)} {azar.choice(ADJETIVOS)} {i}",
+         azar.randrange(0, 500), round(azar.uniform(0.1, 999.0), 2))
+        for i in range(1, n + 1)
+    ]
+
+
+# Escribe el catálogo en formato id|nombre|cantidad|precio
+def escribir_catalogo(datos: list[tuple], ruta: str) -> None:
+    with open(ruta, "w", encoding="utf-8") as f:
+        for fila in datos:
+            f.write(Producto(*fila).to_linea() + "\n")
+
+
+# Almacenamiento del tipo pedido dentro de `carpeta`; sqlite y binario importan el catálogo txt
+def crear_almacenamiento(tipo: str, carpeta: str, catalogo_txt: str):
+    if tipo == "txt":
+        return AlmacenamientoTxt(catalogo_txt)
+    if tipo == "sqlite":
+        return AlmacenamientoSqlite(os.path.join(carpeta, "inventario.db"), importar_de=catalogo_txt)
+    if tipo == "binario":
+        return AlmacenamientoBinario(os.path.join(carpeta, "inventario.bin"), importar_de=catalogo_txt)
+    raise ValueError(f"Almacenamiento desconocido: {tipo}")
+
+
+# -------- CASOS --------
+# Producto: creación y conversión a / desde línea de texto
+def casos_producto(datos: list[tuple]) -> Iterator[Caso]:
+    n = len(datos)
+    productos = [Producto(*fila) for fila in datos]
+    lineas = [p.to_linea() for p in productos]
+
+    yield Caso("producto_crear", n, lambda _: [Producto(*fila) for fila in datos])
+    yield Caso("producto_to_linea", n, lambda _: [p.to_linea() for p in productos])
+    yield Caso("producto_from_linea", n, lambda _: [Producto.from_linea(linea) for linea in lineas])
+
+
+# Inventario: carga, guardado, CRUD y consultas sobre un almacenamiento del tipo pedido.
+# El inventario queda abierto mientras se recorren los casos; se cierra al terminar.
+def casos_inventario(datos: list[tuple], tipo: str, carpeta: str, catalogo_txt: str) -> Iterator[Caso]:
+    n = len(datos)
+    inventario = Inventario(almacenamiento=crear_almacenamiento(tipo, carpeta, catalogo_txt))
+    azar = random.Random(SEMILLA)
+
+    sueltas = min(n, MAXIMO_SUELTAS)
+    nuevos = [Producto(n + i, f"Nuevo {i}", 1, 1.0) for i in range(1, sueltas + 1)]
+    elegidos = azar.sample(range(1, n + 1), sueltas)
+    consultas = [azar.randrange(1, n + 1) for _ in range(min(n, MAXIMO_CONSULTAS))]
+
+    # Antes de cada repetición: diario compactado y sin los productos de prueba,
+    # así cada repetición empieza igual (y ninguna paga la compactación de otra)
+    def limpio():
+        with inventario.transaccion():
+            for p in nuevos:
+                inventario.eliminar_producto(p.get_id())
+        inventario.guardar_en_archivo()
+
+    def con_nuevos():
+        limpio()
+        inventario.agregar_productos(nuevos)
+        inventario.guardar_en_archivo()
+
+    def agregar(_):
+        for p in nuevos:
+            inventario.agregar_producto(p)
+
+    def actualizar(_):
+        for producto_id in elegidos:
+            inventario.actualizar_producto(producto_id, 7, 3.5)
+
+    # Las mismas actualizaciones con guardado diferido: se juntan y se escriben una vez
+    def actualizar_diferido(_):
+        inventario.guardado = PoliticaGuardado(cada=0)
+        try:
+            actualizar(_)
+            inventario.volcar()
+        finally:
+            inventario.guardado = PoliticaGuardado()
+
+    def actualizar_lote(_):
+        inventario.actualizar_productos({producto_id: (8, 4.5) for producto_id in elegidos})
+
+    def entrada(_):
+        for producto_id in elegidos:
+            inventario.entrada(producto_id, 1)
+
+    def eliminar(_):
+        for p in nuevos:
+            inventario.eliminar_producto(p.get_id())
+
+    def buscar_por_id(_):
+        buscar = inventario.buscar_por_id
+        for producto_id in consultas:
+            buscar(producto_id)
+
+    def buscar_por_nombre(_):
+        for texto in BUSQUEDAS:
+            inventario.buscar_por_nombre(texto)
+
+    # Inventarios con carga diferida de la repetición anterior (se cierran antes de la siguiente)
+    diferidos = []
+
+    def cerrar_diferidos():
+        while diferidos:
+            diferidos.pop().cerrar()
+
+    # Tiempo hasta la primera interacción: crear el inventario y tener la primera página
+    def primera_pagina(_):
+        diferido = Inventario(almacenamiento=crear_almacenamiento(tipo, carpeta, catalogo_txt),
+                              carga_diferida=True)
+        diferidos.append(diferido)
+        while diferido.cargando and diferido.total_productos() < FILAS_PRIMERA_PAGINA:
+            diferido.esperar_parte()
+        return diferido.pagina(0, FILAS_PRIMERA_PAGINA)
+
+    try:
+        yield Caso("cargar", n, lambda _: inventario.cargar_desde_archivo())
+        yield Caso("primera_pagina_diferida", 1, primera_pagina, cerrar_diferidos)
+        yield Caso("guardar", n, lambda _: inventario.guardar_en_archivo())
+        yield Caso("agregar_producto", sueltas, agregar, limpio)
+        yield Caso("actualizar_producto", sueltas, actualizar, limpio)
+        yield Caso("actualizar_diferido", sueltas, actualizar_diferido, limpio)
+        yield Caso("actualizar_lote", sueltas, actualizar_lote, limpio)
+        yield Caso("entrada", sueltas, entrada, limpio)
+        yield Caso("eliminar_producto", sueltas, eliminar, con_nuevos)
+        yield Caso("buscar_por_id", len(consultas), buscar_por_id)
+        yield Caso("listar_productos", n, lambda _: inventario.listar_productos())
+        # Primera búsqueda tras cargar: incluye construir el índice de nombres
+        yield Caso("buscar_por_nombre_frio", 1, lambda _: inventario.buscar_por_nombre("pan"),
+                   inventario.cargar_desde_archivo)
+        yield Caso("buscar_por_nombre", len(BUSQUEDAS), buscar_por_nombre)
+    finally:
+        cerrar_diferidos()
+        inventario.cerrar()
+
+
+# Inventario(multihilo=True) con LECTORES hilos que consultan mientras otro escribe sin
+# parar hasta que terminan: mide el bloqueo de lectura / escritura entre hilos
+# (BloqueoLecturaEscritura) con competencia durante todo el caso. Las ops son las
+# consultas. El escritor guarda diferido (sin disco en lo medido): lo pendiente se
+# vuelca antes de cada repetición.
+def casos_concurrencia(datos: list[tuple], tipo: str, carpeta: str, catalogo_txt: str) -> Iterator[Caso]:
+    n = len(datos)
+    inventario = Inventario(almacenamiento=crear_almacenamiento(tipo, carpeta, catalogo_txt), multihilo=True)
+    inventario.guardado = PoliticaGuardado(cada=0)
+    azar = random.Random(SEMILLA)
+
+    escrituras = azar.sample(range(1, n + 1), min(n, MAXIMO_SUELTAS))
+    lecturas = [[azar.randrange(1, n + 1) for _ in range(min(n, CONSULTAS_POR_LECTOR))]
+                for _ in range(LECTORES)]
+
+    def leer(consultas):
+        buscar = inventario.buscar_por_id
+        for producto_id in consultas:
+            buscar(producto_id)
+
+    def escribir(fin):
+        while not fin.is_set():
+            for producto_id in escrituras:
+                inventario.actualizar_producto(producto_id, 7, 3.5)
+                if fin.is_set():
+                    break
+
+    # Todos arrancan juntos: si no, el primer lector termina antes de que llegue el escritor
+    def lectores_escritor(_):
+        largada = threading.Barrier(LECTORES + 1)
+        fin = threading.Event()
+
+        def en_largada(funcion, *args):
+            largada.wait()
+            funcion(*args)
+
+        lectores = [threading.Thread(target=en_largada, args=(leer, consultas)) for consultas in lecturas]
+        escritor = threading.Thread(target=en_largada, args=(escribir, fin))
+
+        intervalo = sys.getswitchinterval()
+        sys.setswitchinterval(INTERVALO_HILOS)
+        try:
+            for hilo in lectores + [escritor]:
+                hilo.start()
+            for hilo in lectores:
+                hilo.join()
+        finally:
+            fin.set()
+            escritor.join()
+            sys.setswitchinterval(intervalo)
+
+    try:
+        yield Caso("lectores_escritor", sum(map(len, lecturas)), lectores_escritor, inventario.volcar)
+    finally:
+        inventario.cerrar()
+
+
+# AppTk (solo almacen_app_ui, necesita pantalla): pintar la tabla.
+# pintar: _pintar con tantas filas como muestra la tabla completa (a lo sumo LIMITE_TABLA_COMPLETA).
+# pintar_ventana: en modo virtual (catálogos grandes), repintar solo las filas visibles.
+def casos_interfaz(datos: list[tuple], tipo: str, carpeta: str, catalogo_txt: str) -> Iterator[Caso]:
+    from servicios.servicio_inventario import ServicioInventario
+    from ui.app_tk import AppTk
+
+    inventario = Inventario(almacenamiento=crear_almacenamiento(tipo, carpeta, catalogo_txt), multihilo=True)
+    servicio = ServicioInventario(inventario)
+    app = AppTk(servicio)
+    app.root.update()
+
+    filas = min(len(datos), AppTk.LIMITE_TABLA_COMPLETA)
+    pagina = servicio.pagina(0, filas)
+
+    def pintar(_):
+        app._pintar(pagina)
+        # Incluye el trabajo que Tk deja pendiente (geometría y dibujo)
+        app.root.update_idletasks()
+
+    def pintar_ventana(_):
+        app._pintar_ventana()
+        app.root.update_idletasks()
+
+    try:
+        yield Caso("pintar", filas, pintar)
+        if app.modo_virtual:
+            yield Caso("pintar_ventana", app.filas_visibles, pintar_ventana)
+    finally:
+        app.root.destroy()
+        servicio.trabajador.detener()
+        inventario.cerrar()
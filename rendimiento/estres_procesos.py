@@ -0,0 +1,179 @@
+"""
+Módulo: estres_procesos.py
+
+Prueba de estrés del bloqueo entre procesos (servicios/bloqueo.py): varios procesos
+modifican a la vez el mismo inventario en disco y al final se comprueba que no se
+perdió ninguna actualización.
+
+Cada proceso hace `--rondas` rondas; en cada una:
+- suma 1 a la cantidad del producto compartido (ID 1) dentro de una transacción
+  (leer-modificar-escribir: sin el bloqueo, dos procesos leen el mismo valor y una
+  de las sumas se pierde),
+- agrega un producto propio (1 unidad) y, cada tercera ronda, elimina el de la ronda
+  anterior,
+- cada 100 rondas hace un guardado completo (reemplaza la foto y vacía el diario).
+
+Al terminar se carga el archivo desde cero (almacenamiento.cargar()) y se compara con
+lo esperado: cantidad del producto compartido, cantidad de productos, unidades totales
+y movimientos del producto compartido en el libro.
+
+Uso (desde la raíz del repositorio):
+    python rendimiento/estres_procesos.py                       # cli, txt/sqlite/binario
+    python rendimiento/estres_procesos.py --procesos 8 --rondas 500 --almacenamiento sqlite
+    python rendimiento/estres_procesos.py --app ui
+
+Termina con código 1 si algún almacenamiento quedó inconsistente.
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APLICACIONES = {
+    "cli": os.path.join(RAIZ, "almacen_app_cli"),
+    "ui": os.path.join(RAIZ, "almacen_app_ui"),
+}
+
+PROCESOS = 6
+RONDAS = 300
+GUARDAR_CADA = 100
+
+# Producto que todos los procesos incrementan
+COMPARTIDO = 1
+
+
+# -------- ALMACENAMIENTO --------
+# Las importaciones van dentro: cada proceso pone antes en sys.path la aplicación elegida
+def crear_almacenamiento(tipo: str, carpeta: str):
+    from servicios.almacenamiento import AlmacenamientoBinario, AlmacenamientoSqlite, AlmacenamientoTxt
+
+    if tipo == "sqlite":
+        return AlmacenamientoSqlite(os.path.join(carpeta, "inventario.db"))
+    if tipo == "binario":
+        return AlmacenamientoBinario(os.path.join(carpeta, "inventario.bin"))
+    return AlmacenamientoTxt(os.path.join(carpeta, "inventario.txt"))
+
+
+# ID del producto propio que agrega `proceso` en `ronda` (no se repiten entre procesos)
+def id_propio(proceso: int, ronda: int, rondas: int) -> int:
+    return 1000 + proceso * rondas + ronda
+
+
+# -------- PROCESOS --------
+def trabajar(app: str, tipo: str, carpeta: str, proceso: int, rondas: int, salida) -> None:
+    sys.path.insert(0, APLICACIONES[app])
+    from modelos.producto import Producto
+    from servicios.inventario import Inventario
+
+    inventario = Inventario(almacenamiento=crear_almacenamiento(tipo, carpeta))
+    salida.wait()
+
+    for ronda in range(rondas):
+        with inventario.transaccion():
+            compartido = inventario.buscar_por_id(COMPARTIDO)
+            inventario.actualizar_producto(COMPARTIDO, compartido.get_cantidad() + 1)
+
+        inventario.agregar_producto(Producto(id_propio(proceso, ronda, rondas), f"Proceso {proceso} ronda {ronda}", 1, 1.0))
+        if ronda % 3 == 2:
+            inventario.eliminar_producto(id_propio(proceso, ronda - 1, rondas))
+
+        if (ronda + 1) % GUARDAR_CADA == 0:
+            inventario.guardar_en_archivo()
+
+    inventario.cerrar()
+
+
+# -------- COMPROBACIÓN --------
+# Lanza los procesos sobre un inventario nuevo y compara el archivo final con lo esperado.
+# Devuelve (segundos, lista de diferencias).
+def estresar(app: str, tipo: str, procesos: int, rondas: int) -> tuple[float, list[str]]:
+    from modelos.producto import Producto
+    from servicios.inventario import Inventario
+
+    carpeta = tempfile.mkdtemp(prefix="estres_")
+    try:
+        inventario = Inventario(almacenamiento=crear_almacenamiento(tipo, carpeta))
+        inventario.agregar_producto(Producto(COMPARTIDO, "Compartido", 0, 1.0))
+        inventario.cerrar()
+
+        # spawn: cada proceso arranca limpio (sin el estado importado de este)
+        contexto = multiprocessing.get_context("spawn")
+        salida = contexto.Barrier(procesos)
+        hijos = [contexto.Process(target=trabajar, args=(app, tipo, carpeta, i, rondas, salida))
+                 for i in range(procesos)]
+
+        inicio = time.perf_counter()
+        for hijo in hijos:
+            hijo.start()
+        for hijo in hijos:
+            hijo.join()
+        segundos = time.perf_counter() - inicio
+
+        diferencias = [f"el proceso {i} terminó con código {hijo.exitcode}"
+                       for i, hijo in enumerate(hijos) if hijo.exitcode != 0]
+
+        # Lo que quedó en disco, leído desde cero (foto + diario)
+        productos = crear_almacenamiento(tipo, carpeta).cargar()
+        eliminados = rondas // 3
+        esperado = {
+            "cantidad del compartido": procesos * rondas,
+            "productos": 1 + procesos * (rondas - eliminados),
+            "unidades": procesos * rondas + procesos * (rondas - eliminados),
+        }
+        compartido = productos.get(COMPARTIDO)
+        obtenido = {
+            "cantidad del compartido": compartido.get_cantidad() if compartido is not None else None,
+            "productos": len(productos),
+            "unidades": sum(p.get_cantidad() for p in productos.values()),
+        }
+
+        # Libro: el alta y un ajuste por cada incremento
+        libro = Inventario(almacenamiento=crear_almacenamiento(tipo, carpeta))
+        esperado["movimientos del compartido"] = 1 + procesos * rondas
+        obtenido["movimientos del compartido"] = sum(1 for _ in libro.movimientos(COMPARTIDO))
+        libro.cerrar()
+
+        diferencias += [f"{clave}: {obtenido[clave]} (se esperaba {valor})"
+                        for clave, valor in esperado.items() if obtenido[clave] != valor]
+        return segundos, diferencias
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Prueba de estrés del bloqueo entre procesos")
+    parser.add_argument("--app", choices=tuple(APLICACIONES), default="cli")
+    parser.add_argument("--procesos", type=int, default=PROCESOS)
+    parser.add_argument("--rondas", type=int, default=RONDAS)
+    parser.add_argument("--almacenamiento", choices=("txt", "sqlite", "binario", "todos"), default="todos")
+    args = parser.parse_args()
+
+    if args.procesos < 1 or args.rondas < 1:
+        parser.error("--procesos y --rondas deben ser >= 1.")
+
+    sys.path.insert(0, APLICACIONES[args.app])
+    tipos = ("txt", "sqlite", "binario") if args.almacenamiento == "todos" else (args.almacenamiento,)
+    fallas = 0
+
+    for tipo in tipos:
+        segundos, diferencias = estresar(args.app, tipo, args.procesos, args.rondas)
+        operaciones = args.procesos * args.rondas * 2
+        estado = "ok" if not diferencias else "INCONSISTENTE"
+        print(f"{args.app}/{tipo}: {args.procesos} procesos x {args.rondas} rondas, "
+              f"{segundos:.1f} s ({operaciones / segundos:,.0f} escrituras/s): {estado}")
+
+        for diferencia in diferencias:
+            print(f"  {diferencia}")
+        fallas += bool(diferencias)
+
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+"""
+Módulo: medir.py
+
+Mide los caminos más usados del inventario (Producto, carga y guardado, CRUD,
+búsquedas, lectores y un escritor en varios hilos y el pintado de la tabla de
+AppTk) sobre catálogos sintéticos y compara el resultado con una línea base
+guardada, para ver si un cambio hizo algo más lento (o más rápido).
+
+Uso (desde la raíz del repositorio):
+    python rendimiento/medir.py                          # cli y ui, 1k, 10k y 100k productos
+    python rendimiento/medir.py --tamanos 1000,1000000 --app cli
+    python rendimiento/medir.py --casos cargar,guardar --almacenamiento sqlite
+    python rendimiento/medir.py --json resultados.json   # resultados para otras herramientas
+    python rendimiento/medir.py --guardar-base           # actualiza rendimiento/linea_base.json
+    python rendimiento/medir.py --comparar               # compara con la línea base
+
+Con --comparar el programa termina con código 1 si algún caso quedó más de un
+--tolerancia (25 % por defecto) más lento que en la línea base. Se compara la mejor
+repetición (el mínimo), que es la menos afectada por lo que haga el resto del equipo,
+y entre repeticiones se cronometra una referencia fija en Python puro: si el equipo
+entero va más lento (otra carga, ahorro de energía), la comparación lo descuenta.
+Aun así los tiempos dependen de la máquina: la línea base sirve para comparar
+corridas hechas en el mismo equipo.
+
+Cada aplicación se mide en su propio proceso (las dos tienen paquetes `modelos` y
+`servicios`). Los casos de AppTk necesitan pantalla: sin DISPLAY se usa Xvfb si está
+instalado y, si no, se omiten (se informa en el resultado).
+
+Resultado (JSON): {"entorno": {...}, "resultados": {"cli/cargar/txt/10000": {...}}} con,
+por caso, ops, repeticiones, mediana_ns, minimo_ns, ns_por_op (mediana / ops),
+minimo_ns_por_op y referencia_ns.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APLICACIONES = {
+    "cli": os.path.join(RAIZ, "almacen_app_cli"),
+    "ui": os.path.join(RAIZ, "almacen_app_ui"),
+}
+LINEA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "linea_base.json")
+
+TAMANOS = (1_000, 10_000, 100_000)
+REPETICIONES = 5
+TOLERANCIA = 0.25
+
+# Los casos cortos se repiten hasta sumar este tiempo medido (como mucho 20 veces
+# las repeticiones pedidas): el mínimo de muchas repeticiones es más estable
+TIEMPO_MINIMO_NS = 200_000_000
+
+
+# -------- MEDICIÓN --------
+# Trabajo fijo en Python puro (diccionario y texto, como el inventario); devuelve su
+# duración (ns). Sirve para descontar cambios de velocidad del equipo.
+def referencia() -> int:
+    inicio = time.perf_counter_ns()
+    datos = {i: f"{i}|Producto {i}|{i % 50}|1.5" for i in range(10_000)}
+    sum(len(linea.split("|")) for linea in datos.values())
+    return time.perf_counter_ns() - inicio
+
+# Ejecuta el caso al menos `repeticiones` veces (más si es corto, ver TIEMPO_MINIMO_NS).
+# Devuelve la duración de cada una y la mejor referencia medida entre ellas (ns): las
+# dos salen del mismo rato, así reflejan la misma velocidad del equipo.
+def cronometrar(caso, repeticiones: int) -> tuple[list[int], int]:
+    tiempos = []
+    patron = None
+
+    while len(tiempos) < repeticiones or (sum(tiempos) < TIEMPO_MINIMO_NS and len(tiempos) < 20 * repeticiones):
+        estado = caso.preparar() if caso.preparar else None
+
+        # La basura de la repetición anterior no se recolecta dentro de esta
+        gc.collect()
+        patron = min(patron or referencia(), referencia())
+
+        inicio = time.perf_counter_ns()
+        caso.ejecutar(estado)
+        tiempos.append(time.perf_counter_ns() - inicio)
+
+    return tiempos, patron
+
+
+def resumen(tiempos: list[int], patron: int, ops: int) -> dict:
+    mediana = statistics.median(tiempos)
+    return {
+        "ops": ops,
+        "repeticiones": len(tiempos),
+        "mediana_ns": int(mediana),
+        "minimo_ns": min(tiempos),
+        "ns_por_op": round(mediana / max(ops, 1), 1),
+        "minimo_ns_por_op": round(min(tiempos) / max(ops, 1), 1),
+        "referencia_ns": patron,
+    }
+
+
+# Pantalla para Tk: la que haya, o una virtual (Xvfb) mientras dure el bloque.
+# Entrega None si hay pantalla o el motivo por el que no la hay.
+@contextmanager
+def pantalla():
+    import tkinter as tk
+
+    def disponible() -> bool:
+        try:
+            tk.Tk().destroy()
+            return True
+        except tk.TclError:
+            return False
+
+    if disponible():
+        yield None
+        return
+
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        yield "sin pantalla (DISPLAY) y sin Xvfb instalado"
+        return
+
+    anterior = os.environ.get("DISPLAY")
+    proceso = subprocess.Popen([xvfb, ":87", "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = ":87"
+    try:
+        # Xvfb tarda un momento en aceptar conexiones
+        for _ in range(50):
+            if disponible():
+                break
+            time.sleep(0.1)
+        else:
+            yield "Xvfb no respondió"
+            return
+        yield None
+    finally:
+        proceso.terminate()
+        proceso.wait()
+        if anterior is None:
+            os.environ.pop("DISPLAY", None)
+        else:
+            os.environ["DISPLAY"] = anterior
+
+
+# Mide una aplicación en este proceso; devuelve {clave: resumen}
+def medir_aplicacion(app: str, tamanos, repeticiones: int, tipo: str, filtro, avisar) -> dict:
+    sys.path.insert(0, APLICACIONES[app])
+    import casos
+
+    resultados = {}
+    carpeta = tempfile.mkdtemp(prefix="rendimiento_")
+
+    def elegido(nombre: str) -> bool:
+        return not filtro or any(parte in nombre for parte in filtro)
+
+    def correr(grupo, n: int, sufijo: str = "") -> None:
+        for caso in grupo:
+            if not elegido(caso.nombre):
+                continue
+
+            clave = f"{app}/{caso.nombre}{sufijo}/{n}"
+            resultados[clave] = resumen(*cronometrar(caso, repeticiones), caso.ops)
+            avisar(clave, resultados[clave])
+
+    # Cada grupo usa su propia copia del catálogo: los casos de escritura lo modifican
+    def catalogo(datos, nombre: str) -> tuple[str, str]:
+        destino = os.path.join(carpeta, nombre)
+        os.makedirs(destino)
+        ruta = os.path.join(destino, "inventario.txt")
+        casos.escribir_catalogo(datos, ruta)
+        return destino, ruta
+
+    try:
+        for n in tamanos:
+            datos = casos.datos_catalogo(n)
+
+            correr(casos.casos_producto(datos), n)
+            correr(casos.casos_inventario(datos, tipo, *catalogo(datos, f"{n}_inventario")), n, f"/{tipo}")
+            correr(casos.casos_concurrencia(datos, tipo, *catalogo(datos, f"{n}_concurrencia")), n, f"/{tipo}")
+
+            if app == "ui" and elegido("pintar"):
+                with pantalla() as motivo:
+                    if motivo is None:
+                        correr(casos.casos_interfaz(datos, tipo, *catalogo(datos, f"{n}_interfaz")), n)
+                    else:
+                        resultados[f"{app}/pintar/{n}"] = {"omitido": motivo}
+                        avisar(f"{app}/pintar/{n}", resultados[f"{app}/pintar/{n}"])
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    return resultados
+
+
+# Cada aplicación en un proceso nuevo (las dos tienen paquetes con el mismo nombre)
+def medir_en_proceso(app: str, args) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        salida = f.name
+
+    comando = [
+        sys.executable, os.path.abspath(__file__), "--app", app,
+        "--tamanos", ",".join(map(str, args.tamanos)), "--repeticiones", str(args.repeticiones),
+        "--almacenamiento", args.almacenamiento, "--json", salida, "--sin-tabla",
+    ]
+    if args.casos:
+        comando += ["--casos", ",".join(args.casos)]
+
+    try:
+        subprocess.run(comando, check=True)
+        with open(salida, encoding="utf-8") as f:
+            return json.load(f)["resultados"]
+    finally:
+        os.remove(salida)
+
+
+# -------- INFORME --------
+def entorno() -> dict:
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementacion": platform.python_implementation(),
+        "sistema": platform.platform(),
+        "procesador": platform.machine(),
+        "nucleos": os.cpu_count(),
+    }
+
+
+# Compara con la línea base; devuelve {clave: cambio relativo} (0.3 = 30 % más lento).
+# Cada tiempo se mide en "referencias": el cambio de velocidad del equipo se descuenta.
+def comparar(resultados: dict, base: dict) -> dict:
+    def relativo(r: dict) -> float:
+        return r["minimo_ns_por_op"] / r["referencia_ns"]
+
+    cambios = {}
+    for clave, actual in resultados.items():
+        anterior = base.get(clave)
+        if not anterior or "referencia_ns" not in actual or "referencia_ns" not in anterior:
+            continue
+        cambios[clave] = relativo(actual) / relativo(anterior) - 1
+
+    return cambios
+
+
+def mostrar_tabla(resultados: dict, cambios: dict, tolerancia: float) -> None:
+    print(f"{'caso':<44} {'ops':>8} {'ns/op':>15} {'total ms':>10} {'vs base':>9}")
+
+    for clave, r in resultados.items():
+        if "omitido" in r:
+            print(f"{clave:<44} omitido: {r['omitido']}")
+            continue
+
+        marca = ""
+        if clave in cambios:
+            cambio = cambios[clave]
+            marca = f"{cambio:+.0%}"
+            if cambio > tolerancia:
+                marca += " LENTO"
+
+        print(f"{clave:<44} {r['ops']:>8} {r['ns_por_op']:>15,.1f} {r['mediana_ns'] / 1e6:>10,.2f} {marca:>9}")
+
+
+# -------- PRINCIPAL --------
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Mide el rendimiento del inventario")
+    parser.add_argument("--app", choices=("cli", "ui", "todas"), default="todas")
+    parser.add_argument("--tamanos", default=",".join(map(str, TAMANOS)),
+                        help="productos de cada catálogo, separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--almacenamiento", choices=("txt", "sqlite", "binario"), default="txt")
+    parser.add_argument("--casos", help="solo los casos cuyo nombre contenga alguno de estos textos (con comas)")
+    parser.add_argument("--json", metavar="ARCHIVO", help="escribe los resultados en JSON")
+    parser.add_argument("--guardar-base", action="store_true", help="guarda los resultados como línea base")
+    parser.add_argument("--comparar", nargs="?", const=LINEA_BASE, metavar="ARCHIVO",
+                        help="compara con una línea base (por defecto rendimiento/linea_base.json)")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                        help="cuánto más lento se acepta antes de marcar una regresión (0.25 = 25 %%)")
+    parser.add_argument("--sin-tabla", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    try:
+        args.tamanos = [int(t) for t in args.tamanos.split(",")]
+    except ValueError:
+        parser.error("--tamanos debe ser una lista de enteros separados por comas")
+    if min(args.tamanos) < 1 or args.repeticiones < 1:
+        parser.error("--tamanos y --repeticiones deben ser >= 1")
+    args.casos = [c for c in (args.casos or "").split(",") if c]
+
+    def avisar(clave: str, r: dict) -> None:
+        detalle = r.get("omitido") or f"{r['ns_por_op']:,.1f} ns/op"
+        print(f"  {clave}: {detalle}", file=sys.stderr, flush=True)
+
+    if args.app == "todas":
+        resultados = {}
+        for app in APLICACIONES:
+            resultados.update(medir_en_proceso(app, args))
+    else:
+        resultados = medir_aplicacion(args.app, args.tamanos, args.repeticiones,
+                                      args.almacenamiento, args.casos, avisar)
+
+    documento = {"entorno": entorno(), "repeticiones": args.repeticiones, "resultados": resultados}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(documento, f, ensure_ascii=False, indent=2)
+
+    if args.sin_tabla:
+        return 0
+
+    cambios = {}
+    if args.comparar:
+        try:
+            with open(args.comparar, encoding="utf-8") as f:
+                base = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error al leer la línea base: {e}", file=sys.stderr)
+            return 2
+
+        cambios = comparar(resultados, base["resultados"])
+        if base.get("entorno", {}).get("python") != documento["entorno"]["python"]:
+            print(f"Aviso: la línea base es de Python {base['entorno'].get('python')}", file=sys.stderr)
+
+    mostrar_tabla(resultados, cambios, args.tolerancia)
+
+    if args.guardar_base:
+        with open(LINEA_BASE, "w", encoding="utf-8") as f:
+            json.dump(documento, f, ensure_ascii=False, indent=2)
+        print(f"Línea base guardada en {LINEA_BASE}")
+
+    lentos = [clave for clave, cambio in cambios.items() if cambio > args.tolerancia]
+    if lentos:
+        print(f"{len(lentos)} casos más lentos que la línea base (más de {args.tolerancia:.0%}).")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())